@@ -0,0 +1,101 @@
+# benchmarks/bench_ann.py
+
+"""
+FAISS 인덱스 종류(rag/ann.py) 오프라인 벤치마크
+
+군집 구조가 있는 가짜 임베딩 N개(기본 10만 x 384차원)로 인덱스를 만들고
+설정(nprobe / efSearch)별로 다음을 출력합니다.
+- recall@k : Flat(정확한 검색) top-k 중 찾은 비율
+- p50 / p99 : 질문 1개 검색 지연 시간
+- RAM      : 인덱스 직렬화 크기 (메모리 사용량 근사값)
+
+    python -m benchmarks.bench_ann --n 100000 --dim 384 --queries 500
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from rag.ann import build_ann_index, index_memory_bytes, set_search_params
+
+
+# (spec, 검색 파라미터 목록)
+SETTINGS = [
+    ("Flat", [{}]),
+    ("IVF,Flat", [{"nprobe": 1}, {"nprobe": 8}, {"nprobe": 32}]),
+    ("HNSW32", [{"ef_search": 16}, {"ef_search": 64}, {"ef_search": 128}]),
+    ("IVF,PQ32", [{"nprobe": 8}, {"nprobe": 32}]),
+]
+
+
+def make_basis(dim: int, n_clusters: int, latent: int, rng: np.random.Generator):
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    projection = (rng.standard_normal((latent, dim)) / np.sqrt(latent)).astype(np.float32)
+    return centers, projection
+
+
+def make_vectors(n: int, basis, rng: np.random.Generator) -> np.ndarray:
+    """
+    주제별로 모인 논문 chunk 처럼 군집을 이루는 단위 벡터
+    (실제 임베딩처럼 군집 안의 변화는 저차원(latent) 공간에 몰려 있음)
+    """
+    centers, projection = basis
+    latent = rng.standard_normal((n, projection.shape[0])).astype(np.float32)
+    x = centers[rng.integers(len(centers), size=n)] + latent @ projection
+    x += 0.05 * rng.standard_normal(x.shape).astype(np.float32)
+    faiss.normalize_L2(x)
+    return x
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--latent", type=int, default=32, help="군집 안 변화의 차원 수")
+    parser.add_argument("--threads", type=int, default=1, help="검색 시 faiss 스레드 수 (인덱스 생성은 전체 사용)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    build_threads = faiss.omp_get_max_threads()
+    rng = np.random.default_rng(args.seed)
+    basis = make_basis(args.dim, args.clusters, args.latent, rng)
+    x = make_vectors(args.n, basis, rng)
+    queries = make_vectors(args.queries, basis, rng)
+
+    flat = faiss.IndexFlatL2(args.dim)
+    flat.add(x)
+    _, truth = flat.search(queries, args.k)
+
+    print(f"vectors={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'spec':<10s} {'params':<14s} {'build':>8s} {'recall':>7s} {'p50':>8s} {'p99':>8s} {'RAM':>9s}")
+    for spec, param_list in SETTINGS:
+        faiss.omp_set_num_threads(build_threads)
+        t = time.perf_counter()
+        index = build_ann_index(x, spec)
+        build = time.perf_counter() - t
+        ram = index_memory_bytes(index) / 2**20
+
+        faiss.omp_set_num_threads(args.threads)
+
+        for params in param_list:
+            set_search_params(index, **params)
+            latencies = []
+            found = 0
+            for qi in range(len(queries)):
+                t = time.perf_counter()
+                _, ids = index.search(queries[qi:qi + 1], args.k)
+                latencies.append(time.perf_counter() - t)
+                found += len(set(ids[0]) & set(truth[qi]))
+            ms = np.asarray(latencies) * 1000
+            label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+            print(f"{spec:<10s} {label:<14s} {build:7.1f}s {found / truth.size:7.1%} "
+                  f"{np.percentile(ms, 50):6.2f}ms {np.percentile(ms, 99):6.2f}ms {ram:7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
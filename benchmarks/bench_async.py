@@ -0,0 +1,141 @@
+# benchmarks/bench_async.py
+
+"""
+비동기 체인(rag/async_chain.py) + 공유 연결 풀(rag/http_pool.py) 벤치마크 - 로컬 가짜 OpenAI 서버 사용
+
+data/ 의 PDF 로 인덱스를 만들고, 가짜 서버(benchmarks/mock_openai.py)로 임베딩 / LLM 을 호출하며
+질문 하나의 전체 지연 시간과 질문당 요청 / 새 연결 수를 비교합니다.
+- lcel          : 기존 build_rag_chain + openai 기본 클라이언트 (keep-alive 5초)
+- async+pool    : build_async_rag_chain + 공유 연결 풀
+- async+rewrite : 위 + 질문 재작성 검색 동시 진행
+
+질문 사이 간격(--gap)이 기본 keep-alive(5초)보다 길면 기본 클라이언트는 질문마다 연결을 새로 맺습니다.
+
+    python -m benchmarks.bench_async --questions 6 --gap 6
+    python -m benchmarks.bench_async --gap 0 --no-answer-cache
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from rag.answer_cache import AnswerCache
+from rag.async_chain import build_async_rag_chain, build_query_rewriter
+from rag.bm25 import BM25Index
+from rag.chain import build_answer_chain, build_llm, build_rag_chain
+from rag.http_pool import HttpPoolConfig, client_kwargs
+from rag.index_store import make_chunk_ids
+from rag.loader import load_pdfs_from_dir
+from rag.splitter import split_documents
+from rag.vectorstore import build_retriever
+
+from benchmarks.fakes import HashingEmbeddings, make_term_queries
+from benchmarks.mock_openai import start_mock_server
+
+
+def _embeddings(dim: int, http_pool=None) -> OpenAIEmbeddings:
+    # 오프라인에서는 tiktoken 인코더를 받을 수 없으므로 문자열 그대로 전송
+    return OpenAIEmbeddings(model="text-embedding-3-small", dimensions=dim,
+                            check_embedding_ctx_length=False, **client_kwargs(http_pool))
+
+
+def build_index(chunks, dim: int):
+    """가짜 서버와 같은 HashingEmbeddings 로 미리 계산한 벡터로 인덱스 생성 (임베딩 요청 없음)"""
+    texts = [c.page_content for c in chunks]
+    ids = [c.metadata["chunk_id"] for c in chunks]
+    vectors = HashingEmbeddings(size=dim).embed_documents(texts)
+    vs = FAISS.from_embeddings(list(zip(texts, vectors)), _embeddings(dim),
+                               metadatas=[c.metadata for c in chunks], ids=ids)
+    bm25 = BM25Index()
+    bm25.add(ids, texts)
+    return vs, bm25
+
+
+async def run_setting(chain, questions, gap: float, stats):
+    latencies = []
+    before = dict(stats)
+    for i, question in enumerate(questions):
+        if i and gap:
+            await asyncio.sleep(gap)
+        t = time.perf_counter()
+        await chain.ainvoke({"question": question})
+        latencies.append(time.perf_counter() - t)
+    delta = {key: stats[key] - before.get(key, 0) for key in ("embeddings", "chat", "connections")}
+    return np.asarray(latencies) * 1000, delta
+
+
+async def amain(args):
+    base_url, stats = start_mock_server(
+        args.port, embedding_size=args.dim, embed_latency=args.embed_latency,
+        chat_latency=args.chat_latency, connect_latency=args.connect_latency
+    )
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    docs = load_pdfs_from_dir(args.data_dir)
+    chunks = split_documents(docs)
+    make_chunk_ids(chunks, "0" * 16)
+    vs, bm25 = build_index(chunks, args.dim)
+    questions = [q for _, q in make_term_queries(chunks, args.questions, random.Random(args.seed))]
+    pool = HttpPoolConfig(keepalive_expiry=args.keepalive)
+
+    def _cache(embeddings):
+        return AnswerCache(embeddings) if args.answer_cache else None
+
+    # 기존 경로: 기본 클라이언트
+    vs.embedding_function = _embeddings(args.dim)
+    retriever = build_retriever(vs, k=args.k, bm25=bm25)
+    lcel = build_rag_chain(retriever, answer_cache=_cache(vs.embeddings), llm=ChatOpenAI(model="gpt-4o-mini"),
+                           log_context=False)
+    settings = [("lcel", lcel, vs.embeddings)]
+
+    # 비동기 체인 + 공유 연결 풀
+    pooled = _embeddings(args.dim, pool)
+    llm = build_llm(pool)
+    for name, rewriter in (("async+pool", None), ("async+rewrite", build_query_rewriter(llm))):
+        chain = build_async_rag_chain(
+            vs, build_answer_chain(llm=llm, log_context=False), retriever=retriever, k=args.k,
+            answer_cache=_cache(pooled), rewriter=rewriter, rewrite_timeout=args.rewrite_timeout
+        )
+        settings.append((name, chain, pooled))
+
+    print(f"chunks={len(chunks)} questions={len(questions)} gap={args.gap}s "
+          f"embed={args.embed_latency * 1000:.0f}ms chat={args.chat_latency * 1000:.0f}ms "
+          f"connect={args.connect_latency * 1000:.0f}ms answer_cache={args.answer_cache}")
+    print(f"{'chain':<14s} {'p50':>8s} {'mean':>8s} {'max':>8s} {'embed/q':>8s} {'chat/q':>7s} {'conn/q':>7s}")
+    for name, chain, embeddings in settings:
+        vs.embedding_function = embeddings
+        await chain.ainvoke({"question": "warm up"})   # 첫 연결 / 임포트 비용 제외
+        ms, delta = await run_setting(chain, questions, args.gap, stats)
+        n = len(questions)
+        print(f"{name:<14s} {np.percentile(ms, 50):6.1f}ms {ms.mean():6.1f}ms {ms.max():6.1f}ms "
+              f"{delta['embeddings'] / n:8.2f} {delta['chat'] / n:7.2f} {delta['connections'] / n:7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--questions", type=int, default=6)
+    parser.add_argument("--gap", type=float, default=6.0, help="질문 사이 간격(초)")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.03)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    parser.add_argument("--connect-latency", type=float, default=0.05, help="새 연결 수립 비용(초)")
+    parser.add_argument("--keepalive", type=float, default=120.0, help="공유 연결 풀의 keep-alive(초)")
+    parser.add_argument("--rewrite-timeout", type=float, default=1.0)
+    parser.add_argument("--no-answer-cache", dest="answer_cache", action="store_false")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(amain(args))
+
+
+if __name__ == "__main__":
+    main()
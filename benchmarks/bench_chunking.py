@@ -0,0 +1,200 @@
+# benchmarks/bench_chunking.py
+
+"""
+분할 방식 벤치마크 - recursive(load_pdf + split_documents) / layout(chunk_pdf, rag/layout.py)
+
+- chunks     : chunk 수, 평균 글자 / 토큰 수, 전체 토큰 수(임베딩 비용), 벡터 메모리(chunk 수 × 차원 × 4 bytes)
+- throughput : 로드 + 분할 pages/sec. 현재 프로세스(serial) / 프로세스 풀(pool) 비교
+               (--copies 로 PDF 를 여러 벌 복사하여 파일 수를 늘림)
+- recall     : 분할 방식과 무관한 질문 - PDF 원문 페이지에서 한 페이지에만 나오는 단어 + 주변 단어 5개.
+               top-k 안에 같은 파일의 chunk 중 그 단어를 포함한 chunk 가 있으면 정답
+               all  : 모든 질문 (layout 이 지운 머리말 / 참고문헌에만 있는 단어 포함)
+               body : 두 방식 모두 단어와 주변 단어(5개 중 4개 이상)를 함께 담은 chunk 가 있는 질문만
+                      (layout 이 지운 부분에서 만든 질문 제외)
+  검색은 HashingEmbeddings + FAISS + BM25 하이브리드 (build_retriever)
+
+    python -m benchmarks.bench_chunking
+    python -m benchmarks.bench_chunking --copies 8 --queries 300 --k 4
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.bm25 import BM25Index, tokenize
+from rag.embedding import count_tokens, embed_into_vectorstore
+from rag.index_store import make_chunk_ids
+from rag.layout import chunk_pdf
+from rag.loader import iter_loaded_pdfs, list_pdf_files, load_pdf
+from rag.splitter import CHUNKERS, split_documents
+from rag.vectorstore import build_retriever
+
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.fakes import HashingEmbeddings
+
+
+def chunk_files(
+    paths: List[str],
+    chunker: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    max_workers: Optional[int] = None
+) -> List[Document]:
+    """index_store.sync_vectorstore 와 같은 방식으로 파일들을 chunk 로 만듭니다."""
+    if chunker == "layout":
+        load: Callable[[str], List[Document]] = partial(chunk_pdf, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    else:
+        load = load_pdf
+    chunks: List[Document] = []
+    for _, docs in sorted(iter_loaded_pdfs(paths, max_workers=max_workers, load=load)):
+        chunks.extend(docs if chunker == "layout" else split_documents(docs, chunk_size, chunk_overlap))
+    return chunks
+
+
+def chunk_stats(chunks: List[Document], dim: int) -> Dict[str, float]:
+    chars = np.asarray([len(d.page_content) for d in chunks])
+    tokens = np.asarray([count_tokens(d.page_content) for d in chunks])
+    return {
+        "chunks": len(chunks),
+        "mean_chars": float(chars.mean()),
+        "mean_tokens": float(tokens.mean()),
+        "total_tokens": int(tokens.sum()),
+        "vector_mb": len(chunks) * dim * 4 / 2**20,
+    }
+
+
+def bench_throughput(paths: List[str], chunker: str, chunk_size: int, chunk_overlap: int,
+                     pages: int, workers: Optional[int]) -> float:
+    """로드 + 분할 pages/sec"""
+    t = time.perf_counter()
+    chunk_files(paths, chunker, chunk_size, chunk_overlap, max_workers=workers)
+    return pages / (time.perf_counter() - t)
+
+
+def make_page_queries(pages: List[Document], n_queries: int, rng: random.Random) -> List[Tuple[str, str, str]]:
+    """(source, 단어, 질문) 목록. 단어 = 전체 PDF 중 한 페이지에만 나오는 단어, 질문 = 단어 + 주변 단어 5개"""
+    df = Counter(tok for d in pages for tok in set(tokenize(d.page_content)))
+    queries = []
+    for d in pages:
+        tokens = tokenize(d.page_content)
+        for i, tok in enumerate(tokens):
+            if df[tok] == 1 and len(tok) > 3 and not tok.isdigit():
+                window = tokens[max(0, i - 10):i] + tokens[i + 1:i + 11]
+                if len(window) >= 5:
+                    queries.append((d.metadata["source"], tok, " ".join([tok] + rng.sample(window, 5))))
+    return rng.sample(queries, min(n_queries, len(queries)))
+
+
+def in_body(chunks: List[Document], term: str, query: str) -> bool:
+    """term 과 질문의 주변 단어 4개 이상을 함께 담은 chunk 가 있는지"""
+    context = set(tokenize(query)) - {term}
+    for d in chunks:
+        tokens = set(tokenize(d.page_content))
+        if term in tokens and len(context & tokens) >= min(4, len(context)):
+            return True
+    return False
+
+
+def bench_recall(chunks: List[Document], queries: List[Tuple[str, str, str]], body: Set[str],
+                 k: int, dim: int) -> Dict[str, float]:
+    """body: 본문 질문(in_body)의 query 집합"""
+    ids = make_chunk_ids(chunks, "bench")
+    vs, _ = embed_into_vectorstore(chunks, HashingEmbeddings(size=dim), ids=ids)
+    bm25 = BM25Index()
+    bm25.add(ids, [d.page_content for d in chunks])
+    retriever = build_retriever(vs, k=k, bm25=bm25)
+
+    hits = {"all": [], "body": []}
+    for source, term, query in queries:
+        found = any(d.metadata["source"] == source and term in tokenize(d.page_content)
+                    for d in retriever.invoke(query)[:k])
+        hits["all"].append(found)
+        if query in body:
+            hits["body"].append(found)
+    result: Dict[str, float] = {}
+    for name, values in hits.items():
+        result[f"recall_{name}"] = float(np.mean(values)) if values else 0.0
+        result[f"queries_{name}"] = len(values)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--embedding-dim", type=int, default=1536, help="벡터 메모리 계산용 (text-embedding-3-small)")
+    parser.add_argument("--search-dim", type=int, default=256, help="재현율 측정용 HashingEmbeddings 차원")
+    parser.add_argument("--copies", type=int, default=4, help="처리량 측정에 쓸 PDF 복사본 수")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 풀 크기 (기본값: min(4, CPU 수))")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본값: benchmarks/results/chunking-<시각>.json)")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    paths = [os.path.join(args.data_dir, name) for name in list_pdf_files(args.data_dir)]
+    pages = [d for path in paths for d in load_pdf(path)]
+
+    chunks = {name: chunk_files(paths, name, args.chunk_size, args.chunk_overlap, max_workers=1) for name in CHUNKERS}
+    queries = make_page_queries(pages, args.queries, random.Random(args.seed))
+    body = {query for _, term, query in queries if all(in_body(c, term, query) for c in chunks.values())}
+
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-chunking-") as tmp:
+        copies = []
+        for i in range(args.copies):
+            for path in paths:
+                copies.append(shutil.copy(path, os.path.join(tmp, f"{i}-{os.path.basename(path)}")))
+        for name in CHUNKERS:
+            results[name] = chunk_stats(chunks[name], args.embedding_dim)
+            results[name]["serial_pages_per_s"] = bench_throughput(
+                copies, name, args.chunk_size, args.chunk_overlap, len(pages) * args.copies, workers=1)
+            results[name]["pool_pages_per_s"] = bench_throughput(
+                copies, name, args.chunk_size, args.chunk_overlap, len(pages) * args.copies, workers=args.workers)
+            results[name].update(bench_recall(chunks[name], queries, body, args.k, args.search_dim))
+
+    print(f"files={len(paths)} pages={len(pages)} copies={args.copies} "
+          f"chunk_size={args.chunk_size} overlap={args.chunk_overlap} k={args.k}")
+    print(f"{'chunker':<10s} {'chunks':>6s} {'chars':>6s} {'tokens':>7s} {'total':>7s} {'vec MB':>7s} "
+          f"{'serial p/s':>10s} {'pool p/s':>9s} {'R@k all':>8s} {'R@k body':>9s}")
+    for name, r in results.items():
+        print(f"{name:<10s} {r['chunks']:6d} {r['mean_chars']:6.0f} {r['mean_tokens']:7.0f} {r['total_tokens']:7d} "
+              f"{r['vector_mb']:7.2f} {r['serial_pages_per_s']:10.1f} {r['pool_pages_per_s']:9.1f} "
+              f"{r['recall_all']:8.1%} {r['recall_body']:9.1%}")
+    print(f"질문 all={results['layout']['queries_all']} body={results['layout']['queries_body']}")
+
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "data_dir": args.data_dir,
+            "config": {key: value for key, value in vars(args).items() if key not in ("data_dir", "out")},
+        },
+        "chunkers": results,
+    }
+    out = args.out or os.path.join("benchmarks", "results", f"chunking-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out}")
+
+
+if __name__ == "__main__":
+    main()
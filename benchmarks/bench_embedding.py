@@ -0,0 +1,46 @@
+# benchmarks/bench_embedding.py
+
+"""
+임베딩 단계(rag/embedding.py) 오프라인 벤치마크
+
+data/ 의 PDF 를 분할한 chunk 를 가짜 임베딩(요청당 지연 + 주기적 429)으로 임베딩하며
+동시 요청 수에 따른 chunks/sec 를 비교합니다.
+
+    python -m benchmarks.bench_embedding --latency 0.2 --rate-limit-every 7
+"""
+
+import argparse
+
+from rag.embedding import EmbeddingConfig, embed_into_vectorstore
+from rag.loader import load_pdfs_from_dir
+from rag.splitter import split_documents
+
+from benchmarks.fakes import HashingEmbeddings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--latency", type=float, default=0.2, help="가짜 요청 1회 지연(초)")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="N번째 요청마다 429")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    chunks = split_documents(load_pdfs_from_dir(args.data_dir))
+    print(f"chunks: {len(chunks)}")
+
+    for concurrency in args.concurrency:
+        config = EmbeddingConfig(
+            max_batch_size=args.batch_size,
+            concurrency=concurrency,
+            backoff_base=0.05
+        )
+        embeddings = HashingEmbeddings(latency=args.latency, rate_limit_every=args.rate_limit_every)
+        vs, stats = embed_into_vectorstore(chunks, embeddings, config=config)
+        assert vs.index.ntotal == len(chunks)
+        print(f"concurrency={concurrency:<3d} {stats}")
+
+
+if __name__ == "__main__":
+    main()
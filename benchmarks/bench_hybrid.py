@@ -0,0 +1,110 @@
+# benchmarks/bench_hybrid.py
+
+"""
+하이브리드 검색(rag/bm25.py) 오프라인 벤치마크
+
+1. 지연 시간: data/ chunk 의 단어로 만든 가짜 chunk N개(기본 10만)에 대해 BM25 검색 p50/p99
+   (어휘가 작아 posting 이 실제 논문 모음보다 훨씬 길므로 보수적인 수치)
+2. 재현율: data/ chunk 마다 그 chunk 에만 나오는 단어(모델명, 수치 등)를 섞은 질문을 만들고
+   정답 chunk 가 top-k 안에 들어오는 비율을 dense 단독 / 하이브리드로 비교
+   (같은 질문의 단어마다 한국어 조사를 붙인 경우("MACS의")도 하이브리드 재현율을 따로 측정)
+
+    python -m benchmarks.bench_hybrid --synthetic 100000 --queries 200
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from rag.bm25 import BM25Index, HybridRetriever, tokenize
+from rag.embedding import embed_into_vectorstore
+from rag.index_store import make_chunk_ids
+from rag.loader import load_pdfs_from_dir
+from rag.splitter import split_documents
+
+from benchmarks.fakes import HashingEmbeddings, make_term_queries
+
+
+_PARTICLES = ("의", "는", "를", "와", "에서")
+
+
+def _percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return f"p50={np.percentile(ms, 50):.2f}ms p99={np.percentile(ms, 99):.2f}ms"
+
+
+def bench_latency(texts, n_chunks: int, n_queries: int, rng: random.Random) -> None:
+    words = [tok for text in texts for tok in tokenize(text)]
+    index = BM25Index()
+    t = time.perf_counter()
+    batch = 10_000
+    for start in range(0, n_chunks, batch):
+        size = min(batch, n_chunks - start)
+        index.add(
+            [f"syn-{start + i}" for i in range(size)],
+            [" ".join(rng.choices(words, k=150)) for _ in range(size)]
+        )
+    print(f"[latency] {n_chunks} chunks 색인 {time.perf_counter() - t:.1f}s, 어휘 {len(index.vocab)}개")
+
+    samples = []
+    for _ in range(n_queries):
+        query = " ".join(rng.choices(words, k=8))
+        t = time.perf_counter()
+        index.search(query, 20)
+        samples.append(time.perf_counter() - t)
+    print(f"[latency] BM25 search(k=20) {_percentiles(samples)}")
+
+
+def bench_recall(chunks, n_queries: int, k: int, rng: random.Random) -> None:
+    ids = make_chunk_ids(chunks, "bench")
+    vs, _ = embed_into_vectorstore(chunks, HashingEmbeddings(), ids=ids)
+    bm25 = BM25Index()
+    bm25.add(ids, [d.page_content for d in chunks])
+    retriever = HybridRetriever(vectorstore=vs, bm25=bm25, k=k, fetch_k=max(20, k))
+
+    queries = make_term_queries(chunks, n_queries, rng)
+
+    dense_hits = hybrid_hits = particle_hits = 0
+    dense_time, hybrid_time = [], []
+    for target, query in queries:
+        t = time.perf_counter()
+        dense = vs.similarity_search(query, k=retriever.fetch_k)
+        dense_time.append(time.perf_counter() - t)
+        dense_hits += target in [d.metadata["chunk_id"] for d in dense[:k]]
+
+        t = time.perf_counter()
+        fused = retriever.fuse(query, dense)
+        hybrid_time.append(dense_time[-1] + time.perf_counter() - t)
+        hybrid_hits += target in [d.metadata["chunk_id"] for d in fused]
+
+        # 영문 용어 + 조사: tokenize() 가 한글/영문 경계에서 끊어야 BM25 가 같은 단어로 찾습니다.
+        particle_query = " ".join(f"{word}{rng.choice(_PARTICLES)}" for word in query.split())
+        fused = retriever.fuse(particle_query, dense)
+        particle_hits += target in [d.metadata["chunk_id"] for d in fused]
+
+    n = len(queries) or 1
+    print(f"[recall] 질문 {len(queries)}개, chunks {len(chunks)}개, k={k}")
+    print(f"[recall] dense  recall@{k}={dense_hits / n:.1%}  {_percentiles(dense_time)}")
+    print(f"[recall] hybrid recall@{k}={hybrid_hits / n:.1%}  {_percentiles(hybrid_time)}")
+    print(f"[recall] hybrid recall@{k}={particle_hits / n:.1%}  (단어마다 조사를 붙인 질문)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--synthetic", type=int, default=100_000, help="지연 측정용 가짜 chunk 수")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chunks = split_documents(load_pdfs_from_dir(args.data_dir))
+    bench_recall(chunks, args.queries, args.k, rng)
+    bench_latency([d.page_content for d in chunks], args.synthetic, args.queries, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# benchmarks/bench_memory.py
+
+"""
+인덱스 저장 형식별 프로세스 메모리 벤치마크 - 같은 인덱스를 여러 워커 프로세스가 동시에 열 때
+
+data/ 의 chunk 텍스트를 반복하여 가짜 chunk N개(기본 50000)를 만들고,
+앞쪽 차원에 분산이 몰린 가짜 벡터(text-embedding-3-* 처럼 앞 차원만 잘라 써도 되는 임베딩 흉내)로
+형식마다 인덱스 디렉토리를 만든 뒤, 워커 --workers 개가 동시에 로드 + 검색한 상태에서 메모리를 잽니다.
+
+- pickle      : 이전 형식 (FAISS.save_local / load_local, IndexFlat float32 + pickle docstore)
+- flat        : index.faiss(float32) + docs.bin, mmap
+- sqfp16      : SQfp16 (성분당 2 bytes), mmap
+- sq8         : SQ8 (성분당 1 byte), mmap
+- sq8@<dim>   : 앞 --reduced-dim 차원만 사용 + SQ8, mmap (EMBEDDING_DIMENSIONS)
+
+워커별 측정값 (rag/tracing.py process_memory, 로드 전 대비 증가량)
+- rss_anon : 프로세스 전용 메모리 (pickle 형식은 벡터 / 텍스트가 모두 여기)
+- rss_file : 파일 매핑 페이지 (워커끼리 공유)
+- pss      : 공유 페이지를 나눈 몫 포함 - 워커 N개의 총 메모리 ≈ pss × N
+recall@k 는 float32 전수 검색 결과 대비 (벡터가 가짜이므로 형식 간 상대 비교용)
+
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --chunks 100000 --workers 4 --formats pickle sq8
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_core.documents import Document
+
+from rag.ann import build_ann_index
+from rag.docstore import write_docstore
+from rag.index_store import INDEX_FILE
+from rag.loader import load_pdfs_from_dir
+from rag.splitter import split_documents
+
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.fakes import HashingEmbeddings
+
+
+FORMATS = ("pickle", "flat", "sqfp16", "sq8", "sq8@reduced")
+
+# 워커: 인덱스 로드 → 검색 → "ready" 출력 → 부모가 보낸 줄을 받으면 메모리 측정 → 종료 대기
+WORKER_SCRIPT = """
+import json, sys, time
+import numpy as np
+from rag.index_store import load_saved_vectorstore
+from rag.tracing import process_memory
+from benchmarks.fakes import HashingEmbeddings
+
+path, dim, queries_path, k = sys.argv[1], int(sys.argv[2]), sys.argv[3], int(sys.argv[4])
+before = process_memory()
+t = time.perf_counter()
+vs = load_saved_vectorstore(path, HashingEmbeddings(size=dim), use_mmap=True)
+load_s = time.perf_counter() - t
+queries = np.load(queries_path)[:, :dim]
+queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+results = []
+for q in queries:
+    docs = vs.similarity_search_with_score_by_vector(q.tolist(), k=k)
+    results.append([int(d.metadata["row"]) for d, _ in docs])
+print("ready", flush=True)
+sys.stdin.readline()
+after = process_memory()
+print(json.dumps({"load_s": load_s, "before": before, "after": after, "results": results}), flush=True)
+sys.stdin.read()
+"""
+
+
+def make_corpus(data_dir: str, n_chunks: int, dim: int, seed: int):
+    """(texts, vectors) - 앞쪽 차원일수록 분산이 큰 정규화 벡터"""
+    base = [d.page_content for d in split_documents(load_pdfs_from_dir(data_dir))]
+    texts = [f"{base[i % len(base)]} [{i}]" for i in range(n_chunks)]
+    rng = np.random.default_rng(seed)
+    decay = np.exp(-np.arange(dim) / (dim / 4)).astype(np.float32)
+    vectors = rng.standard_normal((n_chunks, dim), dtype=np.float32) * decay
+    return texts, vectors
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def write_index(path: str, fmt: str, texts: List[str], vectors: np.ndarray, reduced_dim: int) -> int:
+    """fmt 형식의 인덱스 디렉토리를 만들고 벡터 차원을 돌려줍니다."""
+    os.makedirs(path, exist_ok=True)
+    if fmt.startswith("sq8@"):
+        vectors = vectors[:, :reduced_dim]
+    vectors = _normalize(vectors)
+    spec = {"pickle": "Flat", "flat": "Flat", "sqfp16": "SQfp16"}.get(fmt, "SQ8")
+    index = build_ann_index(vectors, spec)
+    ids = [f"chunk-{i}" for i in range(len(texts))]
+    docs = {chunk_id: Document(page_content=text, metadata={"source": "bench.pdf", "page": i % 20, "row": i})
+            for i, (chunk_id, text) in enumerate(zip(ids, texts))}
+    vs = FAISS(HashingEmbeddings(size=vectors.shape[1]), index, InMemoryDocstore(docs), dict(enumerate(ids)))
+    if fmt == "pickle":
+        vs.save_local(path) # 10-VectorStore/02-FAISS.ipynb
+    else:
+        import faiss
+        faiss.write_index(index, os.path.join(path, INDEX_FILE))
+        write_docstore(path, vs.docstore, ids)
+    return vectors.shape[1]
+
+
+def run_workers(path: str, dim: int, queries_path: str, k: int, n_workers: int) -> List[dict]:
+    """워커 n_workers 개를 동시에 띄워 모두 검색을 마친 상태에서 각자의 메모리를 측정합니다."""
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, path, str(dim), queries_path, str(k)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(n_workers)]
+    try:
+        for proc in procs:
+            line = proc.stdout.readline()
+            if line.strip() != "ready":
+                raise RuntimeError(f"워커가 준비되지 않았습니다: {line!r}")
+        reports = []
+        for proc in procs:
+            proc.stdin.write("report\n")
+            proc.stdin.flush()
+            reports.append(json.loads(proc.stdout.readline()))
+        return reports
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+
+def recall_at_k(results: List[List[int]], exact: np.ndarray) -> float:
+    hits = [len(set(r) & set(e.tolist())) / len(e) for r, e in zip(results, exact)]
+    return float(np.mean(hits))
+
+
+def _dir_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--chunks", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536, help="text-embedding-3-small 기본 차원")
+    parser.add_argument("--reduced-dim", type=int, default=512, help="sq8@reduced 의 차원")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본값: benchmarks/results/memory-<시각>.json)")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    texts, vectors = make_corpus(args.data_dir, args.chunks, args.dim, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(len(vectors), args.queries, replace=False)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((args.queries, args.dim), dtype=np.float32) * vectors.std(axis=0)
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-memory-") as tmp:
+        queries_path = os.path.join(tmp, "queries.npy")
+        np.save(queries_path, queries)
+        exact = np.argsort(-(_normalize(queries) @ _normalize(vectors).T), axis=1)[:, :args.k]
+
+        for fmt in args.formats:
+            name = fmt.replace("reduced", str(args.reduced_dim))
+            path = os.path.join(tmp, fmt.replace("@", "-"))
+            t = time.perf_counter()
+            dim = write_index(path, fmt, texts, vectors, args.reduced_dim)
+            build_s = time.perf_counter() - t
+            reports = run_workers(path, dim, queries_path, args.k, args.workers)
+
+            def _delta(kind: str) -> float:
+                return float(np.mean([r["after"].get(kind, 0) - r["before"].get(kind, 0) for r in reports])) / 2**20
+
+            results[name] = {
+                "dim": dim,
+                "disk_mb": _dir_mb(path),
+                "build_s": build_s,
+                "load_s": float(np.mean([r["load_s"] for r in reports])),
+                "rss_mb": _delta("rss"),
+                "rss_anon_mb": _delta("rss_anon"),
+                "rss_file_mb": _delta("rss_file"),
+                "pss_mb": _delta("pss"),
+                f"recall@{args.k}": recall_at_k(reports[0]["results"], exact),
+            }
+
+    print(f"chunks={args.chunks} dim={args.dim} workers={args.workers} queries={args.queries}")
+    print("워커 1개당 로드 + 검색 후 증가량 (MB)")
+    print(f"{'format':<10s} {'dim':>5s} {'disk':>7s} {'load':>7s} {'rss':>7s} {'anon':>7s} {'file':>7s} "
+          f"{'pss':>7s} {'recall':>7s}")
+    for name, r in results.items():
+        print(f"{name:<10s} {r['dim']:5d} {r['disk_mb']:7.1f} {r['load_s']:6.2f}s {r['rss_mb']:7.1f} "
+              f"{r['rss_anon_mb']:7.1f} {r['rss_file_mb']:7.1f} {r['pss_mb']:7.1f} {r[f'recall@{args.k}']:7.1%}")
+
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "data_dir": args.data_dir,
+            "config": {key: value for key, value in vars(args).items() if key not in ("data_dir", "out")},
+        },
+        "formats": results,
+    }
+    out = args.out or os.path.join("benchmarks", "results", f"memory-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out}")
+
+
+if __name__ == "__main__":
+    main()
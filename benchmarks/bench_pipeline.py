@@ -0,0 +1,281 @@
+# benchmarks/bench_pipeline.py
+
+"""
+전체 파이프라인 오프라인 벤치마크 - data/ 의 PDF, 가짜 임베딩(HashingEmbeddings), 가짜 LLM(StubLLM)
+
+네트워크 없이 단계별 시간을 재고 결과를 JSON 으로 저장합니다.
+- load    : PDF 로드 (iter_loaded_pdfs)                    → pages/sec
+- split   : chunk 분할 + chunk ID                          → chunks/sec
+- embed   : 가짜 임베딩                                    → chunks/sec
+- index   : FAISS 인덱스(+ index_spec 변환) + BM25 생성      → chunks/sec
+- query   : 검색 1회 (build_retriever)                     → p50/p95/p99, queries/sec
+- prompt  : context 구성(format_docs) + 프롬프트 포맷        → p50/p95/p99
+- e2e     : build_rag_chain(가짜 LLM) 질문 1개 전체          → p50/p95/p99, queries/sec
+- peak RSS: 각 단계가 끝난 시점의 프로세스 최대 RSS (MB)
+
+--chunk-size / --chunk-overlap / --k / --embedding-dim / --index-spec 에 여러 값을 주면 모든 조합을 측정합니다.
+--compare 로 이전 결과 JSON 을 주면 같은 설정끼리 비교하여 threshold 이상 나빠진 항목을 표시합니다.
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --chunk-size 500 1000 --k 4 8 --out before.json
+    python -m benchmarks.bench_pipeline --compare before.json --fail-on-regression
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+
+from rag.ann import convert_vectorstore, describe_index
+from rag.bm25 import BM25Index
+from rag.chain import build_rag_chain, format_docs
+from rag.context import DEFAULT_CONTEXT_TOKENS
+from rag.index_store import file_sha256, make_chunk_ids
+from rag.loader import iter_loaded_pdfs, list_pdf_files
+from rag.prompts import INTEGRATED_PROMPT
+from rag.splitter import split_documents
+from rag.vectorstore import build_retriever
+
+from benchmarks.fakes import HashingEmbeddings, StubLLM, make_term_queries
+
+
+def peak_rss_mb() -> float:
+    """프로세스 최대 RSS (Linux 는 KB, macOS 는 bytes 단위로 돌려줌)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "n": int(len(ms)),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "per_sec": float(len(ms) / ms.sum() * 1000) if ms.sum() > 0 else 0.0,
+    }
+
+
+def _stage(seconds: float, count: int, unit: str) -> Dict[str, float]:
+    return {
+        "seconds": seconds,
+        unit: count,
+        f"{unit}_per_sec": count / seconds if seconds > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def bench_load(data_dir: str, workers: Optional[int]):
+    paths = [os.path.join(data_dir, f) for f in list_pdf_files(data_dir)]
+    t = time.perf_counter()
+    files = {path: docs for path, docs in iter_loaded_pdfs(paths, max_workers=workers)}
+    seconds = time.perf_counter() - t
+    pages = sum(len(docs) for docs in files.values())
+    return files, _stage(seconds, pages, "pages")
+
+
+def bench_split(files, chunk_size: int, chunk_overlap: int):
+    hashes = {path: file_sha256(path) for path in files}   # 해시는 측정에서 제외 (manifest 단계의 비용)
+    t = time.perf_counter()
+    chunks = []
+    for path in sorted(files):
+        file_chunks = split_documents(files[path], chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        make_chunk_ids(file_chunks, hashes[path])
+        chunks.extend(file_chunks)
+    return chunks, _stage(time.perf_counter() - t, len(chunks), "chunks")
+
+
+def bench_embed(chunks, embeddings: HashingEmbeddings):
+    t = time.perf_counter()
+    vectors = embeddings.embed_documents([c.page_content for c in chunks])
+    return vectors, _stage(time.perf_counter() - t, len(chunks), "chunks")
+
+
+def bench_index(chunks, vectors, embeddings: HashingEmbeddings, index_spec: str):
+    texts = [c.page_content for c in chunks]
+    ids = [c.metadata["chunk_id"] for c in chunks]
+    t = time.perf_counter()
+    vs = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings,
+                               metadatas=[c.metadata for c in chunks], ids=ids)
+    vs = convert_vectorstore(vs, index_spec)
+    faiss_seconds = time.perf_counter() - t
+    bm25 = BM25Index()
+    bm25.add(ids, texts)
+    stage = _stage(time.perf_counter() - t, len(chunks), "chunks")
+    stage["faiss_seconds"] = faiss_seconds
+    stage["index"] = describe_index(vs.index)
+    return vs, bm25, stage
+
+
+def bench_queries(retriever, queries, context_tokens: int, llm: StubLLM):
+    search, prompt, e2e = [], [], []
+    hits = 0
+    for target, question in queries:
+        t = time.perf_counter()
+        docs = retriever.invoke(question)
+        search.append(time.perf_counter() - t)
+        hits += target in [d.metadata["chunk_id"] for d in docs]
+
+        t = time.perf_counter()
+        INTEGRATED_PROMPT.invoke({"question": question, "context": format_docs(docs, context_tokens, log=False)})
+        prompt.append(time.perf_counter() - t)
+
+    chain = build_rag_chain(retriever, context_tokens=context_tokens, llm=llm, log_context=False)
+    for _, question in queries:
+        t = time.perf_counter()
+        chain.invoke({"question": question})
+        e2e.append(time.perf_counter() - t)
+
+    return {
+        "query": latency_summary(search),
+        "prompt": latency_summary(prompt),
+        "e2e": latency_summary(e2e),
+        "recall": hits / max(1, len(queries)),
+        "prompt_tokens_mean": llm.prompt_tokens / max(1, llm.calls),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_key(config: dict) -> str:
+    return ",".join(f"{k}={config[k]}" for k in sorted(config))
+
+
+def compare(previous: dict, current: dict, threshold: float) -> int:
+    """같은 설정의 이전 결과와 비교하여 threshold 이상 나빠진 항목 수를 돌려줍니다."""
+    old_runs = {run_key(r["config"]): r for r in previous.get("runs", [])}
+    regressions = 0
+    print(f"\n비교: {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}) → "
+          f"{current['meta'].get('commit')}")
+    for run in current["runs"]:
+        old = old_runs.get(run_key(run["config"]))
+        if old is None:
+            print(f"[WARN] 이전 결과에 없는 설정: {run_key(run['config'])}")
+            continue
+        print(run_key(run["config"]))
+        metrics = [(f"{name} {p}", run["stages"][name][p], old["stages"][name][p], True)
+                   for name in ("query", "prompt", "e2e") for p in ("p50_ms", "p95_ms", "p99_ms")]
+        metrics += [(f"{name} {unit}/s", run["stages"][name][f"{unit}_per_sec"],
+                     old["stages"][name][f"{unit}_per_sec"], False)
+                    for name, unit in (("load", "pages"), ("split", "chunks"), ("embed", "chunks"), ("index", "chunks"))]
+        metrics.append(("peak RSS MB", run["peak_rss_mb"], old["peak_rss_mb"], True))
+        for label, new_value, old_value, lower_is_better in metrics:
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            worse = change > threshold if lower_is_better else change < -threshold
+            regressions += worse
+            print(f"  {label:<18s} {old_value:10.2f} → {new_value:10.2f} {change:+7.1%}"
+                  f"{'  [REGRESSION]' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[1000])
+    parser.add_argument("--chunk-overlap", type=int, nargs="+", default=[200])
+    parser.add_argument("--k", type=int, nargs="+", default=[4])
+    parser.add_argument("--embedding-dim", type=int, nargs="+", default=[256], help="가짜 임베딩 차원 (모델 크기 대용)")
+    parser.add_argument("--index-spec", nargs="+", default=["Flat"], help="rag/ann.py 인덱스 spec")
+    parser.add_argument("--retriever", choices=["hybrid", "dense"], default="hybrid")
+    parser.add_argument("--context-tokens", type=int, default=DEFAULT_CONTEXT_TOKENS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="가짜 LLM 응답 지연(초)")
+    parser.add_argument("--load-workers", type=int, default=None, help="PDF 로드 프로세스 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본값: benchmarks/results/pipeline-<시각>.json)")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="이 비율 이상 나빠지면 회귀로 표시")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    files, load = bench_load(args.data_dir, args.load_workers)
+    print(f"load: {load['pages']} pages, {load['seconds']:.2f}s ({load['pages_per_sec']:.1f} pages/s)")
+
+    runs = []
+    print(f"{'chunk':>6s} {'ovl':>4s} {'dim':>4s} {'spec':<10s} {'k':>3s} {'chunks':>6s} "
+          f"{'split/s':>8s} {'embed/s':>8s} {'index/s':>8s} {'query p50':>9s} {'p95':>7s} {'p99':>7s} "
+          f"{'prompt p50':>10s} {'e2e p50':>8s} {'q/s':>7s} {'RSS':>7s}")
+    for chunk_size, chunk_overlap, dim, spec in itertools.product(
+        args.chunk_size, args.chunk_overlap, args.embedding_dim, args.index_spec
+    ):
+        chunks, split = bench_split(files, chunk_size, chunk_overlap)
+        embeddings = HashingEmbeddings(size=dim)
+        vectors, embed = bench_embed(chunks, embeddings)
+        vs, bm25, index = bench_index(chunks, vectors, embeddings, spec)
+        queries = make_term_queries(chunks, args.queries, random.Random(args.seed))
+
+        for k in args.k:
+            retriever = build_retriever(vs, k=k, bm25=bm25 if args.retriever == "hybrid" else None)
+            result = bench_queries(retriever, queries, args.context_tokens, StubLLM(args.llm_latency))
+            run = {
+                "config": {
+                    "chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "embedding_dim": dim,
+                    "index_spec": spec, "k": k, "retriever": args.retriever,
+                    "context_tokens": args.context_tokens,
+                },
+                "stages": {
+                    "load": load, "split": split, "embed": embed, "index": index,
+                    "query": result["query"], "prompt": result["prompt"], "e2e": result["e2e"],
+                },
+                "recall": result["recall"],
+                "prompt_tokens_mean": result["prompt_tokens_mean"],
+                "peak_rss_mb": result["peak_rss_mb"],
+            }
+            runs.append(run)
+            q, p, e = result["query"], result["prompt"], result["e2e"]
+            print(f"{chunk_size:6d} {chunk_overlap:4d} {dim:4d} {spec:<10s} {k:3d} {len(chunks):6d} "
+                  f"{split['chunks_per_sec']:8.0f} {embed['chunks_per_sec']:8.0f} {index['chunks_per_sec']:8.0f} "
+                  f"{q['p50_ms']:7.2f}ms {q['p95_ms']:5.2f}ms {q['p99_ms']:5.2f}ms "
+                  f"{p['p50_ms']:8.2f}ms {e['p50_ms']:6.2f}ms {e['per_sec']:7.1f} {run['peak_rss_mb']:5.0f}MB")
+
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "data_dir": args.data_dir,
+            "files": len(files),
+            "queries": args.queries,
+            "llm_latency": args.llm_latency,
+        },
+        "runs": runs,
+    }
+    out = args.out or os.path.join("benchmarks", "results", f"pipeline-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"[WARN] 회귀 {regressions}건 (threshold {args.threshold:.0%})")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_rerank.py
+
+"""
+재순위 단계(rag/rerank.py) 오프라인 벤치마크 - data/ 의 PDF 사용
+
+data/ chunk 마다 그 chunk 에만 나오는 단어를 섞은 질문을 만들고, 검색 방식별로 다음을 비교합니다.
+- recall@k   : 정답 chunk 가 top-k 에 들어온 비율
+- neighbors  : 결과 k 개 중 같은 페이지의 이웃 chunk(겹침) 쌍의 평균 개수
+- pages      : 결과 k 개가 다루는 서로 다른 (source, page) 평균 개수
+- ctx tokens : pack_context() 로 만든 context 토큰 수 평균
+- rerank p50 / p99 : 재순위 단계 지연 시간
+
+    python -m benchmarks.bench_rerank --k 4 --fetch-k 20
+    python -m benchmarks.bench_rerank --cross-encoder cross-encoder/ms-marco-MiniLM-L-6-v2
+"""
+
+import argparse
+import hashlib
+import random
+
+import numpy as np
+
+from rag.bm25 import BM25Index
+from rag.context import ContextStats, pack_context
+from rag.embedding import embed_into_vectorstore
+from rag.index_store import make_chunk_ids
+from rag.loader import load_pdfs_from_dir
+from rag.rerank import RerankConfig
+from rag.splitter import split_documents
+from rag.vectorstore import build_retriever
+
+from benchmarks.fakes import HashingEmbeddings, make_term_queries
+
+
+def _neighbor_pairs(docs) -> int:
+    keys = set()
+    for d in docs:
+        chunk_id = d.metadata["chunk_id"]
+        keys.add((chunk_id.rsplit("-", 1)[0], d.metadata.get("page"), int(chunk_id.rsplit("-", 1)[1])))
+    return sum((f, p, i + 1) in keys for f, p, i in keys)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--lambda-mult", type=float, default=0.7)
+    parser.add_argument("--cross-encoder", default=None, help="sentence-transformers Cross-Encoder 모델 이름")
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = load_pdfs_from_dir(args.data_dir)
+    chunks = []
+    for source in sorted({d.metadata["source"] for d in docs}):
+        file_chunks = split_documents([d for d in docs if d.metadata["source"] == source])
+        make_chunk_ids(file_chunks, hashlib.sha256(source.encode("utf-8")).hexdigest())
+        chunks.extend(file_chunks)
+    ids = [c.metadata["chunk_id"] for c in chunks]
+
+    vs, _ = embed_into_vectorstore(chunks, HashingEmbeddings(), ids=ids)
+    bm25 = BM25Index()
+    bm25.add(ids, [c.page_content for c in chunks])
+    queries = make_term_queries(chunks, args.queries, rng)
+
+    mmr = RerankConfig(fetch_k=args.fetch_k, lambda_mult=args.lambda_mult, budget_ms=args.budget_ms)
+    settings = [
+        ("dense", build_retriever(vs, k=args.k)),
+        ("hybrid", build_retriever(vs, k=args.k, bm25=bm25, fetch_k=args.fetch_k)),
+        ("dense+mmr", build_retriever(vs, k=args.k, rerank=mmr)),
+        ("hybrid+mmr", build_retriever(vs, k=args.k, bm25=bm25, rerank=mmr)),
+    ]
+    if args.cross_encoder:
+        ce = RerankConfig(fetch_k=args.fetch_k, lambda_mult=args.lambda_mult,
+                          cross_encoder=args.cross_encoder, budget_ms=args.budget_ms)
+        settings.append(("hybrid+ce+mmr", build_retriever(vs, k=args.k, bm25=bm25, rerank=ce)))
+
+    print(f"chunks={len(chunks)} queries={len(queries)} k={args.k} fetch_k={args.fetch_k}")
+    print(f"{'retriever':<14s} {'recall':>7s} {'neighbors':>9s} {'pages':>6s} {'ctx tokens':>10s} "
+          f"{'rerank p50':>10s} {'p99':>8s}")
+    for name, retriever in settings:
+        hits, neighbors, pages, tokens, latencies = 0, [], [], [], []
+        for target, query in queries:
+            result = retriever.invoke(query)
+            hits += target in [d.metadata["chunk_id"] for d in result]
+            neighbors.append(_neighbor_pairs(result))
+            pages.append(len({(d.metadata["source"], d.metadata.get("page")) for d in result}))
+            stats = ContextStats()
+            pack_context(result, stats=stats)
+            tokens.append(stats.tokens_after)
+            reranker = getattr(retriever, "reranker", None)
+            if reranker is not None:
+                latencies.append(reranker.last_ms)
+        lat = (f"{np.percentile(latencies, 50):8.2f}ms {np.percentile(latencies, 99):6.2f}ms"
+               if latencies else f"{'-':>10s} {'-':>8s}")
+        print(f"{name:<14s} {hits / len(queries):7.1%} {np.mean(neighbors):9.2f} {np.mean(pages):6.2f} "
+              f"{np.mean(tokens):10.0f} {lat}")
+        if getattr(retriever, "reranker", None) is not None and retriever.reranker.scorer is not None:
+            print(f"{'':<14s} {retriever.reranker.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# benchmarks/bench_scope.py
+
+"""
+논문 / 페이지 범위 검색 벤치마크 (rag/scope.py) - 전체 chunk 수가 늘어날 때 범위 검색 지연
+
+논문 하나당 --chunks-per-paper 개(기본 120 chunk, 15 페이지)인 가짜 논문을 늘려 가며
+(--sizes, 기본 1만 / 5만 / 20만 chunk) 같은 주제의 논문끼리 비슷한 벡터를 갖도록 만들고,
+질문마다 정답 논문(절반은 3 페이지 범위)을 지정하여 다음 방법을 비교합니다.
+
+- postfilter     : 전체 인덱스 top-k 검색 후 범위 밖 chunk 제거 (batch.search_by_vectors + metadata 비교)
+- postfilter@N   : 전체 인덱스에서 k × --overfetch 개를 가져온 뒤 제거
+- selector       : 전체 인덱스 검색 안에서 IDSelectorBatch 로 범위 밖 벡터 제외
+- subindex       : ScopedIndex.search (논문별 하위 인덱스 + 페이지 범위 IDSelector, 캐시된 상태)
+
+- p50 / p95 : 질문 1개 검색 지연 (docstore 에서 문서를 읽는 시간 포함)
+- recall@k  : 범위 안 벡터 전수 검색 top-k 중 찾은 비율
+- short     : 범위 안 결과가 k 개보다 적게 나온 질문 비율
+- 1회 비용   : source 목록(catalog) 생성 시간, 논문 하나의 하위 인덱스 생성 시간 (처음 질문할 때)
+
+    python -m benchmarks.bench_scope
+    python -m benchmarks.bench_scope --sizes 10000 100000 --queries 300 --k 4
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_core.documents import Document
+
+from rag.ann import build_ann_index
+from rag.batch import search_by_vectors
+from rag.scope import ScopedIndex, SearchScope
+
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.fakes import HashingEmbeddings
+
+
+def make_corpus(n_chunks: int, per_paper: int, pages: int, dim: int, n_topics: int, rng: np.random.Generator):
+    """(vectorstore, 벡터, 논문 수) - 벡터 = 주제 중심 + 논문 고유 방향 + chunk 잡음"""
+    n_papers = n_chunks // per_paper
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    paper_topic = rng.integers(0, n_topics, n_papers)
+    paper_dirs = topics[paper_topic] + 0.5 * rng.standard_normal((n_papers, dim)).astype(np.float32)
+    vectors = np.repeat(paper_dirs, per_paper, axis=0)
+    vectors += 0.8 * rng.standard_normal(vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    ids = [f"chunk-{i}" for i in range(len(vectors))]
+    docs = {}
+    for i, chunk_id in enumerate(ids):
+        paper, j = divmod(i, per_paper)
+        docs[chunk_id] = Document(id=chunk_id, page_content=f"chunk {i}", metadata={
+            "source": f"paper-{paper:05d}.pdf", "page": j * pages // per_paper, "chunk_id": chunk_id})
+    vs = FAISS(HashingEmbeddings(size=dim), build_ann_index(vectors, "Flat"), InMemoryDocstore(docs),
+               dict(enumerate(ids)))
+    return vs, vectors, n_papers
+
+
+def make_queries(vectors: np.ndarray, n_papers: int, per_paper: int, pages: int, n_queries: int,
+                 rng: np.random.Generator) -> List[Tuple[np.ndarray, SearchScope]]:
+    """논문 chunk 하나 근처의 질문 벡터 + 범위 (절반은 그 chunk 가 있는 3 페이지)"""
+    queries = []
+    for q in range(n_queries):
+        paper = int(rng.integers(n_papers))
+        j = int(rng.integers(per_paper))
+        noise = rng.standard_normal(vectors.shape[1]).astype(np.float32) * (0.5 / np.sqrt(vectors.shape[1]))
+        x = vectors[paper * per_paper + j] + noise
+        x /= np.linalg.norm(x)
+        scope = SearchScope(f"paper-{paper:05d}.pdf")
+        if q % 2:
+            page = j * pages // per_paper
+            scope = SearchScope(scope.source, max(0, page - 1), page + 1)
+        queries.append((x, scope))
+    return queries
+
+
+def in_scope(doc: Document, scope: SearchScope) -> bool:
+    page = doc.metadata["page"]
+    return (doc.metadata["source"] == scope.source
+            and (scope.first_page is None or page >= scope.first_page)
+            and (scope.last_page is None or page <= scope.last_page))
+
+
+def exact_topk(vectors: np.ndarray, positions: np.ndarray, x: np.ndarray, k: int) -> List[str]:
+    scores = vectors[positions] @ x
+    return [f"chunk-{positions[i]}" for i in np.argsort(-scores)[:k]]
+
+
+def run_method(name: str, vs: FAISS, scoped: ScopedIndex, x: np.ndarray, scope: SearchScope,
+               k: int, overfetch: int, positions: np.ndarray) -> List[Document]:
+    if name == "postfilter":
+        return [d for d in search_by_vectors(vs, [x], k)[0] if in_scope(d, scope)]
+    if name == "postfilter@N":
+        return [d for d in search_by_vectors(vs, [x], k * overfetch)[0] if in_scope(d, scope)][:k]
+    if name == "selector":
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(positions))
+        _, indices = vs.index.search(x.reshape(1, -1), k, params=params)
+        return [vs.docstore.search(vs.index_to_docstore_id[int(i)]) for i in indices[0] if i != -1]
+    return scoped.search([x], k, scope)[0]
+
+
+METHODS = ("postfilter", "postfilter@N", "selector", "subindex")
+
+
+def bench_size(n_chunks: int, args, rng: np.random.Generator) -> Dict[str, dict]:
+    t = time.perf_counter()
+    vs, vectors, n_papers = make_corpus(n_chunks, args.chunks_per_paper, args.pages, args.dim, args.topics, rng)
+    build_s = time.perf_counter() - t
+
+    scoped = ScopedIndex(vs, max_sources=args.max_sources)
+    t = time.perf_counter()
+    scoped.sources()
+    catalog_s = time.perf_counter() - t
+
+    queries = make_queries(vectors, n_papers, args.chunks_per_paper, args.pages, args.queries, rng)
+    # 범위 안 벡터 위치 (selector / 정답 계산용, 카탈로그에서 가져옴)
+    positions = []
+    for _, scope in queries:
+        entry = scoped._sources[scope.source]
+        selected = scoped._selected(entry, scope)
+        positions.append(entry.positions if selected is None else entry.positions[selected])
+    truth = [exact_topk(vectors, p, x, args.k) for (x, _), p in zip(queries, positions)]
+
+    # 처음 질문할 때의 하위 인덱스 생성 (캐시 없음)
+    cold = []
+    for x, scope in queries[:args.cold]:
+        fresh = ScopedIndex(vs)
+        fresh.sources()
+        t = time.perf_counter()
+        fresh.search([x], args.k, scope)
+        cold.append(time.perf_counter() - t)
+
+    results: Dict[str, dict] = {"_corpus": {
+        "papers": n_papers, "build_s": build_s, "catalog_s": catalog_s,
+        "subindex_cold_ms": float(np.median(cold)) * 1000 if cold else 0.0,
+    }}
+    for name in METHODS:
+        for (x, scope), p in zip(queries[:10], positions):   # 캐시 / 분기 예열
+            run_method(name, vs, scoped, x, scope, args.k, args.overfetch, p)
+        times, hits, short = [], [], 0
+        for (x, scope), p, expected in zip(queries, positions, truth):
+            t = time.perf_counter()
+            docs = run_method(name, vs, scoped, x, scope, args.k, args.overfetch, p)
+            times.append(time.perf_counter() - t)
+            found = {d.metadata["chunk_id"] for d in docs}
+            hits.append(len(found & set(expected)) / len(expected))
+            short += len(docs) < min(args.k, len(p))
+        label = name.replace("N", str(args.k * args.overfetch))
+        results[label] = {
+            "p50_ms": float(np.percentile(times, 50)) * 1000,
+            "p95_ms": float(np.percentile(times, 95)) * 1000,
+            f"recall@{args.k}": float(np.mean(hits)),
+            "short": short / len(queries),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 200_000], help="전체 chunk 수")
+    parser.add_argument("--chunks-per-paper", type=int, default=120)
+    parser.add_argument("--pages", type=int, default=15, help="논문 하나의 페이지 수")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--topics", type=int, default=50, help="주제 수 (같은 주제의 논문끼리 벡터가 비슷함)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--overfetch", type=int, default=10, help="postfilter@N 의 N = k × overfetch")
+    parser.add_argument("--max-sources", type=int, default=16, help="ScopedIndex 하위 인덱스 캐시 크기")
+    parser.add_argument("--cold", type=int, default=20, help="하위 인덱스 생성 시간을 잴 질문 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본값: benchmarks/results/scope-<시각>.json)")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    sizes: Dict[str, Dict[str, dict]] = {}
+    for n_chunks in args.sizes:
+        sizes[str(n_chunks)] = bench_size(n_chunks, args, np.random.default_rng(args.seed))
+
+    print(f"chunks/paper={args.chunks_per_paper} pages={args.pages} dim={args.dim} "
+          f"queries={args.queries} k={args.k} (절반은 3 페이지 범위)")
+    for n_chunks, results in sizes.items():
+        corpus = results["_corpus"]
+        print(f"\nchunks={n_chunks} papers={corpus['papers']} catalog {corpus['catalog_s']:.2f}s "
+              f"하위 인덱스 생성 {corpus['subindex_cold_ms']:.2f}ms (논문 하나, 처음 1회)")
+        print(f"{'method':<14s} {'p50':>8s} {'p95':>8s} {'recall':>7s} {'short':>6s}")
+        for name, r in results.items():
+            if name == "_corpus":
+                continue
+            print(f"{name:<14s} {r['p50_ms']:6.2f}ms {r['p95_ms']:6.2f}ms "
+                  f"{r[f'recall@{args.k}']:7.1%} {r['short']:6.1%}")
+
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key != "out"},
+        },
+        "sizes": sizes,
+    }
+    out = args.out or os.path.join("benchmarks", "results", f"scope-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out}")
+
+
+if __name__ == "__main__":
+    main()
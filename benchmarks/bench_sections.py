@@ -0,0 +1,167 @@
+# benchmarks/bench_sections.py
+
+"""
+섹션별 생성(rag/sections.py) 벤치마크 - 구조화된 출력 1회 vs bullet → script 스트리밍 + evidence 로컬 추출
+
+data/ 의 PDF 로 인덱스를 만들고, 가짜 서버(benchmarks/mock_openai.py)로 LLM 을 호출합니다.
+가짜 서버는 첫 토큰까지 --chat-latency, 이후 출력 토큰마다 --token-latency 를 기다리므로
+출력 토큰 수가 그대로 지연 시간에 반영됩니다.
+- single   : build_answer_chain / build_streaming_chain (bullet + script + evidence 를 한 번에 생성)
+- sections : build_sectioned_answer_chain / build_sectioned_streaming_chain
+
+invoke : 질문 하나의 생성 시간 (검색 제외) + 단계별 시간 (ChainTracer) + 출력 토큰 수
+stream : 첫 bullet / 첫 script 조각 / done 이벤트까지의 시간 (검색 포함)
+
+    python -m benchmarks.bench_sections
+    python -m benchmarks.bench_sections --questions 10 --chat-latency 0.5 --token-latency 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from rag.chain import build_answer_chain, build_llm
+from rag.index_store import make_chunk_ids
+from rag.loader import load_pdfs_from_dir
+from rag.sections import build_sectioned_answer_chain, build_sectioned_streaming_chain
+from rag.splitter import split_documents
+from rag.streaming import aiter_presentation_events, build_streaming_chain
+from rag.tracing import ChainTracer
+from rag.vectorstore import build_retriever
+
+from benchmarks.bench_async import build_index
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.fakes import make_term_queries
+from benchmarks.mock_openai import start_mock_server
+
+
+MODES = ("single", "sections")
+
+
+def _chains(mode: str, retriever, llm, tracer: ChainTracer):
+    if mode == "sections":
+        return (build_sectioned_answer_chain(llm=llm, log_context=False, tracer=tracer),
+                build_sectioned_streaming_chain(retriever, llm=llm))
+    return (build_answer_chain(llm=llm, log_context=False, tracer=tracer),
+            build_streaming_chain(retriever, llm=llm))
+
+
+async def run_invoke(chain, tracer: ChainTracer, retriever, questions: List[str]) -> dict:
+    traced = tracer.wrap(chain)
+    stages: Dict[str, List[float]] = {}
+    tokens = []
+    for question in questions:
+        docs = await retriever.ainvoke(question)
+        await traced.ainvoke({"question": question, "docs": docs})
+        for stage, seconds in tracer.last.stages.items():
+            stages.setdefault(stage, []).append(seconds * 1000)
+        tokens.append(tracer.last.attrs.get("completion_tokens", 0))
+    return {
+        "stages_ms": {stage: float(np.median(ms)) for stage, ms in stages.items()},
+        "completion_tokens": float(np.mean(tokens)),
+    }
+
+
+async def run_stream(chain, questions: List[str]) -> dict:
+    marks: Dict[str, List[float]] = {"first_bullet": [], "first_script": [], "done": []}
+    for question in questions:
+        seen = {}
+        started = time.perf_counter()
+        async for kind, _ in aiter_presentation_events(chain.astream({"question": question})):
+            key = {"bullet": "first_bullet", "script": "first_script"}.get(kind, kind)
+            if key in marks and key not in seen:
+                seen[key] = (time.perf_counter() - started) * 1000
+        for key, ms in seen.items():
+            marks[key].append(ms)
+    return {f"{key}_ms": float(np.median(ms)) if ms else None for key, ms in marks.items()}
+
+
+async def amain(args) -> Dict[str, dict]:
+    base_url, _ = start_mock_server(
+        args.port, embedding_size=args.dim, embed_latency=args.embed_latency,
+        chat_latency=args.chat_latency, connect_latency=0.0, token_latency=args.token_latency
+    )
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+
+    chunks = split_documents(load_pdfs_from_dir(args.data_dir))
+    make_chunk_ids(chunks, "0" * 16)
+    vs, _ = build_index(chunks, args.dim)
+    retriever = build_retriever(vs, k=args.k)
+    questions = [q for _, q in make_term_queries(chunks, args.questions, random.Random(args.seed))]
+    llm = build_llm()
+
+    results: Dict[str, dict] = {}
+    for mode in MODES:
+        tracer = ChainTracer()
+        answer_chain, stream_chain = _chains(mode, retriever, llm, tracer)
+        await answer_chain.ainvoke({"question": "warm up", "docs": await retriever.ainvoke("warm up")})
+        results[mode] = {
+            "invoke": await run_invoke(answer_chain, tracer, retriever, questions),
+            "stream": await run_stream(stream_chain, questions),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--questions", type=int, default=6)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.03)
+    parser.add_argument("--chat-latency", type=float, default=0.3, help="첫 토큰까지의 시간(초)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="출력 토큰 하나당 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본값: benchmarks/results/sections-<시각>.json)")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    results = asyncio.run(amain(args))
+
+    print(f"questions={args.questions} chat={args.chat_latency * 1000:.0f}ms "
+          f"token={args.token_latency * 1000:.0f}ms k={args.k}")
+    print("\ninvoke (검색 제외, 중앙값)")
+    for mode, r in results.items():
+        stages = " | ".join(f"{stage} {ms:.0f}ms" for stage, ms in r["invoke"]["stages_ms"].items())
+        print(f"{mode:<9s} completion_tokens={r['invoke']['completion_tokens']:.0f}  {stages}")
+
+    def _ms(value) -> str:
+        return "-" if value is None else f"{value:.0f}ms"
+
+    print("\nstream (검색 포함, 중앙값)")
+    print(f"{'mode':<9s} {'bullet':>8s} {'script':>8s} {'done':>8s}")
+    for mode, r in results.items():
+        s = r["stream"]
+        print(f"{mode:<9s} {_ms(s['first_bullet_ms']):>8s} {_ms(s['first_script_ms']):>8s} {_ms(s['done_ms']):>8s}")
+
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "data_dir": args.data_dir,
+            "config": {key: value for key, value in vars(args).items() if key not in ("data_dir", "out")},
+        },
+        "modes": results,
+    }
+    out = args.out or os.path.join("benchmarks", "results", f"sections-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out}")
+
+
+if __name__ == "__main__":
+    main()
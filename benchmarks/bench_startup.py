@@ -0,0 +1,219 @@
+# benchmarks/bench_startup.py
+
+"""
+CLI 시작 시간 벤치마크 - 저장된 인덱스가 최신인 상태(warm index)에서 main.py 를 새 프로세스로 실행
+
+- first_prompt : 프로세스 시작 → "question > " 입력 프롬프트가 보일 때까지 (main.py 의 빠른 시작 경로)
+- ready        : 프로세스 시작 → 인덱스 로드 + 체인 구성 완료까지 (빠른 시작 경로에서 백그라운드로 하는 일)
+- eager        : 프로세스 시작 → 파이프라인 모듈을 모두 임포트할 때까지 (모듈 최상단에서 모두 임포트하던 이전 방식의 시작 비용)
+- importtime   : python -X importtime 결과를 최상위 패키지별 자체 시간 합계로 정리 (프롬프트 전 / 파이프라인 구성)
+
+인덱스는 가짜 임베딩(HashingEmbeddings)으로 --index-dir 에 먼저 만들어 두며,
+질문에 답하지는 않으므로 OpenAI 요청은 보내지 않습니다. (OPENAI_API_KEY 가 없으면 가짜 값을 넣음)
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10 --fail-over-budget
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import selectors
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from benchmarks.bench_pipeline import _git_commit
+from benchmarks.fakes import HashingEmbeddings
+
+
+PROMPT = b"question > "
+
+# 이전 main.py 가 질문 입력 전에 임포트하던 모듈
+EAGER_MODULES = [
+    "langchain_openai",
+    "langchain_community.document_loaders",
+    "langchain_text_splitters",
+    "langchain_community.vectorstores",
+    "rag.chain",
+    "rag.async_chain",
+    "rag.vectorstore",
+    "rag.streaming",
+    "rag.answer_cache",
+    "rag.tracing",
+    "rag.rerank",
+]
+
+# 인덱스 로드 + 체인 구성 (main.py 의 BackgroundPipeline 이 하는 일과 같음)
+READY_SCRIPT = """
+import main
+args = main.parse_args([])
+main.build_pipeline(
+    data_dir={data_dir!r}, verbose=False, **main.read_chain_options(), **main.read_index_options(args)
+)
+"""
+
+
+def build_warm_index(data_dir: str, index_dir: str, dim: int, chunker: str = "layout") -> str:
+    """main.py 와 같은 설정 키로 인덱스를 만들어 둡니다. (가짜 임베딩, 네트워크 없음)"""
+    from rag.index_store import sync_vectorstore
+
+    _, report = sync_vectorstore(data_dir, index_dir=index_dir, embeddings=HashingEmbeddings(size=dim),
+                                 chunker=chunker)
+    return report.path
+
+
+def _env(data_dir: str, index_dir: str, chunker: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        DATA_DIR=data_dir,
+        INDEX_DIR=index_dir,
+        CHUNKER=chunker,
+        EMBED_CACHE="",
+        PYTHONUNBUFFERED="1",
+        PYTHONWARNINGS="ignore",
+    )
+    env.setdefault("OPENAI_API_KEY", "bench")
+    return env
+
+
+def time_first_prompt(env: Dict[str, str], timeout: float = 60.0) -> float:
+    """main.py 를 실행하여 입력 프롬프트가 출력될 때까지의 시간(초)"""
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "main.py"], env=env, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = b""
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(proc.stdout, selectors.EVENT_READ)
+            while PROMPT not in output:
+                if time.perf_counter() - started > timeout or not selector.select(timeout=timeout):
+                    raise RuntimeError(f"프롬프트가 {timeout}초 안에 나오지 않았습니다: {output[-500:]!r}")
+                chunk = os.read(proc.stdout.fileno(), 4096)
+                if not chunk:
+                    raise RuntimeError(f"main.py 가 프롬프트 전에 종료되었습니다: {output[-500:]!r}")
+                output += chunk
+        return time.perf_counter() - started
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def time_script(env: Dict[str, str], script: str) -> float:
+    """python -c script 새 프로세스 실행 시간(초, 인터프리터 시작 포함)"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", script], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def import_profile(env: Dict[str, str], script: str) -> List[Tuple[str, float]]:
+    """
+    python -X importtime 출력의 모듈별 자체 시간(self)을 최상위 패키지별로 합칩니다.
+    (누적 시간은 임포트한 쪽에 모두 잡히므로 어느 패키지가 느린지는 자체 시간으로 봄)
+    Returns: [(패키지, ms)] 내림차순
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script], env=env, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    totals: Dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+\d+ \| +(\S+)", line)
+        if match is not None:
+            totals[match.group(2).split(".")[0]] += int(match.group(1)) / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def _print_profile(title: str, profile: List[Tuple[str, float]], top: int) -> None:
+    total = sum(ms for _, ms in profile)
+    print(f"\n[importtime] {title} - 합계 {total:.0f}ms")
+    for name, ms in profile[:top]:
+        print(f"  {ms:8.1f}ms  {name}")
+
+
+def _summary(seconds: List[float]) -> Dict[str, float]:
+    return {"runs": seconds, "min_s": min(seconds), "p50_s": statistics.median(seconds), "max_s": max(seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--index-dir", default=None, help="warm index 위치 (기본값: 임시 디렉토리)")
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--chunker", default="layout", choices=["recursive", "layout"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="importtime 에서 보여 줄 패키지 수")
+    parser.add_argument("--budget", type=float, default=1.0, help="first_prompt p50 목표(초)")
+    parser.add_argument("--fail-over-budget", action="store_true")
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본값: benchmarks/results/startup-<시각>.json)")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    tmp = None
+    index_dir = args.index_dir
+    if index_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bench-startup-")
+        index_dir = tmp.name
+    path = build_warm_index(args.data_dir, index_dir, args.embedding_dim, args.chunker)
+    env = _env(os.path.abspath(args.data_dir), os.path.abspath(index_dir), args.chunker)
+    print(f"warm index: {path}")
+
+    ready_script = READY_SCRIPT.format(data_dir=os.path.abspath(args.data_dir))
+    eager_script = "import main\n" + "".join(f"import {m}\n" for m in EAGER_MODULES)
+
+    time_first_prompt(env)   # 파일 시스템 캐시 / .pyc 준비
+    results = {"first_prompt": [], "ready": [], "eager": []}
+    for _ in range(args.repeat):
+        results["first_prompt"].append(time_first_prompt(env))
+        results["ready"].append(time_script(env, ready_script))
+        results["eager"].append(time_script(env, eager_script))
+
+    print(f"\n{'stage':<14s} {'min':>7s} {'p50':>7s} {'max':>7s}")
+    for name, seconds in results.items():
+        print(f"{name:<14s} {min(seconds):6.2f}s {statistics.median(seconds):6.2f}s {max(seconds):6.2f}s")
+
+    profiles = {
+        "before_prompt": import_profile(env, "import main"),
+        "pipeline": import_profile(env, ready_script),
+    }
+    _print_profile("import main (프롬프트 전)", profiles["before_prompt"], args.top)
+    _print_profile("인덱스 로드 + 체인 구성 (백그라운드)", profiles["pipeline"], args.top)
+
+    first_prompt = statistics.median(results["first_prompt"])
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "data_dir": args.data_dir,
+            "chunker": args.chunker,
+            "repeat": args.repeat,
+        },
+        "stages": {name: _summary(seconds) for name, seconds in results.items()},
+        "importtime_ms": {name: dict(profile) for name, profile in profiles.items()},
+        "budget_s": args.budget,
+    }
+    out = args.out or os.path.join("benchmarks", "results", f"startup-{started:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {out}")
+
+    if tmp is not None:
+        tmp.cleanup()
+    if first_prompt > args.budget:
+        print(f"[WARN] first_prompt p50 {first_prompt:.2f}s > 목표 {args.budget:.2f}s")
+        if args.fail_over_budget:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
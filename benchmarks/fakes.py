@@ -0,0 +1,134 @@
+# benchmarks/fakes.py
+
+"""
+네트워크 없이 벤치마크를 돌리기 위한 가짜 임베딩 / LLM / 질문
+
+HashingEmbeddings 는 단어를 해시하여 고정 차원 벡터에 더하는 결정적인 임베딩입니다.
+(같은 단어가 많이 겹치는 텍스트일수록 코사인 유사도가 높으므로 검색 결과도 의미가 있습니다)
+latency / rate_limit_every 로 API 지연과 429 응답을 흉내낼 수 있습니다.
+
+StubLLM 은 with_structured_output() 만 흉내내어 context 의 첫 근거들로 PresentationOutput 을 만듭니다.
+make_term_queries 는 chunk 하나에만 나오는 단어를 섞어 정답 chunk 가 정해진 질문을 만듭니다.
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
+
+from rag.bm25 import tokenize
+from rag.embedding import count_tokens
+from rag.prompts import BulletPoint, PresentationOutput
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class RateLimitError(Exception):
+    """openai.RateLimitError 처럼 status_code=429 를 가진 예외"""
+    status_code = 429
+
+
+class HashingEmbeddings(Embeddings):
+
+    def __init__(self, size: int = 256, latency: float = 0.0, rate_limit_every: int = 0):
+        self.size = size
+        self.latency = latency                    # 요청 1회당 지연(초)
+        self.rate_limit_every = rate_limit_every  # N번째 요청마다 429 (0 이면 사용 안 함)
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.size, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.size] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec.tolist()
+
+    def _check_rate_limit(self) -> None:
+        self.calls += 1
+        if self.rate_limit_every and self.calls % self.rate_limit_every == 0:
+            raise RateLimitError("429 Too Many Requests (fake)")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._check_rate_limit()
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._check_rate_limit()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+_EVIDENCE = re.compile(r"^\[E\d+\] \[(?P<source>[^|\]]+) \| page (?P<page>[^\]]+)\] (?P<text>.*)$", re.MULTILINE)
+
+
+class StubLLM:
+    """
+    build_answer_chain(llm=...) 에 넣는 가짜 LLM.
+    프롬프트의 [E1]... 근거 줄에서 bullet / evidence 를 만들고, latency(초)만큼 기다립니다.
+    prompt_tokens 에 지금까지 받은 프롬프트 토큰 수를 누적합니다.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def _respond(self, prompt) -> PresentationOutput:
+        text = prompt.to_string()
+        self.calls += 1
+        self.prompt_tokens += count_tokens(text, "gpt-4o-mini")
+        evidence = [m.groupdict() for m in _EVIDENCE.finditer(text)][:3]
+        return PresentationOutput(
+            ppt_bullets=[
+                BulletPoint(content=e["text"][:80], source=e["source"].strip(), page=e["page"].strip())
+                for e in evidence
+            ],
+            script=" ".join(e["text"][:200] for e in evidence),
+            evidence=[e["text"][:120] for e in evidence],
+        )
+
+    def _invoke(self, prompt) -> PresentationOutput:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def _ainvoke(self, prompt) -> PresentationOutput:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(prompt)
+
+    def with_structured_output(self, schema, **kwargs):
+        return RunnableLambda(self._invoke, afunc=self._ainvoke, name="StubLLM")
+
+
+def make_term_queries(chunks: List[Document], n_queries: int, rng: random.Random) -> List[Tuple[str, str]]:
+    """(정답 chunk_id, 질문) 목록. 질문 = 그 chunk 에만 나오는 단어 1개 + chunk 의 단어 5개"""
+    df = Counter(tok for d in chunks for tok in set(tokenize(d.page_content)))
+    queries = []
+    for doc in chunks:
+        tokens = tokenize(doc.page_content)
+        rare = [tok for tok in tokens if df[tok] == 1 and len(tok) > 2]
+        if rare and len(tokens) > 10:
+            queries.append((doc.metadata["chunk_id"], " ".join([rng.choice(rare)] + rng.sample(tokens, 5))))
+    return rng.sample(queries, min(n_queries, len(queries)))
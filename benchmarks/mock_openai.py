@@ -0,0 +1,191 @@
+# benchmarks/mock_openai.py
+
+"""
+로컬 OpenAI 호환 가짜 서버 (POST /v1/embeddings, POST /v1/chat/completions)
+
+- 임베딩은 HashingEmbeddings 로 계산하므로 같은 차원으로 만든 로컬 인덱스와 검색 결과가 맞습니다.
+- response_format(또는 tools)이 있는 채팅 요청은 프롬프트의 [E1]... 근거로 PresentationOutput JSON 을
+  (스키마 이름이 BulletList 이면 ppt_bullets 만, rag/sections.py),
+  없는 요청 중 근거가 있는 요청(대본 생성)은 같은 근거로 만든 script 를,
+  그 외(질문 재작성 등)는 질문 단어를 소문자로 뒤집은 순서로 돌려줍니다.
+- 응답 시간 = chat_latency(첫 토큰까지) + 출력 토큰 수(4글자 = 1토큰) × token_latency.
+  "stream": true 요청은 SSE 로 토큰을 나누어 보냅니다.
+- 새 연결의 첫 요청은 connect_latency 만큼 더 기다립니다. (실제 API 의 TCP + TLS 연결 수립 비용)
+- stats 에 요청 수 / 새 연결 수를 셉니다.
+
+    python -m benchmarks.mock_openai --port 8765 --chat-latency 0.3
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks.fakes import HashingEmbeddings, StubLLM
+
+
+class _Prompt:
+    def __init__(self, text: str):
+        self.text = text
+
+    def to_string(self) -> str:
+        return self.text
+
+
+def create_mock_app(
+    embedding_size: int = 256,
+    embed_latency: float = 0.03,
+    chat_latency: float = 0.3,
+    connect_latency: float = 0.05,
+    token_latency: float = 0.0,
+    stats: Counter = None
+):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI(title="mock-openai")
+    embeddings = HashingEmbeddings(size=embedding_size)
+    stub = StubLLM()
+    stats = stats if stats is not None else Counter()
+    seen = set()
+
+    async def _connection(request: Request) -> None:
+        client = request.scope.get("client")
+        if client not in seen:
+            seen.add(client)
+            stats["connections"] += 1
+            await asyncio.sleep(connect_latency)
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(request: Request):
+        await _connection(request)
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        stats["embeddings"] += 1
+        await asyncio.sleep(embed_latency)
+        data = []
+        for i, text in enumerate(inputs):
+            vector = embeddings._embed(text if isinstance(text, str) else " ".join(map(str, text)))
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}}
+
+    def _content(body: dict, text: str) -> str:
+        tools = body.get("tools") or []
+        schema = (body.get("response_format") or {}).get("json_schema", {}).get("name")
+        if tools:
+            schema = tools[0]["function"]["name"]
+        if schema is not None or body.get("response_format"):
+            output = stub._respond(_Prompt(text))
+            if schema == "BulletList":
+                return json.dumps({"ppt_bullets": [b.model_dump() for b in output.ppt_bullets]}, ensure_ascii=False)
+            return output.model_dump_json()
+        if "[E1]" in text:
+            return stub._respond(_Prompt(text)).script
+        return " ".join(reversed(body["messages"][-1]["content"].lower().split()))
+
+    def _message(body: dict, content: str) -> dict:
+        if body.get("tools"):
+            name = body["tools"][0]["function"]["name"]
+            return {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_0", "type": "function", "function": {"name": name, "arguments": content}}]}
+        return {"role": "assistant", "content": content}
+
+    async def _stream(body: dict, content: str, usage: dict):
+        base = {"id": f"chatcmpl-{stats['chat']}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model")}
+        first = True
+        for start in range(0, len(content), 16):   # 4토큰씩
+            await asyncio.sleep(4 * token_latency)
+            piece = content[start:start + 16]
+            if body.get("tools"):
+                call = {"index": 0, "function": {"arguments": piece}}
+                if first:
+                    call.update(id="call_0", type="function")
+                    call["function"]["name"] = body["tools"][0]["function"]["name"]
+                delta = {"tool_calls": [call]}
+            else:
+                delta = {"content": piece}
+            if first:
+                delta["role"] = "assistant"
+                first = False
+            yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})}\n\n"
+        finish = "tool_calls" if body.get("tools") else "stop"
+        yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish}]})}\n\n"
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def create_chat(request: Request):
+        await _connection(request)
+        body = await request.json()
+        stats["chat"] += 1
+        await asyncio.sleep(chat_latency)
+        text = "\n".join(m["content"] for m in body["messages"] if isinstance(m.get("content"), str))
+        content = _content(body, text)
+        usage = {"prompt_tokens": len(text) // 4, "completion_tokens": len(content) // 4,
+                 "total_tokens": (len(text) + len(content)) // 4}
+        if body.get("stream"):
+            return StreamingResponse(_stream(body, content, usage), media_type="text/event-stream")
+        await asyncio.sleep(len(content) // 4 * token_latency)
+        return {
+            "id": f"chatcmpl-{stats['chat']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "tool_calls" if body.get("tools") else "stop",
+                         "message": _message(body, content)}],
+            "usage": usage,
+        }
+
+    return app
+
+
+def start_mock_server(port: int = 8765, **options):
+    """백그라운드 스레드에서 서버를 시작하고 (base_url, stats) 를 돌려줍니다."""
+    import uvicorn
+
+    stats = Counter()
+    app = create_mock_app(stats=stats, **options)
+    # 실제 API 처럼 쉬는 연결을 오래 유지 (uvicorn 기본값은 5초)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           timeout_keep_alive=300))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1", stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--embedding-size", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.03)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    parser.add_argument("--connect-latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.0, help="출력 토큰 1개당 생성 시간(초)")
+    args = parser.parse_args()
+
+    base_url, stats = start_mock_server(
+        args.port, embedding_size=args.embedding_size, embed_latency=args.embed_latency,
+        chat_latency=args.chat_latency, connect_latency=args.connect_latency, token_latency=args.token_latency
+    )
+    print(f"OPENAI_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(dict(stats))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
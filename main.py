@@ -4,25 +4,32 @@ RAG 기본 파이프라인 구현
 
 pdf 파일을 로드하여 RAG 파이프라인을 구현하기 때문에
 12장 01-RAG-Basic-PDF.ipynb를 가장 많이 참고하였습니다.
+
+빠른 시작: LangChain / OpenAI / FAISS / PyMuPDF 는 임포트에만 몇 초가 걸리므로
+여기서는 가벼운 설정 모듈만 임포트하고, 나머지는 그 단계를 실행하는 함수 안에서 임포트합니다.
+환경변수 오류는 무거운 임포트 전에 바로 보여 주고, 저장된 인덱스가 최신이면
+질문 입력을 먼저 받는 동안 인덱스 로드 / 체인 구성을 백그라운드에서 진행합니다. (BackgroundPipeline)
+
+특정 논문만 검색하려면 --paper MACS.pdf:3-5 또는 질문 입력 중 "/paper MACS:3-5" (해제: "/paper")
 """
+import argparse
 import os
 import sys
+import time
 import traceback
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional
 
-import os
 from dotenv import load_dotenv
-load_dotenv() # 01-Basic/01-OpenAI-APIKey.ipynb
 
-print("LANGSMITH_TRACING:", os.getenv("LANGSMITH_TRACING")) # 01-Basic/01-OpenAI-APIKey.ipynb
-print("LANGSMITH_PROJECT:", os.getenv("LANGSMITH_PROJECT")) # 01-Basic/01-OpenAI-APIKey.ipynb
-print("LANGSMITH_API_KEY exists:", os.getenv("LANGSMITH_API_KEY") is not None) # 01-Basic/01-OpenAI-APIKey.ipynb
+# 표준 라이브러리만 임포트하는 모듈 (rag/config.py, rag/index_store.py 의 모듈 수준)
+from rag.config import DEFAULT_CONTEXT_TOKENS, EmbeddingConfig, HttpPoolConfig
+from rag.index_store import find_fresh_index
 
-
-from rag.loader import load_pdfs_from_dir
-from rag.splitter import split_documents
-from rag.vectorstore import build_vectorstore, build_retriever
-from rag.chain import build_rag_chain
+if TYPE_CHECKING:
+    from rag.rerank import RerankConfig
+    from rag.scope import SearchScope
+    from rag.tracing import ChainTracer
 
 
 def _print_env_hint():
@@ -38,6 +45,10 @@ def _print_env_hint():
 
 def validate_env(): # 01-Basic/01-OpenAI-APIKey.ipynb
     """필수/권장 환경변수 점검"""
+    print("LANGSMITH_TRACING:", os.getenv("LANGSMITH_TRACING")) # 01-Basic/01-OpenAI-APIKey.ipynb
+    print("LANGSMITH_PROJECT:", os.getenv("LANGSMITH_PROJECT")) # 01-Basic/01-OpenAI-APIKey.ipynb
+    print("LANGSMITH_API_KEY exists:", os.getenv("LANGSMITH_API_KEY") is not None) # 01-Basic/01-OpenAI-APIKey.ipynb
+
     if not os.getenv("OPENAI_API_KEY"):
         _print_env_hint()
         raise RuntimeError("OPENAI_API_KEY가 설정되어 있지 않습니다. .env 또는 시스템 환경변수를 확인하세요.")
@@ -50,45 +61,305 @@ def validate_env(): # 01-Basic/01-OpenAI-APIKey.ipynb
 
 
 
-def ask_question() -> str:
-    """질문 입력(빈 문자열 방지)"""
+def ask_question(scope: Optional["SearchScope"] = None) -> str:
+    """질문 입력(빈 문자열 방지). 검색 범위가 지정되어 있으면 프롬프트에 표시"""
+    prompt = "question > " if scope is None else f"question [{scope}] > "
     while True:
-        q = input("question > ").strip()
+        q = input(prompt).strip()
         if q:
             return q
         print("질문이 비어 있습니다. 질문을 입력해 주세요.")
 
 
 
+def print_sync_report(report):
+    """증분 인덱싱 결과 출력"""
+    if not report.changed:
+        print(f"      변경 없음 - 저장된 인덱스 사용 ({report.path}, {len(report.unchanged)}개 파일)")
+        return
+    print(f"      추가: {len(report.added)}개 {report.added}")
+    print(f"      변경: {len(report.updated)}개 {report.updated}")
+    print(f"      삭제: {len(report.deleted)}개 {report.deleted}")
+    print(f"      유지: {len(report.unchanged)}개")
+    if report.failed:
+        print(f"      실패: {len(report.failed)}개 {report.failed} (다음 동기화에서 다시 시도)")
+    print(f"      chunk +{report.added_chunks} / -{report.deleted_chunks} → {report.path}")
+    if report.embedding is not None:
+        print(f"      임베딩: {report.embedding}")
+
+
+def load_index(
+    data_dir: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    embedding_model: str = "text-embedding-3-small",
+    index_dir: str = ".index",
+    reindex: bool = False,
+    load_workers: Optional[int] = None,
+    embedding_config: Optional[EmbeddingConfig] = None,
+    embedding_cache: Optional[str] = None,
+    index_spec: str = "Flat",
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    http_pool: Optional[HttpPoolConfig] = HttpPoolConfig(),
+    chunker: str = "recursive",
+    embedding_dimensions: Optional[int] = None,
+    use_mmap: bool = True,
+    verbose: bool = True
+    ):
+    """
+    [1/4] PDF 로드 → [2/4] 분할 → [3/4] 임베딩을 추가/변경된 PDF 에 대해서만 수행하고
+    저장된 인덱스와 합쳐 VectorStore 를 반환합니다.
+    (verbose=False: 질문 입력 중에 백그라운드에서 로드할 때 진행 상황을 출력하지 않음)
+    """
+    from rag.ann import describe_index
+    from rag.embedding_cache import CachedEmbeddings
+    from rag.index_store import sync_vectorstore
+    from rag.tracing import process_memory
+    from rag.vectorstore import get_embeddings
+
+    # 07-DocumentLoader/01-PDF-Loader.ipynb / 08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb / 10-VectorStore/02-FAISS.ipynb
+    if verbose:
+        print(f"[1-3/4] 인덱스 동기화 중... ({data_dir} → {index_dir})")
+    embeddings = get_embeddings(embedding_model, cache_path=embedding_cache, http_pool=http_pool,
+                                dimensions=embedding_dimensions)
+    vs, report = sync_vectorstore(
+        data_dir,
+        index_dir=index_dir,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        embedding_model=embedding_model,
+        reindex=reindex,
+        max_workers=load_workers,
+        embedding_config=embedding_config,
+        embeddings=embeddings,
+        index_spec=index_spec,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        chunker=chunker,
+        embedding_dimensions=embedding_dimensions,
+        use_mmap=use_mmap
+    )
+    if verbose:
+        print_sync_report(report)
+        print(f"      FAISS: {describe_index(vs.index)}")
+        if isinstance(embeddings, CachedEmbeddings):
+            print(f"      임베딩 캐시: {embeddings.stats()}")
+        memory = {kind: value / 2**20 for kind, value in process_memory().items()}
+        print("      메모리: " + ", ".join(f"{kind} {mb:.0f}MB" for kind, mb in memory.items()))
+    return vs, report
+
+
+def build_answer( # 검색 이후의 체인 ({"question", "docs"} → PresentationOutput)
+    llm,
+    answer_mode: str = "single",
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    log_context: bool = True,
+    tracer: Optional["ChainTracer"] = None
+    ):
+    """
+    answer_mode="single"   : 구조화된 출력 호출 한 번으로 bullet / script / evidence 생성 (build_answer_chain)
+    answer_mode="sections" : bullet 생성 → script 생성 + evidence 로컬 추출 (rag/sections.py)
+    """
+    if answer_mode == "sections":
+        from rag.sections import build_sectioned_answer_chain
+        return build_sectioned_answer_chain(llm=llm, context_tokens=context_tokens, log_context=log_context, tracer=tracer)
+
+    from rag.chain import build_answer_chain
+    return build_answer_chain(llm=llm, context_tokens=context_tokens, log_context=log_context, tracer=tracer)
+
+
+def build_stream_chain(
+    retriever,
+    llm,
+    answer_mode: str = "single",
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    log_context: bool = True
+    ):
+    """스트리밍 체인 (answer_mode / log_context 는 build_answer 와 같음)"""
+    if answer_mode == "sections":
+        from rag.sections import build_sectioned_streaming_chain
+        return build_sectioned_streaming_chain(retriever, llm=llm, context_tokens=context_tokens, log_context=log_context)
+
+    from rag.streaming import build_streaming_chain
+    return build_streaming_chain(retriever, llm=llm, context_tokens=context_tokens, log_context=log_context)
+
+
+def build_chain( # 질문 → PresentationOutput 체인 (build_pipeline / build_server_app 공통)
+    vs,
+    retriever,
+    index_version: str,
+    k: int = 4,
+    answer_cache: Optional[dict] = None,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    tracer: Optional["ChainTracer"] = None,
+    chain_mode: str = "lcel",
+    rewrite_timeout: Optional[float] = None,
+    http_pool: Optional[HttpPoolConfig] = HttpPoolConfig(),
+    answer_mode: str = "single",
+    log_context: bool = True
+    ):
+    """
+    chain_mode="async" : 질문 임베딩 1회 + 먼저 시작 (rag/async_chain.py). rewrite_timeout 을 주면 질문 재작성 검색을 동시에 진행
+    chain_mode="lcel"  : 기존 LCEL 체인 (build_rag_chain)
+    answer_mode        : 검색 이후의 생성 방식 (build_answer)
+    log_context        : 질문마다 context 토큰 수를 출력 (서버 모드는 끄고 tracer / /metrics 로 확인)
+    """
+    from rag.answer_cache import AnswerCache
+    from rag.async_chain import build_async_rag_chain, build_query_rewriter
+    from rag.chain import build_llm, build_rag_chain
+
+    # 답변 캐시(선택): 인덱스 버전이 바뀌면 이전 답변은 쓰지 않음
+    cache = None
+    if answer_cache is not None:
+        cache = AnswerCache(vs.embeddings, index_version=index_version, **answer_cache)
+    llm = build_llm(http_pool)
+    answer_chain = build_answer(llm, answer_mode, context_tokens=context_tokens, log_context=log_context, tracer=tracer)
+
+    if chain_mode == "lcel":
+        if rewrite_timeout:
+            print("[WARN] 질문 재작성(QUERY_REWRITE)은 CHAIN=async 에서만 사용됩니다.")
+        return build_rag_chain(retriever, answer_cache=cache, context_tokens=context_tokens, llm=llm, tracer=tracer,
+                               answer_chain=answer_chain) #12-RAG/01-RAG-Basic-PDF.ipynb
+
+    return build_async_rag_chain(
+        vs,
+        answer_chain,
+        retriever=retriever,
+        k=k,
+        answer_cache=cache,
+        rewriter=build_query_rewriter(llm) if rewrite_timeout else None,
+        rewrite_timeout=rewrite_timeout or 0.0,
+        tracer=tracer
+    )
+
+
 def build_pipeline( #12-RAG/01-RAG-Basic-PDF.ipynb
     data_dir: str,
     chunk_size: int = 1000,
     chunk_overlap: int = 200,
-    k: int = 4
+    k: int = 4,
+    answer_cache: Optional[dict] = None,
+    stream: bool = False,
+    hybrid: bool = False,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    rerank: Optional["RerankConfig"] = None,
+    tracer: Optional["ChainTracer"] = None,
+    chain_mode: str = "lcel",
+    rewrite_timeout: Optional[float] = None,
+    answer_mode: str = "single",
+    verbose: bool = True,
+    **index_options
     ):
-    print(f"[1/4] PDF 폴더 로드 중... ({data_dir})")
-    docs = load_pdfs_from_dir(data_dir) # 07-DocumentLoader/01-PDF-Loader.ipynb / 07-DocumentLoader/11-Directory-Loader.ipynb
+    from rag.chain import build_llm
+    from rag.vectorstore import build_retriever
 
-    print("[2/4] 문서 분할 중...")
-    chunks = split_documents( # 08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb
-        docs,
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
+    vs, report = load_index(data_dir, chunk_size, chunk_overlap, verbose=verbose, **index_options)
+    http_pool = index_options.get("http_pool", HttpPoolConfig())
+
+    if verbose:
+        print("[4/4] Retriever / Chain 구성 중...")
+    retriever = build_retriever(vs, k=k, bm25=report.bm25 if hybrid else None, rerank=rerank) # 11-Retriever/01-VectorStoreRetriever.ipynb
+
+    if stream:
+        # 스트리밍 모드는 부분 결과를 바로 출력하므로 답변 캐시를 거치지 않음
+        return build_stream_chain(retriever, build_llm(http_pool), answer_mode, context_tokens=context_tokens)
+
+    return build_chain(
+        vs, retriever, report.version, k=k, answer_cache=answer_cache, context_tokens=context_tokens,
+        tracer=tracer, chain_mode=chain_mode, rewrite_timeout=rewrite_timeout, http_pool=http_pool,
+        answer_mode=answer_mode
     )
 
-    print("[3/4] 벡터스토어 생성 중...")
-    vs = build_vectorstore(chunks) #10-VectorStore 
+
+def build_server_app( # 서버 모드: 인덱스 / 체인을 한 번만 구성하여 모든 요청이 공유
+    data_dir: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    k: int = 4,
+    answer_cache: Optional[dict] = None,
+    max_concurrency: int = 8,
+    max_queue: int = 64,
+    hybrid: bool = False,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    rerank: Optional["RerankConfig"] = None,
+    tracer: Optional["ChainTracer"] = None,
+    chain_mode: str = "lcel",
+    rewrite_timeout: Optional[float] = None,
+    answer_mode: str = "single",
+    **index_options
+    ):
+    from rag.chain import build_llm
+    from rag.server import create_app
+    from rag.vectorstore import build_retriever
+
+    vs, report = load_index(data_dir, chunk_size, chunk_overlap, **index_options)
+    http_pool = index_options.get("http_pool", HttpPoolConfig())
 
     print("[4/4] Retriever / Chain 구성 중...")
-    retriever = build_retriever(vs, k=k) # 11-Retriever/01-VectorStoreRetriever.ipynb
-    chain = build_rag_chain(retriever) #12-RAG/01-RAG-Basic-PDF.ipynb
+    retriever = build_retriever(vs, k=k, bm25=report.bm25 if hybrid else None, rerank=rerank) # 11-Retriever/01-VectorStoreRetriever.ipynb
+    chain = build_chain(
+        vs, retriever, report.version, k=k, answer_cache=answer_cache, context_tokens=context_tokens,
+        tracer=tracer, chain_mode=chain_mode, rewrite_timeout=rewrite_timeout, http_pool=http_pool,
+        answer_mode=answer_mode, log_context=False
+    )
+    # 요청마다 [CONTEXT] 줄을 출력하지 않음 (토큰 수는 tracer 가 /metrics 에 기록)
+    stream_chain = build_stream_chain(retriever, build_llm(http_pool), answer_mode, context_tokens=context_tokens,
+                                      log_context=False)
+
+    return create_app(
+        chain,
+        stream_chain=stream_chain,
+        max_concurrency=max_concurrency,
+        max_queue=max_queue,
+        info={"index_version": report.version, "chunks": vs.index.ntotal},
+        metrics=tracer.metrics if tracer is not None else None
+    )
+
+
+def run_batch_file( # 배치 모드: 질문 파일 → 결과 JSONL
+    data_dir: str,
+    questions_path: str,
+    out_path: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    k: int = 4,
+    max_concurrency: int = 8,
+    hybrid: bool = False,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    rerank: Optional["RerankConfig"] = None,
+    scope: Optional["SearchScope"] = None,
+    answer_mode: str = "single",
+    **index_options
+    ):
+    from rag.batch import read_questions, run_batch
+    from rag.chain import build_llm
+    from rag.vectorstore import build_retriever
+
+    questions = read_questions(questions_path)
+    vs, index_report = load_index(data_dir, chunk_size, chunk_overlap, **index_options)
+    retriever = None
+    if hybrid or rerank is not None:
+        retriever = build_retriever(vs, k=k, bm25=index_report.bm25 if hybrid else None, rerank=rerank)
+
+    if scope is not None:
+        print(f"[BATCH] 검색 범위: {scope}")
+    print(f"[BATCH] 질문 {len(questions)}개 처리 중... (동시 {max_concurrency}개, 결과: {out_path})")
+    report = run_batch(
+        build_answer(build_llm(index_options.get("http_pool", HttpPoolConfig())), answer_mode,
+                     context_tokens=context_tokens, log_context=False),
+        vs, questions, out_path,
+        k=k, max_concurrency=max_concurrency, retriever=retriever, scope=scope
+    )
 
-    return chain
+    print(f"[BATCH] 완료: 성공 {report.questions - report.failed} / 실패 {report.failed}")
+    for line in report.lines():
+        print(f"      {line}")
 
 
-def run_once(chain):
-    """사용자 입력 1회 실행"""
-    question = ask_question()
+def run_once(chain, tracer: Optional["ChainTracer"] = None, question: Optional[str] = None):
+    """사용자 입력 1회 실행 (question 을 주면 입력을 받지 않음)"""
+    question = question or ask_question()
 
     print("\n[RUN] RAG 실행 중...\n")
 
@@ -110,14 +381,214 @@ def run_once(chain):
     for i, evidence in enumerate(result.evidence, 1):
         print(f"{i}. {evidence}")
     
-    print("\n============================\n")
+    print("\n============================")
+    if tracer is not None and tracer.last is not None:
+        print(f"[TRACE] {tracer.last.summary()}")
+    print()
 
 
+def stream_once(chain, question: Optional[str] = None):
+    """사용자 입력 1회 실행 (스트리밍: bullet → script → evidence 순서로 도착하는 대로 출력)"""
+    from rag.streaming import iter_presentation_events
+
+    question = question or ask_question()
+
+    print("\n[RUN] RAG 실행 중... (stream)\n")
+
+    started = time.perf_counter()
+    timings = {}
+
+    def _partials():
+        for partial in chain.stream({"question": question}): # 01-Basic/03-LCEL.Ipynb
+            timings.setdefault("first_token", time.perf_counter() - started)
+            yield partial
+
+    print("========== RESULT ==========\n")
+    print("[PPT]")
+    section = "ppt"
+    evidence_no = 0
+    for kind, value in iter_presentation_events(_partials()):
+        if kind == "bullet":
+            timings.setdefault("first_bullet", time.perf_counter() - started)
+            print(f"- {value.get('content', '')} [{value.get('source', '?')} | page {value.get('page', '?')}]")
+        elif kind == "script":
+            if section != "script":
+                section = "script"
+                print("\n[SCRIPT]")
+            print(value, end="", flush=True)
+        elif kind == "evidence":
+            if section != "evidence":
+                section = "evidence"
+                print("\n\n[EVIDENCE]")
+            evidence_no += 1
+            print(f"{evidence_no}. {value}")
+
+    total = time.perf_counter() - started
+    print("\n============================")
+    print(f"[TIME] 첫 토큰 {timings.get('first_token', total):.2f}s / "
+          f"첫 bullet {timings.get('first_bullet', total):.2f}s / 전체 {total:.2f}s\n")
+
+
+
+
+def _pin_paper(text: str) -> Optional["SearchScope"]:
+    """/paper 명령: "이름[:페이지]" 이면 검색 범위 지정, 빈 문자열이면 해제"""
+    from rag.scope import ScopeError, SearchScope
+
+    if not text:
+        print("[SCOPE] 전체 논문을 검색합니다.\n")
+        return None
+    try:
+        scope = SearchScope.parse(text)
+    except ScopeError as e:
+        print(f"[WARN] {e}\n")
+        return None
+    print(f"[SCOPE] {scope} 만 검색합니다.\n")
+    return scope
+
+
+def _run_scoped(chain, tracer, question: str, scope: Optional["SearchScope"], stream: bool):
+    """검색 범위(use_scope) 안에서 질문 1회 실행. 인덱스에 없는 논문이면 범위를 해제하여 None 을 반환"""
+    from rag.scope import ScopeError, use_scope
+
+    try:
+        with use_scope(scope):
+            if stream:
+                stream_once(chain, question)
+            else:
+                run_once(chain, tracer, question)
+    except ScopeError as e:
+        print(f"\n[WARN] {e}")
+        print("[WARN] 검색 범위를 해제합니다. /paper <이름> 으로 다시 지정하세요.\n")
+        return None
+    return scope
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="논문 세미나 발표용 RAG")
+    parser.add_argument("--sync", action="store_true",
+                        help="DATA_DIR 변경분(추가/변경/삭제)만 인덱스에 반영하고 결과를 출력한 뒤 종료")
+    parser.add_argument("--reindex", action="store_true",
+                        help="저장된 인덱스를 버리고 전체를 다시 임베딩")
+    parser.add_argument("--stream", action="store_true",
+                        help="결과를 생성되는 대로 출력 (첫 bullet 까지의 시간 / 전체 시간 표시)")
+    parser.add_argument("--serve", action="store_true",
+                        help="HTTP 서버 모드 (/ask, /ask/stream, /healthz)")
+    parser.add_argument("--batch", metavar="QUESTIONS",
+                        help="질문 파일(.jsonl 또는 줄마다 질문 하나)을 일괄 처리")
+    parser.add_argument("--out", default="results.jsonl",
+                        help="--batch 결과 JSONL 경로 (끝나는 순서대로 기록)")
+    parser.add_argument("--paper", metavar="NAME[:PAGES]", default=os.getenv("PAPER"),
+                        help="이 논문(페이지 범위)만 검색. 예: MACS.pdf, MACS:3-5 (대화 중에는 /paper 로 변경)")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    return parser.parse_args(argv)
+
+
+class BackgroundPipeline:
+    """
+    저장된 인덱스가 최신일 때의 빠른 시작 경로
+
+    인덱스 로드 / 체인 구성(무거운 임포트 포함)을 백그라운드 스레드에서 시작하고,
+    그동안 사용자가 첫 질문을 입력합니다. 질문이 들어왔을 때 아직 구성 중이면 끝날 때까지 기다립니다.
+    """
+
+    def __init__(self, build: Callable[[], tuple]):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+        self._future = executor.submit(build)
+        executor.shutdown(wait=False)
+
+    def result(self) -> tuple:
+        if not self._future.done():
+            print("[WAIT] 인덱스 로드 / 체인 구성이 끝나기를 기다리는 중...")
+        return self._future.result()
+
+
+def read_index_options(args) -> dict:
+    """인덱스 / 임베딩 관련 옵션 (가벼운 설정 클래스만 사용하므로 질문 입력 전에 읽음)"""
+    index_dir = os.getenv("INDEX_DIR", ".index")
+    return dict(
+        embedding_model=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+        index_dir=index_dir,
+        reindex=args.reindex,
+        load_workers=int(os.getenv("LOAD_WORKERS")) if os.getenv("LOAD_WORKERS") else None,
+        embedding_config=EmbeddingConfig(
+            max_batch_tokens=int(os.getenv("EMBED_BATCH_TOKENS", "20000")),
+            concurrency=int(os.getenv("EMBED_CONCURRENCY", "4"))
+        ),
+        # 빈 문자열로 설정하면 임베딩 캐시 사용 안 함
+        embedding_cache=os.getenv("EMBED_CACHE", os.path.join(index_dir, "embeddings.sqlite")),
+        # text-embedding-3-* 축소 차원 (예: 512, 비우면 모델 기본 차원)
+        embedding_dimensions=int(os.getenv("EMBEDDING_DIMENSIONS")) if os.getenv("EMBEDDING_DIMENSIONS") else None,
+        # FAISS 인덱스 종류 (Flat / SQfp16 / SQ8 / IVF,Flat / HNSW32 / IVF,PQ16 ...) 와 검색 시점 파라미터
+        index_spec=os.getenv("INDEX_SPEC", "Flat"),
+        nprobe=int(os.getenv("NPROBE")) if os.getenv("NPROBE") else None,
+        ef_search=int(os.getenv("EF_SEARCH")) if os.getenv("EF_SEARCH") else None,
+        # 분할 방식: recursive(기본, 기존 RecursiveCharacterTextSplitter, rag/splitter.py 의 DEFAULT_CHUNKER)
+        # / layout(PyMuPDF 블록 기반 문단 / 문장 단위, rag/layout.py). 바꾸면 인덱스를 새로 만듦
+        chunker=os.getenv("CHUNKER", "recursive"),
+        # 바뀐 것이 없는 인덱스를 mmap 으로 열기 (여러 프로세스가 벡터 / chunk 텍스트 페이지를 공유). 0 이면 메모리로 읽음
+        use_mmap=os.getenv("INDEX_MMAP", "1") != "0",
+        # 임베딩 / LLM 이 함께 쓰는 HTTP 연결 풀 (rag/http_pool.py)
+        http_pool=HttpPoolConfig(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "32")),
+            max_keepalive_connections=int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", "16")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))
+        )
+    )
+
+
+def read_chain_options() -> dict:
+    """검색 / 재순위 / 체인 / 추적 / 답변 캐시 옵션 (RerankConfig / ChainTracer 임포트 포함)"""
+    from rag.rerank import RerankConfig
+    from rag.tracing import ChainTracer
+
+    # 재순위: none(기본) / mmr(후보 over-fetch 후 MMR). RERANK=mmr 에서 RERANK_MODEL 을 지정하면 Cross-Encoder 도 사용
+    rerank = None
+    if os.getenv("RERANK", "none").lower() != "none":
+        rerank = RerankConfig(
+            fetch_k=int(os.getenv("RERANK_FETCH_K", "20")),
+            lambda_mult=float(os.getenv("RERANK_LAMBDA", "0.7")),
+            cross_encoder=os.getenv("RERANK_MODEL") or None,
+            budget_ms=float(os.getenv("RERANK_BUDGET_MS", "50"))
+        )
+
+    # 단계별 시간 / 토큰 / 캐시 적중 기록 (TRACE=false 로 끔). TRACE_FILE 을 지정하면 질문마다 JSONL 한 줄
+    tracer = None
+    if os.getenv("TRACE", "true").lower() != "false":
+        tracer = ChainTracer(trace_path=os.getenv("TRACE_FILE") or None)
+
+    # 답변 캐시는 선택 사항 (ANSWER_CACHE=true)
+    answer_cache = None
+    if os.getenv("ANSWER_CACHE", "").lower() == "true":
+        answer_cache = dict(
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600))),
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+        )
+
+    return dict(
+        # 검색 방식: dense(기본, 기존 FAISS top-k) / hybrid(dense + BM25, RETRIEVER=hybrid)
+        hybrid=os.getenv("RETRIEVER", "dense").lower() == "hybrid",
+        # context 토큰 예산 (format_docs → rag/context.py)
+        context_tokens=int(os.getenv("CONTEXT_TOKENS", str(DEFAULT_CONTEXT_TOKENS))),
+        rerank=rerank,
+        tracer=tracer,
+        answer_cache=answer_cache,
+        # 체인: lcel(기본, 기존 build_rag_chain) / async(질문 임베딩 1회 + 먼저 시작, CHAIN=async).
+        # CHAIN=async 에서 QUERY_REWRITE=true 면 질문 재작성 검색을 동시에 진행
+        chain_mode=os.getenv("CHAIN", "lcel").lower(),
+        rewrite_timeout=float(os.getenv("REWRITE_TIMEOUT", "1.5"))
+        if os.getenv("QUERY_REWRITE", "").lower() == "true" else None,
+        # 생성 방식: single(기본, 구조화된 출력 1회) / sections(bullet → script 스트리밍 + evidence 로컬 추출, rag/sections.py)
+        answer_mode=os.getenv("ANSWER_MODE", "single").lower()
+    )
 
 
 def main():
-    load_dotenv()  # .env 자동 로드
-    validate_env()
+    load_dotenv()  # .env 자동 로드 (01-Basic/01-OpenAI-APIKey.ipynb) - PAPER / HOST / PORT 기본값보다 먼저
+    args = parse_args()
+    validate_env()  # 무거운 모듈을 임포트하기 전에 확인
 
     # 기본 데이터 경로 (필요하면 환경변수 DATA_DIR로 변경 가능)
     data_dir = os.getenv("DATA_DIR", "data")
@@ -126,28 +597,143 @@ def main():
     chunk_size = int(os.getenv("CHUNK_SIZE", "1000"))
     chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200"))
     top_k = int(os.getenv("TOP_K", "4"))
-
-    try:
+    index_options = read_index_options(args)
+
+    scope = None
+    if args.paper:
+        from rag.scope import ScopeError, SearchScope
+        try:
+            scope = SearchScope.parse(args.paper)
+        except ScopeError as e:
+            print(f"[ERROR] --paper: {e}")
+            sys.exit(1)
+
+    if args.sync:
+        try:
+            load_index(data_dir, chunk_size, chunk_overlap, **index_options)
+        except Exception as e:
+            print("\n[ERROR] 인덱스 동기화 중 오류가 발생했습니다.")
+            print(f"원인: {e}")
+            traceback.print_exc()
+            sys.exit(1)
+        return
+
+    if args.batch:
+        try:
+            options = read_chain_options()
+            run_batch_file(
+                data_dir,
+                args.batch,
+                args.out,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                k=top_k,
+                max_concurrency=int(os.getenv("BATCH_CONCURRENCY", "8")),
+                hybrid=options["hybrid"],
+                context_tokens=options["context_tokens"],
+                rerank=options["rerank"],
+                scope=scope,
+                answer_mode=options["answer_mode"],
+                **index_options
+            )
+        except Exception as e:
+            print("\n[ERROR] 배치 실행 중 오류가 발생했습니다.")
+            print(f"원인: {e}")
+            print("\n[TRACEBACK]")
+            traceback.print_exc()
+            sys.exit(1)
+        return
+
+    if args.serve:
+        from rag.server import serve
+
+        if scope is not None:
+            print("[WARN] 서버 모드에서는 --paper 를 사용하지 않습니다. 요청마다 paper / first_page / last_page 를 지정하세요.")
+
+        try:
+            app = build_server_app(
+                data_dir=data_dir,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                k=top_k,
+                max_concurrency=int(os.getenv("SERVER_MAX_CONCURRENCY", "8")),
+                max_queue=int(os.getenv("SERVER_MAX_QUEUE", "64")),
+                **read_chain_options(),
+                **index_options
+            )
+        except Exception as e:
+            print("\n[ERROR] 파이프라인 구성 중 오류가 발생했습니다.")
+            print(f"원인: {e}")
+            print("\n[TRACEBACK]")
+            traceback.print_exc()
+            sys.exit(1)
+
+        print(f"\n[READY] http://{args.host}:{args.port} (POST /ask, POST /ask/stream, GET /healthz, GET /metrics)")
+        serve(app, host=args.host, port=args.port)
+        return
+
+    def _build(verbose: bool = True):
+        options = read_chain_options()
         chain = build_pipeline(
             data_dir=data_dir,
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
-            k=top_k
+            k=top_k,
+            stream=args.stream,
+            verbose=verbose,
+            **options,
+            **index_options
         )
-    except Exception as e:
-        print("\n[ERROR] 파이프라인 구성 중 오류가 발생했습니다.")
-        print(f"원인: {e}")
-        print("\n[TRACEBACK]")
-        traceback.print_exc()
-        sys.exit(1)
+        return chain, options["tracer"]
+
+    # 저장된 인덱스가 최신이면(manifest 만 확인) 질문 입력을 먼저 받고 로드는 백그라운드에서 진행
+    fresh = None
+    if not args.reindex:
+        try:
+            fresh = find_fresh_index(
+                data_dir, index_options["index_dir"], chunk_size, chunk_overlap,
+                index_options["embedding_model"], index_options["index_spec"], index_options["chunker"],
+                index_options["embedding_dimensions"]
+            )
+        except Exception:
+            fresh = None   # DATA_DIR 오류 등은 아래 일반 경로에서 보고
+
+    pipeline = None
+    if fresh is not None:
+        print(f"[1-4/4] 저장된 인덱스 사용 ({fresh}) - 로드 / 체인 구성은 질문을 입력하는 동안 진행")
+        pipeline = BackgroundPipeline(lambda: _build(verbose=False))
+    else:
+        try:
+            chain, tracer = _build()
+        except Exception as e:
+            print("\n[ERROR] 파이프라인 구성 중 오류가 발생했습니다.")
+            print(f"원인: {e}")
+            print("\n[TRACEBACK]")
+            traceback.print_exc()
+            sys.exit(1)
 
     print("\n[READY] 질문을 입력하면 'ppt/script' 모드로 답변합니다.")
+    print("특정 논문만 검색: /paper MACS.pdf:3-5 (해제: /paper)")
     print("종료하려면 Ctrl+C\n")
 
     try:
         while True:
-            run_once(chain)
-    except KeyboardInterrupt:
+            question = ask_question(scope)
+            if question.split()[0] == "/paper":
+                scope = _pin_paper(question[len("/paper"):].strip())
+                continue
+            if pipeline is not None:
+                try:
+                    chain, tracer = pipeline.result()
+                except Exception as e:
+                    print("\n[ERROR] 파이프라인 구성 중 오류가 발생했습니다.")
+                    print(f"원인: {e}")
+                    print("\n[TRACEBACK]")
+                    traceback.print_exc()
+                    sys.exit(1)
+                pipeline = None
+            scope = _run_scoped(chain, tracer, question, scope, args.stream)
+    except (KeyboardInterrupt, EOFError):
         print("\n[EXIT] 종료합니다.")
     except Exception as e:
         print("\n[ERROR] 실행 중 오류가 발생했습니다.")
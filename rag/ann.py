@@ -0,0 +1,221 @@
+# rag/ann.py
+
+"""
+근사 최근접 이웃(ANN) 인덱스 선택 - Flat / IVF-Flat / HNSW / IVF-PQ
+
+10-VectorStore/02-FAISS.ipynb - FAISS 벡터스토어
+
+FAISS.from_documents 는 항상 IndexFlatL2(전수 검색)를 만듭니다.
+chunk 가 많아지면 질문마다 모든 벡터와 거리를 계산하고, chunk 마다 float32 벡터 전체를 메모리에 둡니다.
+여기서는 faiss.index_factory 문자열로 인덱스 종류를 지정합니다.
+
+- "Flat"          : 전수 검색 (기본값, 정확)
+- "IVF,Flat"      : 군집(nlist)으로 나누어 nprobe 개 군집만 검색. nlist 를 생략하면 chunk 수로 자동 결정
+- "HNSW32"        : 그래프 기반 검색. efSearch 가 클수록 정확하고 느림 (학습 불필요)
+- "IVF,PQ16"      : IVF + Product Quantization. 벡터를 16바이트로 압축하여 메모리 절약
+- "SQfp16"        : 전수 검색 + 성분마다 float16 (메모리 1/2, 정확도 거의 그대로)
+- "SQ8"           : 전수 검색 + 성분마다 8bit 정수 (메모리 1/4, 성분별 최소/최대값 학습)
+                    "IVF,SQ8" / "HNSW32,SQ8" 처럼 다른 인덱스의 벡터 저장 방식으로도 사용 가능
+
+학습이 필요한 인덱스는 전체 벡터 중 표본(기본: 군집당 64개, 최소 16384개)으로만 학습합니다.
+chunk 수가 학습에 필요한 수보다 적으면 Flat 으로 대신 만듭니다.
+"""
+
+import re
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from rag.config import DEFAULT_INDEX_SPEC, is_flat_spec
+
+if TYPE_CHECKING:
+    import faiss
+
+# faiss 는 임포트가 느려서 (main.py 빠른 시작 경로에서 rag/index_store.py 가 이 모듈을 읽음)
+# 인덱스를 실제로 다루는 함수 안에서 임포트합니다.
+
+# faiss 권장: 군집(또는 PQ 코드북 항목) 하나당 최소 39개의 학습 벡터
+_MIN_POINTS_PER_CENTROID = 39
+
+# IVF 인덱스를 다시 학습하는 기준: 벡터 수(또는 그에 맞는 nlist)가 학습 당시의 이 배수 이상
+RETRAIN_GROWTH = 2.0
+
+
+def is_pq_spec(spec: Optional[str]) -> bool:
+    """PQ 압축 인덱스 (저장된 벡터가 원래 벡터의 근사값)"""
+    return bool(spec) and re.search(r"PQ\d+", spec.replace(" ", "")) is not None
+
+
+def is_flat_index(index: "faiss.Index") -> bool:
+    import faiss
+
+    return isinstance(index, faiss.IndexFlat)
+
+
+def supports_remove(index: "faiss.Index") -> bool:
+    """벡터를 지우고 위치 번호를 앞으로 당기는 인덱스 (Flat / SQ / PQ 전수 검색 = IndexFlatCodes 계열)"""
+    import faiss
+
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+def resolve_index_spec(spec: str, n_vectors: int) -> str:
+    """
+    "IVF,..." 처럼 nlist 를 생략한 spec 에 chunk 수 기반 nlist(≈ 4√n)를 채우고,
+    학습 벡터가 부족하면 nlist 를 줄이거나 Flat 으로 바꿉니다.
+    """
+    if is_flat_spec(spec):
+        return DEFAULT_INDEX_SPEC
+    requested = spec
+    spec = spec.replace(" ", "")
+
+    match = re.match(r"^IVF(\d*)(?=,)", spec)
+    if match:
+        nlist = int(match.group(1)) if match.group(1) else int(4 * np.sqrt(n_vectors))
+        nlist = min(nlist, n_vectors // _MIN_POINTS_PER_CENTROID)
+        if nlist < 1:
+            print(f"[WARN] chunk {n_vectors}개로는 {requested} 를 학습할 수 없어 Flat 인덱스를 사용합니다.")
+            return DEFAULT_INDEX_SPEC
+        spec = f"IVF{nlist}" + spec[match.end():]
+
+    # PQ 코드북(기본 8bit = 256개 항목) 학습에 필요한 최소 벡터 수
+    if re.search(r"PQ\d+", spec) and n_vectors < 256:
+        print(f"[WARN] chunk {n_vectors}개로는 {requested} 를 학습할 수 없어 Flat 인덱스를 사용합니다.")
+        return DEFAULT_INDEX_SPEC
+    return spec
+
+
+def build_ann_index(
+    vectors: np.ndarray,
+    spec: str,
+    metric: Optional[int] = None,
+    train_size: Optional[int] = None,
+    seed: int = 0
+) -> "faiss.Index":
+    """
+    vectors (n, d) 로 spec 에 맞는 인덱스를 만듭니다. (학습은 최대 train_size 개 표본으로, metric 기본값은 L2)
+    """
+    import faiss
+
+    if metric is None:
+        metric = faiss.METRIC_L2
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    spec = resolve_index_spec(spec, len(vectors))
+    index = faiss.index_factory(vectors.shape[1], spec, metric)
+    if not index.is_trained:
+        if train_size is None:
+            match = re.match(r"^IVF(\d+)", spec)
+            train_size = max(64 * int(match.group(1)) if match else 0, 16384)
+        sample = vectors
+        if len(vectors) > train_size:
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(len(vectors), train_size, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    return index
+
+
+def needs_retrain(
+    index: "faiss.Index",
+    spec: str,
+    n_vectors: int,
+    trained_size: Optional[int] = None
+) -> bool:
+    """
+    IVF 인덱스가 벡터 n_vectors 개가 된 뒤에도 그대로 써도 되는지 판단합니다. (다시 학습해야 하면 True)
+
+    IVF 는 학습할 때의 벡터 수로 군집 수(nlist)를 정하므로, 증분 추가만 하면 군집 하나의 벡터가 계속 늘어
+    nprobe 개 군집을 훑는 검색이 느려지고 recall 도 spec 이 의도한 값에서 멀어집니다.
+    - trained_size(학습 당시 벡터 수)의 RETRAIN_GROWTH 배 이상으로 늘었거나
+    - n_vectors 로 정한 nlist(resolve_index_spec)가 현재 nlist 의 RETRAIN_GROWTH 배 이상이면 다시 학습합니다.
+      (trained_size 를 기록하지 않은 이전 인덱스도 이 기준으로 판단)
+    """
+    import faiss
+
+    if not _has_ivf(index):
+        return False
+    if trained_size and n_vectors >= RETRAIN_GROWTH * trained_size:
+        return True
+    match = re.match(r"^IVF(\d+)", resolve_index_spec(spec, n_vectors))
+    return match is not None and int(match.group(1)) >= RETRAIN_GROWTH * faiss.extract_index_ivf(index).nlist
+
+
+def convert_vectorstore(vectorstore: "FAISS", spec: str, train_size: Optional[int] = None) -> "FAISS": # 10-VectorStore/02-FAISS.ipynb
+    """
+    Flat 인덱스로 만들어진 VectorStore 의 인덱스를 spec 인덱스로 바꿉니다.
+    (벡터 순서가 그대로이므로 index_to_docstore_id / docstore 는 그대로 사용)
+    """
+    if is_flat_spec(spec) or not is_flat_index(vectorstore.index):
+        return vectorstore
+    flat = vectorstore.index
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    vectorstore.index = build_ann_index(vectors, spec, metric=flat.metric_type, train_size=train_size)
+    return vectorstore
+
+
+def set_search_params(index: "faiss.Index", nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """질문 시점의 정확도/속도 조절: IVF 는 nprobe, HNSW 는 efSearch"""
+    import faiss
+
+    params = faiss.ParameterSpace()
+    if nprobe is not None and _has_ivf(index):
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search is not None and _has_hnsw(index):
+        params.set_index_parameter(index, "efSearch", ef_search)
+
+
+def _has_ivf(index: "faiss.Index") -> bool:
+    import faiss
+
+    try:
+        faiss.extract_index_ivf(index)
+        return True
+    except RuntimeError:
+        return False
+
+
+def _has_hnsw(index: "faiss.Index") -> bool:
+    import faiss
+
+    return isinstance(faiss.downcast_index(index), faiss.IndexHNSW)
+
+
+def reconstruct_vectors(index: "faiss.Index", positions: np.ndarray) -> Optional[np.ndarray]:
+    """
+    인덱스에 저장된 벡터를 위치 번호로 꺼냅니다. (다시 임베딩하지 않음)
+    IVF 계열은 처음 한 번 direct map 을 만들고, PQ 는 압축된 근사 벡터를 돌려줍니다.
+    꺼낼 수 없는 인덱스이면 None
+    """
+    import faiss
+
+    positions = np.asarray(positions, dtype=np.int64)
+    try:
+        return index.reconstruct_batch(positions)
+    except RuntimeError:
+        if not _has_ivf(index):
+            return None
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+        return index.reconstruct_batch(positions)
+    except RuntimeError:
+        return None
+
+
+def index_memory_bytes(index: "faiss.Index") -> int:
+    """인덱스 직렬화 크기 (메모리 사용량의 근사값)"""
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def describe_index(index: "faiss.Index") -> str:
+    import faiss
+
+    index = faiss.downcast_index(index)
+    desc = f"{type(index).__name__} ntotal={index.ntotal}"
+    if _has_ivf(index):
+        ivf = faiss.extract_index_ivf(index)
+        desc += f" nlist={ivf.nlist} nprobe={ivf.nprobe}"
+    if isinstance(index, faiss.IndexHNSW):
+        desc += f" efSearch={index.hnsw.efSearch}"
+    return desc
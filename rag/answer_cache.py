@@ -0,0 +1,267 @@
+# rag/answer_cache.py
+
+"""
+의미 기반 답변 캐시 (build_rag_chain 앞단, 선택 사항)
+
+같은 논문에 대해 같은(또는 거의 같은) 질문이 반복되면
+검색 → 프롬프트 → gpt-4o-mini 구조화 출력 전체를 다시 실행하지 않고 저장된 PresentationOutput 을 돌려줍니다.
+
+조회 순서
+1. 정확히 같은 질문(공백/대소문자 정규화) + 같은 인덱스 버전 → 네트워크 호출 없이 바로 반환
+2. 질문 임베딩 → 그 벡터로 검색 (임베딩은 질문당 한 번) → 검색 결과(chunk ID 집합)가 저장 당시와 같고,
+   코사인 유사도가 threshold 이상인 질문이 있으면 반환
+3. 둘 다 아니면 체인을 실행하고 결과를 저장
+
+- 인덱스 버전(index_store.compute_index_version)이 바뀌면 이전 항목은 모두 무효입니다.
+- ttl(초)이 지난 항목과 max_entries 를 넘는 오래된 항목(LRU)은 삭제됩니다.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda # 13-LangChain-Expression-Language/03-RunnableLambda.ipynb
+
+from rag.batch import retrieve_by_vectors
+from rag.embedding_cache import normalize_text
+from rag.scope import current_scope
+from rag.tracing import ChainTracer, annotate
+
+
+@dataclass
+class _Entry:
+    question: str
+    vector: np.ndarray
+    evidence: FrozenSet[str]
+    output: object
+    created: float
+
+
+def evidence_key(docs: List[Document]) -> FrozenSet[str]:
+    """검색 결과를 chunk ID 집합으로 변환 (chunk_id 가 없으면 출처/페이지/본문으로 대신)"""
+    return frozenset(
+        d.metadata.get("chunk_id")
+        or f'{d.metadata.get("source")}|{d.metadata.get("page")}|{hash(d.page_content)}'
+        for d in docs
+    )
+
+
+class AnswerCache:
+    """
+    Parameters
+    ----------
+    embeddings : Embeddings
+        질문 임베딩에 사용할 모델 (검색과 같은 모델이어야 임베딩 캐시를 공유)
+    index_version : str
+        현재 인덱스 버전. 다르면 캐시 항목을 쓰지 않습니다.
+    threshold : float
+        의미 기반 적중으로 인정할 코사인 유사도 하한
+    ttl : Optional[float]
+        항목 유효 시간(초). None 이면 만료 없음
+    max_entries : int
+        최대 항목 수 (넘으면 가장 오래 사용되지 않은 항목부터 삭제)
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        index_version: str = "",
+        threshold: float = 0.95,
+        ttl: Optional[float] = 24 * 3600,
+        max_entries: int = 1000
+    ):
+        self.embeddings = embeddings
+        self.index_version = index_version
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+
+    def set_index_version(self, index_version: str) -> None:
+        """인덱스가 바뀌면 (예: --sync 이후) 모든 항목을 비웁니다."""
+        with self._lock:
+            if index_version != self.index_version:
+                self._entries.clear()
+                self.index_version = index_version
+
+    @staticmethod
+    def _key(question: str) -> str:
+        # 같은 질문이라도 검색 범위(use_scope)가 다르면 다른 항목
+        key = normalize_text(question).lower()
+        scope = current_scope()
+        return key if scope is None else f"{key} @{scope}"
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl is not None and now - entry.created > self.ttl
+
+    def get_exact(self, question: str):
+        """정확히 같은 질문이면 저장된 출력을 반환 (네트워크 호출 없음)"""
+        key = self._key(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, time.time()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.output
+
+    def get_similar(self, vector: np.ndarray, evidence: FrozenSet[str]):
+        """검색 결과가 같고 유사도가 threshold 이상인 질문의 출력을 반환"""
+        now = time.time()
+        best: Tuple[float, Optional[str]] = (self.threshold, None)
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if self._expired(entry, now):
+                    del self._entries[key]
+                    continue
+                if entry.evidence != evidence:
+                    continue
+                score = float(np.dot(vector, entry.vector))
+                if score >= best[0]:
+                    best = (score, key)
+            if best[1] is None:
+                return None
+            self._entries.move_to_end(best[1])
+            self.semantic_hits += 1
+            return self._entries[best[1]].output
+
+    def put(self, question: str, vector: np.ndarray, evidence: FrozenSet[str], output) -> None:
+        with self._lock:
+            key = self._key(question)
+            self._entries[key] = _Entry(question, vector, evidence, output, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, vector: List[float], docs: List[Document]):
+        """
+        이미 계산한 질문 임베딩 / 검색 결과로 의미 기반 조회 (rag/async_chain.py 처럼 임베딩을 한 번만 하는 경우)
+
+        Returns
+        -------
+        (저장된 출력 또는 None, put() 에 넘길 정규화 벡터, put() 에 넘길 evidence)
+        """
+        unit = self._unit(vector)
+        evidence = evidence_key(docs)
+        cached = self.get_similar(unit, evidence)
+        if cached is None:
+            self.misses += 1
+        return cached, unit, evidence
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    # ------------------------------------------------------------------
+    # 체인 감싸기
+    # ------------------------------------------------------------------
+
+    def wrap(self, retriever, answer_chain, tracer: Optional[ChainTracer] = None):
+        """
+        retriever + answer_chain({"question", "docs"} → PresentationOutput)을
+        캐시를 거치는 Runnable 로 감쌉니다. 입력/출력 형식은 build_rag_chain 과 같습니다.
+
+        retriever 의 vectorstore 가 같은 임베딩 객체를 쓰면 조회용 질문 벡터로 바로 검색하여
+        (rag/batch.py retrieve_by_vectors) retriever 안에서 질문을 다시 임베딩하지 않습니다.
+        tracer 를 넘기면 검색 시간을 "retriever" 단계로 기록합니다.
+        """
+        vectorstore = getattr(retriever, "vectorstore", None)
+        by_vector = vectorstore is not None and vectorstore.embeddings is self.embeddings
+        k = getattr(retriever, "k", None) or getattr(retriever, "search_kwargs", {}).get("k", 4)
+
+        def _retrieve(question: str, vector, config=None) -> List[Document]:
+            started = time.perf_counter()
+            if by_vector:
+                docs = retrieve_by_vectors(vectorstore, [question], [vector], k, retriever)[0]
+            else:
+                docs = retriever.invoke(question, config=config)
+            if tracer is not None:
+                tracer.record("retriever", time.perf_counter() - started, docs)
+            return docs
+
+        async def _aretrieve(question: str, vector, config=None) -> List[Document]:
+            if by_vector:
+                # FAISS / BM25 / 재순위 검색은 동기 CPU 작업이므로 스레드에서 실행 (contextvars 는 복사됨)
+                return await asyncio.to_thread(_retrieve, question, vector)
+            started = time.perf_counter()
+            docs = await retriever.ainvoke(question, config=config)
+            if tracer is not None:
+                tracer.record("retriever", time.perf_counter() - started, docs)
+            return docs
+
+        def _invoke(inputs, config=None):
+            question = inputs["question"]
+            cached = self.get_exact(question)
+            if cached is not None:
+                annotate(answer_cache="exact")
+                return cached
+
+            raw = self.embeddings.embed_query(question)
+            vector = self._unit(raw)
+            docs = _retrieve(question, raw, config)
+            evidence = evidence_key(docs)
+            cached = self.get_similar(vector, evidence)
+            if cached is not None:
+                annotate(answer_cache="semantic")
+                return cached
+
+            self.misses += 1
+            annotate(answer_cache="miss")
+            output = answer_chain.invoke({"question": question, "docs": docs}, config=config)
+            self.put(question, vector, evidence, output)
+            return output
+
+        async def _ainvoke(inputs, config=None):
+            question = inputs["question"]
+            cached = self.get_exact(question)
+            if cached is not None:
+                annotate(answer_cache="exact")
+                return cached
+
+            raw = await self.embeddings.aembed_query(question)
+            vector = self._unit(raw)
+            docs = await _aretrieve(question, raw, config)
+            evidence = evidence_key(docs)
+            cached = self.get_similar(vector, evidence)
+            if cached is not None:
+                annotate(answer_cache="semantic")
+                return cached
+
+            self.misses += 1
+            annotate(answer_cache="miss")
+            output = await answer_chain.ainvoke({"question": question, "docs": docs}, config=config)
+            self.put(question, vector, evidence, output)
+            return output
+
+        return RunnableLambda(_invoke, afunc=_ainvoke, name="cached_rag_chain")
+
+    # ------------------------------------------------------------------
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def stats(self) -> str:
+        return (f"exact_hits={self.exact_hits} semantic_hits={self.semantic_hits} "
+                f"misses={self.misses} hit_rate={self.hit_rate:.1%} entries={len(self._entries)}")
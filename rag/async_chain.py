@@ -0,0 +1,214 @@
+# rag/async_chain.py
+
+"""
+질문 임베딩을 한 번만 하고 먼저 시작하는 RAG 체인 (서버 모드의 ainvoke 경로)
+
+01-Basic/03-LCEL.Ipynb - invoke / ainvoke
+12-RAG/01-RAG-Basic-PDF.ipynb - retriever 와 prompt 연결
+
+build_rag_chain() 의 LCEL dict 는 retriever 안에서 질문을 임베딩하고,
+답변 캐시를 쓰면 캐시 조회용으로 같은 질문을 한 번 더 임베딩합니다. (왕복 2회)
+build_async_rag_chain() 은
+1. 질문이 들어오면 바로 임베딩 요청을 시작하고 (정확히 같은 질문은 그 전에 캐시에서 반환)
+2. (선택) 같은 시점에 LLM 질문 재작성 → 재작성 질의 임베딩 → 검색을 동시에 진행하며
+3. 받은 벡터 하나로 FAISS / BM25 / 재순위 검색과 답변 캐시의 의미 기반 조회를 모두 처리하고
+4. 재작성 결과가 rewrite_timeout 안에 도착하면 원래 검색 결과와 RRF 로 합친 뒤
+   (늦으면 취소하고 원래 결과만 사용)
+5. answer_chain(format_docs → 프롬프트 → LLM)을 실행합니다.
+HTTP 연결은 rag/http_pool.py 의 공유 연결 풀을 통해 임베딩과 LLM 이 함께 재사용합니다.
+"""
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import List, Optional
+
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser # 03-OutputParser/00-concept.ipynb
+from langchain_core.runnables import RunnableLambda # 13-LangChain-Expression-Language/03-RunnableLambda.ipynb
+
+from rag.batch import retrieve_by_vectors
+from rag.bm25 import reciprocal_rank_fusion
+from rag.prompts import REWRITE_PROMPT
+from rag.tracing import ChainTracer, annotate
+
+
+def build_query_rewriter(llm):
+    """질문 → 영어 검색 질의 (REWRITE_PROMPT | llm | StrOutputParser)"""
+    return REWRITE_PROMPT | llm | StrOutputParser()
+
+
+def merge_rankings(docs: List[Document], extra: List[Document]) -> List[Document]:
+    """두 검색 결과를 chunk ID 기준 RRF 로 합쳐 len(docs) 개를 돌려줍니다."""
+    by_id = {}
+    rankings = []
+    for result in (docs, extra):
+        ids = []
+        for d in result:
+            chunk_id = d.metadata.get("chunk_id") or d.id or d.page_content
+            by_id.setdefault(chunk_id, d)
+            ids.append(chunk_id)
+        rankings.append(ids)
+    return [by_id[chunk_id] for chunk_id in reciprocal_rank_fusion(rankings)[:len(docs)]]
+
+
+def build_async_rag_chain(
+    vectorstore: FAISS,
+    answer_chain,
+    retriever=None,
+    k: int = 4,
+    answer_cache=None,
+    rewriter=None,
+    rewrite_timeout: float = 1.5,
+    tracer: Optional[ChainTracer] = None
+):
+    """
+    Parameters
+    ----------
+    vectorstore : FAISS
+        검색할 VectorStore (vectorstore.embeddings 로 질문을 임베딩)
+    answer_chain : Runnable
+        build_answer_chain() 결과 ({"question", "docs"} → PresentationOutput)
+    retriever : Optional
+        build_retriever() 결과. HybridRetriever / RerankRetriever 면 같은 방식으로 검색하고, 그 외는 dense top-k
+    k : int
+        dense 검색 개수
+    answer_cache : Optional[AnswerCache]
+        답변 캐시 (임베딩한 벡터를 그대로 조회에 사용)
+    rewriter : Optional[Runnable]
+        build_query_rewriter() 결과. 있으면 재작성 질의 검색을 동시에 진행
+    rewrite_timeout : float
+        질문 도착 후 재작성 검색 결과를 기다리는 최대 시간(초)
+    tracer : Optional[ChainTracer]
+        단계별 시간 기록 (embed / retriever / rewrite + answer_chain 의 단계)
+
+    Returns
+    -------
+    Runnable
+        build_rag_chain() 과 같은 입력 / 출력 ({"question"} → PresentationOutput)
+    """
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rewrite")
+
+    def _record(stage: str, started: float, output=None) -> None:
+        if tracer is not None:
+            tracer.record(stage, time.perf_counter() - started, output)
+
+    def _retrieve(question: str, vector) -> List[Document]:
+        started = time.perf_counter()
+        docs = retrieve_by_vectors(vectorstore, [question], [vector], k, retriever)[0]
+        _record("retriever", started, docs)
+        return docs
+
+    async def _aretrieve(question: str, vector) -> List[Document]:
+        # FAISS / BM25 / 재순위 검색은 동기 CPU 작업이므로 스레드에서 실행 (이벤트 루프의 다른 요청을 막지 않음)
+        # asyncio.to_thread 는 contextvars(trace, 검색 범위)를 복사하여 실행
+        return await asyncio.to_thread(_retrieve, question, vector)
+
+    def _rewrite_docs(question: str) -> Optional[List[Document]]:
+        started = time.perf_counter()
+        rewritten = rewriter.invoke({"question": question}).strip()
+        _record("rewrite", started)
+        annotate(rewritten=rewritten)
+        if not rewritten or rewritten == question:
+            return None
+        return _retrieve(rewritten, vectorstore.embeddings.embed_query(rewritten))
+
+    async def _arewrite_docs(question: str) -> Optional[List[Document]]:
+        started = time.perf_counter()
+        rewritten = (await rewriter.ainvoke({"question": question})).strip()
+        _record("rewrite", started)
+        annotate(rewritten=rewritten)
+        if not rewritten or rewritten == question:
+            return None
+        return await _aretrieve(rewritten, await vectorstore.embeddings.aembed_query(rewritten))
+
+    def _with_rewrite(docs: List[Document], extra: Optional[List[Document]]) -> List[Document]:
+        return merge_rankings(docs, extra) if extra else docs
+
+    def _invoke(inputs, config=None):
+        question = inputs["question"]
+        if answer_cache is not None:
+            cached = answer_cache.get_exact(question)
+            if cached is not None:
+                annotate(answer_cache="exact")
+                return cached
+
+        started = time.perf_counter()
+        rewrite = None
+        if rewriter is not None:
+            # 스레드에서도 같은 trace 에 기록되도록 contextvars 를 복사
+            rewrite = executor.submit(contextvars.copy_context().run, _rewrite_docs, question)
+
+        t = time.perf_counter()
+        vector = vectorstore.embeddings.embed_query(question)
+        _record("embed", t)
+        docs = _retrieve(question, vector)
+
+        unit = evidence = None
+        if answer_cache is not None:
+            cached, unit, evidence = answer_cache.lookup(vector, docs)
+            annotate(answer_cache="semantic" if cached is not None else "miss")
+            if cached is not None:
+                if rewrite is not None:
+                    rewrite.cancel()
+                return cached
+
+        if rewrite is not None:
+            try:
+                docs = _with_rewrite(docs, rewrite.result(timeout=max(0.0, rewrite_timeout - (time.perf_counter() - started))))
+            except FutureTimeout:
+                annotate(rewrite="timeout")
+            except Exception as e:
+                annotate(rewrite=f"error: {type(e).__name__}")
+
+        output = answer_chain.invoke({"question": question, "docs": docs}, config=config)
+        if answer_cache is not None:
+            answer_cache.put(question, unit, evidence, output)
+        return output
+
+    async def _ainvoke(inputs, config=None):
+        question = inputs["question"]
+        if answer_cache is not None:
+            cached = answer_cache.get_exact(question)
+            if cached is not None:
+                annotate(answer_cache="exact")
+                return cached
+
+        started = time.perf_counter()
+        # 질문 임베딩과 (선택) 재작성 검색을 동시에 시작
+        embed = asyncio.ensure_future(vectorstore.embeddings.aembed_query(question))
+        rewrite = asyncio.ensure_future(_arewrite_docs(question)) if rewriter is not None else None
+        try:
+            vector = await embed
+            _record("embed", started)
+            docs = await _aretrieve(question, vector)
+
+            unit = evidence = None
+            if answer_cache is not None:
+                cached, unit, evidence = answer_cache.lookup(vector, docs)
+                annotate(answer_cache="semantic" if cached is not None else "miss")
+                if cached is not None:
+                    return cached
+
+            if rewrite is not None:
+                try:
+                    remaining = max(0.0, rewrite_timeout - (time.perf_counter() - started))
+                    docs = _with_rewrite(docs, await asyncio.wait_for(rewrite, remaining))
+                except asyncio.TimeoutError:
+                    annotate(rewrite="timeout")
+                except Exception as e:
+                    annotate(rewrite=f"error: {type(e).__name__}")
+        finally:
+            for task in (embed, rewrite):
+                if task is not None and not task.done():
+                    task.cancel()
+
+        output = await answer_chain.ainvoke({"question": question, "docs": docs}, config=config)
+        if answer_cache is not None:
+            answer_cache.put(question, unit, evidence, output)
+        return output
+
+    chain = RunnableLambda(_invoke, afunc=_ainvoke, name="async_rag_chain")
+    return tracer.wrap(chain) if tracer is not None else chain
@@ -0,0 +1,191 @@
+# rag/batch.py
+
+"""
+질문 파일 일괄 처리 (세미나 준비용 배치 모드)
+
+01-Basic/03-LCEL.Ipynb - batch / abatch 와 max_concurrency 설정
+10-VectorStore/02-FAISS.ipynb - FAISS 인덱스 검색
+
+질문을 하나씩 run_once 로 돌리는 대신
+1. 모든 질문을 한 번의 embed_documents 호출로 임베딩하고
+2. FAISS index.search 한 번으로 모든 질문을 동시에 검색(다중 쿼리 검색)한 뒤
+   (하이브리드 / 재순위 retriever 를 넘기면 후보 fetch_k 개를 검색한 뒤 질문별로 BM25 결합, MMR 적용)
+   (use_scope() 안이면 그 논문의 하위 인덱스만 검색, rag/scope.py)
+3. 검색이 끝난 입력들을 answer_chain.abatch_as_completed 로 동시 실행(max_concurrency 제한)하여
+4. 끝나는 순서대로 결과 JSONL 에 기록합니다.
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_core.documents import Document
+
+from rag.bm25 import HybridRetriever
+from rag.rerank import RerankRetriever
+from rag.scope import SearchScope, current_scope, scoped_index
+
+
+@dataclass
+class BatchReport:
+    """단계별 소요 시간(초)과 처리량"""
+    questions: int = 0
+    failed: int = 0
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+    def lines(self) -> List[str]:
+        rows = []
+        for stage, sec in self.seconds.items():
+            qps = self.questions / sec if sec > 0 else float("inf")
+            rows.append(f"{stage:<10s} {sec:8.2f}s  {qps:8.1f} questions/sec")
+        return rows
+
+
+def read_questions(path: str) -> List[str]:
+    """
+    질문 파일을 읽습니다.
+    - .jsonl : 줄마다 {"question": "..."} 또는 "..." 문자열
+    - 그 외   : 줄마다 질문 하나 (빈 줄과 # 주석은 무시)
+    """
+    questions: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.lower().endswith(".jsonl"):
+                item = json.loads(line)
+                line = item["question"] if isinstance(item, dict) else str(item)
+            questions.append(line.strip())
+    if not questions:
+        raise RuntimeError(f"{path} 에 질문이 없습니다.")
+    return questions
+
+
+def batch_retrieve(vectorstore: FAISS, questions: List[str], k: int = 4) -> List[List[Document]]:
+    """
+    모든 질문을 한 번에 임베딩하고, FAISS 다중 쿼리 검색 한 번으로 top-k 문서를 찾습니다.
+    (similarity_search 를 질문마다 부르는 것과 같은 결과)
+    """
+    vectors = vectorstore.embeddings.embed_documents(questions)
+    return search_by_vectors(vectorstore, vectors, k)
+
+
+def search_by_vectors(vectorstore: FAISS, vectors, k: int = 4) -> List[List[Document]]:
+    """임베딩 행렬 (n, d) → 질문별 top-k 문서 리스트 (index.search 한 번)"""
+    x = np.asarray(vectors, dtype=np.float32)
+    if getattr(vectorstore, "_normalize_L2", False):
+        import faiss
+        faiss.normalize_L2(x)
+    _, indices = vectorstore.index.search(x, k)
+
+    results: List[List[Document]] = []
+    for row in indices:
+        docs = []
+        for i in row:
+            if i == -1:
+                continue
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        results.append(docs)
+    return results
+
+
+def retrieve_by_vectors(
+    vectorstore: FAISS,
+    questions: List[str],
+    vectors,
+    k: int = 4,
+    retriever=None,
+    scope: Optional[SearchScope] = None
+) -> List[List[Document]]:
+    """
+    임베딩이 끝난 질문들을 retriever 종류에 맞게 검색합니다. (임베딩 호출 없음)
+    - RerankRetriever : 후보 fetch_k 개 → 재순위(MMR 등)로 k 개
+    - HybridRetriever : dense 후보 fetch_k 개 + BM25 → RRF 로 k 개
+    - 그 외 / None     : dense top-k
+    scope 가 없으면 current_scope() 를 사용하고, 범위가 있으면 dense / BM25 모두 범위 안에서만 검색합니다.
+    """
+    scope = scope or current_scope()
+    allowed = None
+    if scope is not None:
+        scoped = scoped_index(vectorstore)
+        allowed = scoped.chunk_ids(scope)
+
+    def dense_search(n: int) -> List[List[Document]]:
+        if scope is None:
+            return search_by_vectors(vectorstore, vectors, n)
+        return scoped.search(vectors, n, scope)
+
+    if isinstance(retriever, RerankRetriever):
+        dense = dense_search(retriever.fetch_k)
+        return [retriever.rerank_candidates(q, v, docs, allowed) for q, v, docs in zip(questions, vectors, dense)]
+    if isinstance(retriever, HybridRetriever):
+        dense = dense_search(retriever.fetch_k)
+        return [retriever.fuse(q, docs, allowed) for q, docs in zip(questions, dense)]
+    return dense_search(k)
+
+
+async def arun_batch(
+    answer_chain,
+    vectorstore: FAISS,
+    questions: List[str],
+    out_path: str,
+    k: int = 4,
+    max_concurrency: int = 8,
+    retriever: Optional[Union[HybridRetriever, RerankRetriever]] = None,
+    scope: Optional[SearchScope] = None
+) -> BatchReport:
+    """
+    질문 목록을 일괄 처리하고 결과를 out_path(JSONL)에 끝나는 순서대로 기록합니다.
+    retriever 가 HybridRetriever 이면 dense 후보(fetch_k개)에 BM25 결과를 RRF 로 합치고,
+    RerankRetriever 이면 후보를 재순위(MMR 등)하여 k 개를 고릅니다.
+    scope 가 있으면 모든 질문을 그 논문(페이지 범위) 안에서만 검색합니다.
+
+    각 줄: {"index", "question", "output" | "error", "seconds"}
+    """
+    report = BatchReport(questions=len(questions))
+    started = time.perf_counter()
+
+    t = time.perf_counter()
+    vectors = await vectorstore.embeddings.aembed_documents(questions)
+    report.seconds["embed"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    docs_list = retrieve_by_vectors(vectorstore, questions, vectors, k, retriever, scope)
+    report.seconds["retrieve"] = time.perf_counter() - t
+
+    inputs = [{"question": q, "docs": docs} for q, docs in zip(questions, docs_list)]
+
+    t = time.perf_counter()
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        # 01-Basic/03-LCEL.Ipynb - max_concurrency 로 동시 LLM 호출 수 제한
+        async for i, output in answer_chain.abatch_as_completed(
+            inputs,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        ):
+            row = {"index": i, "question": questions[i], "seconds": round(time.perf_counter() - started, 3)}
+            if isinstance(output, Exception):
+                report.failed += 1
+                row["error"] = f"{type(output).__name__}: {output}"
+            else:
+                row["output"] = output.model_dump()
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            f.flush()
+    report.seconds["generate"] = time.perf_counter() - t
+    report.seconds["total"] = time.perf_counter() - started
+    return report
+
+
+def run_batch(*args, **kwargs) -> BatchReport:
+    """arun_batch() 의 동기 버전"""
+    return asyncio.run(arun_batch(*args, **kwargs))
@@ -0,0 +1,325 @@
+# rag/bm25.py
+
+"""
+BM25 희소(lexical) 인덱스 + Dense/Sparse 하이브리드 검색
+
+11-Retriever/01-VectorStoreRetriever.ipynb - Retriever 인터페이스
+
+FAISS dense 검색은 모델 이름, 데이터셋 이름, 수치처럼 "정확한 단어"가 중요한 질문을 자주 놓칩니다.
+BM25Index 는 split_documents() 결과와 같은 chunk 에 대한 역색인(inverted index)을 만들고,
+HybridRetriever 는 dense 결과와 BM25 결과를 Reciprocal Rank Fusion(RRF)으로 합칩니다.
+
+- posting 은 단어별 array('I')(chunk 위치) / array('H')(단어 빈도)로 저장하여 dict/list 보다 작습니다.
+- 검색은 질문 단어의 posting 만 numpy 로 한 번에 누적하므로 10만 chunk 에서도 수 ms 입니다.
+- 삭제는 표시만 해 두었다가(tombstone) 삭제 비율이 커지면 한 번에 압축합니다.
+- save() / load() 는 FAISS 인덱스 옆에 bm25.npz 하나로 저장합니다. (pickle 미사용)
+- use_scope() 안에서는 dense / BM25 모두 그 논문(페이지 범위)의 chunk 만 검색합니다. (rag/scope.py)
+"""
+
+import json
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from rag.scope import current_scope, scoped_index
+
+
+BM25_FILE = "bm25.npz"
+
+# 숫자(소수점/버전 포함), 한글 단어, 하이픈으로 이어진 이름(GPT-4o, BERT-base 등), 그 밖의 단어
+# 한글과 영문/숫자는 따로 끊어 "MACS의" 처럼 조사가 붙은 영문 용어도 "macs" 로 색인합니다.
+_HANGUL = "가-힣ㄱ-ㆎ"
+_WORD = rf"[^\W_{_HANGUL}]+"
+_TOKEN = re.compile(rf"\d+(?:\.\d+)*%?|[{_HANGUL}]+|{_WORD}(?:-{_WORD})*", re.UNICODE)
+
+# tokenize() 규칙이 바뀌면 올립니다. 버전이 다른 bm25.npz 는 docstore 에서 다시 만듭니다.
+TOKENIZER_VERSION = 2
+
+# 거의 모든 chunk 에 나와 순위에는 영향이 없고 posting 만 긴 영어 불용어 (Lucene 기본 목록)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for if in into is it no not of on or such "
+    "that the their then there these they this to was will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    소문자화 후 단어 단위로 분리합니다. 하이픈 이름은 전체와 각 부분을 모두 색인합니다.
+
+    >>> tokenize("MACS의 성능")
+    ['macs', '의', '성능']
+    >>> tokenize("GPT-4o는 2.5% 향상")
+    ['gpt-4o', 'gpt', '4o', '는', '2.5%', '향상']
+    """
+    tokens: List[str] = []
+    for tok in _TOKEN.findall(text.lower()):
+        if tok in _STOPWORDS:
+            continue
+        tokens.append(tok)
+        if "-" in tok:
+            tokens.extend(p for p in tok.split("-") if p and p not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    chunk ID 기준의 BM25 역색인
+
+    Parameters
+    ----------
+    k1, b : float
+        BM25 파라미터
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.postings: List[array] = []   # term → chunk 위치
+        self.freqs: List[array] = []      # term → 단어 빈도
+        self.doc_len = array("I")
+        self.alive = bytearray()
+        self.chunk_ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.total_len = 0
+        self.n_alive = 0
+        self._norm: Optional[np.ndarray] = None   # chunk 별 길이 정규화 항 (색인이 바뀌면 다시 계산)
+        self.tokenizer_version = TOKENIZER_VERSION   # load() 한 색인은 저장 당시의 버전
+
+    def __len__(self) -> int:
+        return self.n_alive
+
+    # ------------------------------------------------------------------
+    # 색인 / 삭제
+    # ------------------------------------------------------------------
+
+    def add(self, chunk_ids: Sequence[str], texts: Sequence[str]) -> None:
+        self._norm = None
+        for chunk_id, text in zip(chunk_ids, texts):
+            if chunk_id in self.positions:
+                self.remove([chunk_id])
+            pos = len(self.chunk_ids)
+            self.chunk_ids.append(chunk_id)
+            self.positions[chunk_id] = pos
+
+            counts: Dict[str, int] = {}
+            tokens = tokenize(text)
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                term = self.vocab.get(tok)
+                if term is None:
+                    term = self.vocab[tok] = len(self.postings)
+                    self.postings.append(array("I"))
+                    self.freqs.append(array("H"))
+                self.postings[term].append(pos)
+                self.freqs[term].append(min(tf, 65535))
+
+            self.doc_len.append(len(tokens))
+            self.alive.append(1)
+            self.total_len += len(tokens)
+            self.n_alive += 1
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        self._norm = None
+        for chunk_id in chunk_ids:
+            pos = self.positions.pop(chunk_id, None)
+            if pos is None or not self.alive[pos]:
+                continue
+            self.alive[pos] = 0
+            self.total_len -= self.doc_len[pos]
+            self.n_alive -= 1
+        if len(self.chunk_ids) and self.n_alive < 0.75 * len(self.chunk_ids):
+            self.compact()
+
+    def compact(self) -> None:
+        """삭제 표시된 chunk 를 실제로 제거하고 위치를 다시 매깁니다."""
+        alive = np.frombuffer(bytes(self.alive), dtype=np.uint8).astype(bool)
+        remap = np.cumsum(alive) - 1
+
+        postings, freqs, vocab = [], [], {}
+        for tok, term in self.vocab.items():
+            ids = np.frombuffer(self.postings[term], dtype=np.uint32)
+            keep = alive[ids]
+            if not keep.any():
+                continue
+            vocab[tok] = len(postings)
+            postings.append(array("I", remap[ids[keep]].astype(np.uint32).tobytes()))
+            freqs.append(array("H", np.frombuffer(self.freqs[term], dtype=np.uint16)[keep].tobytes()))
+
+        self.vocab, self.postings, self.freqs = vocab, postings, freqs
+        self.doc_len = array("I", np.frombuffer(self.doc_len, dtype=np.uint32)[alive].tobytes())
+        self.chunk_ids = [c for c, a in zip(self.chunk_ids, alive) if a]
+        self.positions = {c: i for i, c in enumerate(self.chunk_ids)}
+        self.alive = bytearray(b"\x01" * len(self.chunk_ids))
+        self._norm = None
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """질문과 BM25 점수가 높은 chunk (chunk_id, score) 상위 k개 (allowed 가 있으면 그 chunk ID 중에서만)"""
+        if not self.n_alive:
+            return []
+        if self._norm is None:
+            avgdl = self.total_len / self.n_alive or 1.0
+            doc_len = np.frombuffer(self.doc_len, dtype=np.uint32)
+            self._norm = (self.k1 * (1.0 - self.b + self.b * doc_len / avgdl)).astype(np.float32)
+        norm = self._norm
+        scores = np.zeros(len(self.chunk_ids), dtype=np.float32)
+
+        for tok in set(tokenize(query)):
+            term = self.vocab.get(tok)
+            if term is None:
+                continue
+            # intp 로 바꿔 두면 gather / scatter 가 uint32 인덱스보다 약 2배 빠름
+            ids = np.frombuffer(self.postings[term], dtype=np.uint32).astype(np.intp)
+            tf = np.frombuffer(self.freqs[term], dtype=np.uint16).astype(np.float32)
+            df = len(ids)
+            idf = np.float32(np.log(1.0 + (self.n_alive - df + 0.5) / (df + 0.5)))
+            scores[ids] += (idf * np.float32(self.k1 + 1.0)) * tf / (tf + norm[ids])
+
+        if len(self.chunk_ids) != self.n_alive:
+            scores[np.frombuffer(bytes(self.alive), dtype=np.uint8) == 0] = 0.0
+        if allowed is not None:
+            keep = np.zeros(len(self.chunk_ids), dtype=bool)
+            keep[[self.positions[c] for c in allowed if c in self.positions]] = True
+            scores[~keep] = 0.0
+
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.chunk_ids[i], float(scores[i])) for i in hits]
+
+    # ------------------------------------------------------------------
+    # 저장 / 로드 (CSR 형식 npz)
+    # ------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        self.compact()
+        terms = sorted(self.vocab.items(), key=lambda kv: kv[1])
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, (_, term) in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self.postings[term])
+        np.savez(
+            path,
+            vocab=np.array(json.dumps([tok for tok, _ in terms], ensure_ascii=False)),
+            chunk_ids=np.array(json.dumps(self.chunk_ids)),
+            offsets=offsets,
+            postings=np.frombuffer(b"".join(self.postings[t].tobytes() for _, t in terms), dtype=np.uint32),
+            freqs=np.frombuffer(b"".join(self.freqs[t].tobytes() for _, t in terms), dtype=np.uint16),
+            doc_len=np.frombuffer(self.doc_len, dtype=np.uint32),
+            params=np.array([self.k1, self.b]),
+            tokenizer=np.array(TOKENIZER_VERSION),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        data = np.load(path)
+        k1, b = data["params"].tolist()
+        index = cls(k1=k1, b=b)
+        vocab = json.loads(str(data["vocab"]))
+        offsets, postings, freqs = data["offsets"], data["postings"], data["freqs"]
+        index.vocab = {tok: i for i, tok in enumerate(vocab)}
+        index.postings = [array("I", postings[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(vocab))]
+        index.freqs = [array("H", freqs[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(vocab))]
+        index.doc_len = array("I", data["doc_len"].tobytes())
+        index.chunk_ids = json.loads(str(data["chunk_ids"]))
+        index.positions = {c: i for i, c in enumerate(index.chunk_ids)}
+        index.alive = bytearray(b"\x01" * len(index.chunk_ids))
+        index.total_len = int(data["doc_len"].sum())
+        index.n_alive = len(index.chunk_ids)
+        index.tokenizer_version = int(data["tokenizer"]) if "tokenizer" in data.files else 1
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore: FAISS) -> "BM25Index":
+        """기존 FAISS docstore 의 모든 chunk 로 색인을 만듭니다. (bm25.npz 가 없거나 tokenizer 버전이 다른 이전 인덱스용)"""
+        index = cls()
+        ids = list(vectorstore.index_to_docstore_id.values())
+        docs = [vectorstore.docstore.search(i) for i in ids]
+        index.add(ids, [d.page_content for d in docs])
+        return index
+
+
+def rrf_scores(rankings: Sequence[Sequence[str]], k: int = 60) -> Dict[str, float]:
+    """여러 순위 목록의 RRF 점수 Σ 1 / (k + rank)"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return scores
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """여러 순위 목록을 RRF 점수로 합친 순서"""
+    scores = rrf_scores(rankings, k)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """FAISS dense 검색 + BM25 검색을 RRF 로 합친 Retriever"""
+
+    vectorstore: FAISS
+    bm25: BM25Index
+    k: int = 4
+    fetch_k: int = 20   # 각 검색기에서 가져올 후보 수
+    rrf_k: int = 60
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def fuse(self, query: str, dense_docs: List[Document], allowed: Optional[Iterable[str]] = None) -> List[Document]:
+        """dense 검색 결과에 BM25 결과를 합쳐 상위 k개를 반환 (allowed: BM25 검색을 제한할 chunk ID)"""
+        return self.fuse_scored(query, dense_docs, self.k, allowed)[0]
+
+    def fuse_scored(
+        self, query: str, dense_docs: List[Document], limit: int, allowed: Optional[Iterable[str]] = None
+    ) -> Tuple[List[Document], List[float]]:
+        """fuse() 와 같되 상위 limit 개와 각 문서의 RRF 점수를 함께 반환 (재순위 단계용)"""
+        by_id: Dict[str, Document] = {}
+        dense_ids: List[str] = []
+        for d in dense_docs:
+            chunk_id = d.metadata.get("chunk_id") or d.id
+            by_id[chunk_id] = d
+            dense_ids.append(chunk_id)
+        lexical_ids = [chunk_id for chunk_id, _ in self.bm25.search(query, self.fetch_k, allowed)]
+
+        scores = rrf_scores([dense_ids, lexical_ids], self.rrf_k)
+        docs: List[Document] = []
+        fused: List[float] = []
+        for chunk_id in sorted(scores, key=scores.get, reverse=True):
+            doc = by_id.get(chunk_id) or self.vectorstore.docstore.search(chunk_id)
+            if isinstance(doc, Document):
+                docs.append(doc)
+                fused.append(scores[chunk_id])
+            if len(docs) >= limit:
+                break
+        return docs, fused
+
+    def _fuse_scoped(self, query: str, vector) -> List[Document]:
+        scope = current_scope()
+        scoped = scoped_index(self.vectorstore)
+        dense = scoped.search([vector], self.fetch_k, scope)[0]
+        return self.fuse(query, dense, allowed=scoped.chunk_ids(scope))
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: Optional[CallbackManagerForRetrieverRun] = None
+    ) -> List[Document]:
+        if current_scope() is not None:
+            return self._fuse_scoped(query, self.vectorstore.embeddings.embed_query(query))
+        return self.fuse(query, self.vectorstore.similarity_search(query, k=self.fetch_k))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        if current_scope() is not None:
+            return self._fuse_scoped(query, await self.vectorstore.embeddings.aembed_query(query))
+        return self.fuse(query, await self.vectorstore.asimilarity_search(query, k=self.fetch_k))
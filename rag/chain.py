@@ -10,18 +10,26 @@ RAG 통합: 12-RAG/01-RAG-Basic-PDF.ipynb - retriever와 prompt 연결
 특히 41-49줄의 체인 구성은 12-RAG/01-RAG-Basic-PDF.ipynb의 Cell 24, 28과 거의 동일한 구조로, RAG의 핵심 파이프라인을 구현하고 있습니다!
 """
 
-from langchain_openai import ChatOpenAI # 04-Model/01-Chat-Models.ipynb
+from functools import lru_cache, partial
+from typing import Optional
+
 from langchain_core.runnables import RunnableLambda # 13-LangChain-Expression-Language/03-RunnableLambda.ipynb
 from langchain_core.output_parsers import StrOutputParser # 03-OutputParser/00-concept.ipynb
 
+from rag.context import DEFAULT_CONTEXT_TOKENS, ContextStats, pack_context
+from rag.http_pool import HttpPoolConfig, client_kwargs
 from rag.prompts import INTEGRATED_PROMPT, PresentationOutput #02-Prompt/01-PromptTemplate.ipynb, 03-OutputParser/01-PydanticOuputParser.ipynb
+from rag.tracing import ChainTracer, annotate, split_structured_llm
 
 
-def format_docs(docs): # 13-LangChain-Expression-Language/03-RunnableLambda.ipynb
+def format_docs(docs, max_tokens: int = DEFAULT_CONTEXT_TOKENS, log: bool = True): # 13-LangChain-Expression-Language/03-RunnableLambda.ipynb
     """
     Retriever 결과를 context 문자열로 변환
     (출처 PDF와 페이지 정보 포함)
 
+    글자 수로 자르는 대신 rag/context.py 의 pack_context() 로
+    이웃 chunk 의 겹침을 지우고 토큰 예산(max_tokens) 안에서 관련도 순서로 채웁니다.
+
     13-LangChain-Expression-Language/03-RunnableLambda.ipynb
     사용자 정의 함수 작성 방법
     함수는 단일 인자만 받아야 함
@@ -30,40 +38,113 @@ def format_docs(docs): # 13-LangChain-Expression-Language/03-RunnableLambda.ipyn
     docs[0].metadata 구조 확인
     page_content 및 metadata 활용
     """
-    blocks = []
-    for i, d in enumerate(docs, start=1):
-        source = d.metadata.get("source", "unknown")
-        page = d.metadata.get("page", "?")
-        content = d.page_content.strip().replace("\n", " ")
-        # 너무 긴 chunk는 잘라서 인용 안정화
-        content = content[:1200]
-        blocks.append(f"[E{i}] [{source} | page {page}] {content}")
+    stats = ContextStats()
+    context = pack_context(docs, max_tokens=max_tokens, stats=stats)
+    if log:
+        print(f"[CONTEXT] {stats}")
+    annotate(context_tokens=stats.tokens_after, context_tokens_before=stats.tokens_before)
+    return context
 
-    joined = "\n".join(blocks)
-    return joined[:12000]  # 토큰 과다 방지
 
+@lru_cache(maxsize=None)
+def build_llm(http_pool: Optional[HttpPoolConfig] = HttpPoolConfig()):
+    """
+    발표 자료 생성용 LLM (04-Model/01-Chat-Models.ipynb)
 
-def build_rag_chain(retriever):
+    체인마다 새로 만들지 않고 설정별로 하나를 공유하며,
+    HTTP 연결은 임베딩과 같은 공유 연결 풀(rag/http_pool.py)을 사용합니다.
     """
-    단일 RAG 체인:
-    - 하나의 검색
-    - 하나의 프롬프트
-    - PPT + SCRIPT 동시 출력
-    
+    from langchain_openai import ChatOpenAI # 04-Model/01-Chat-Models.ipynb (임포트 약 1초, 필요할 때만)
+
+    return ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0.2,
+        **client_kwargs(http_pool)
+    )
+
+
+def build_answer_chain(
+    llm=None,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    log_context: bool = True,
+    tracer: Optional[ChainTracer] = None
+):
+    """
+    검색이 끝난 뒤의 체인: {"question", "docs"} → PresentationOutput
+
+    build_rag_chain 과 답변 캐시(rag/answer_cache.py)가 공통으로 사용합니다.
+    context_tokens 는 context 토큰 예산, log_context 는 구성 전/후 토큰 수 출력 여부입니다.
+    tracer(rag/tracing.py)를 넘기면 format_docs / prompt / llm / parse 단계의 시간을 기록합니다.
+
     06-Chains/03-Structured-Output-Chain.ipynb
     with_structured_output()을 사용하여 구조화된 출력 강제
     """
+    llm = llm or build_llm()
 
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.2
-    )
-    
     # 03-OutputParser/01-PydanticOuputParser.ipynb
     # 06-Chains/03-Structured-Output-Chain.ipynb
     # with_structured_output()을 사용하여 PresentationOutput 모델 형식으로 출력 강제
     # OpenAI Function Calling을 활용하여 JSON Schema 기반 출력 제어
     structured_llm = llm.with_structured_output(PresentationOutput)
+    format_context = RunnableLambda(partial(format_docs, max_tokens=context_tokens, log=log_context))
+
+    if tracer is None:
+        return (
+            {
+                "question": lambda x: x["question"],
+                "context": (lambda x: x["docs"]) | format_context,
+            }
+            | INTEGRATED_PROMPT
+            | structured_llm
+            # StrOutputParser() 제거 - with_structured_output()이 자동으로 파싱
+        )
+
+    # 같은 체인을 단계별로 감싸서 기록 (LLM 호출과 구조화된 출력 파싱을 나누어 측정)
+    llm_call, parser = split_structured_llm(structured_llm)
+    chain = (
+        {
+            "question": lambda x: x["question"],
+            "context": (lambda x: x["docs"]) | tracer.stage("format_docs", format_context),
+        }
+        | tracer.stage("prompt", INTEGRATED_PROMPT)
+        | tracer.stage("llm", llm_call)
+    )
+    return chain | tracer.stage("parse", parser) if parser is not None else chain
+
+
+def build_rag_chain(
+    retriever,
+    answer_cache=None,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    llm=None,
+    log_context: bool = True,
+    tracer: Optional[ChainTracer] = None,
+    answer_chain=None
+):
+    """
+    단일 RAG 체인:
+    - 하나의 검색
+    - 하나의 프롬프트
+    - PPT + SCRIPT 동시 출력
+
+    answer_cache(AnswerCache)를 넘기면 같은/비슷한 질문은 저장된 답변을 바로 반환합니다.
+    llm 을 넘기면 build_llm() 대신 사용합니다. (오프라인 벤치마크의 가짜 LLM 등)
+    tracer(rag/tracing.py)를 넘기면 단계별 시간 / 토큰 수 / chunk ID / 캐시 적중을 기록합니다.
+    answer_chain 을 넘기면 build_answer_chain() 대신 사용합니다. (섹션별 생성 rag/sections.py 등)
+    """
+    if answer_chain is None:
+        answer_chain = build_answer_chain(
+            llm=llm, context_tokens=context_tokens, log_context=log_context, tracer=tracer
+        )
+    if answer_cache is not None:
+        # 캐시 조회용 질문 벡터로 바로 검색 (retriever 안에서 다시 임베딩하지 않음)
+        chain = answer_cache.wrap(retriever, answer_chain, tracer=tracer)
+        return tracer.wrap(chain) if tracer is not None else chain
+
+    question = lambda x: x["question"]
+    if tracer is not None:
+        retriever = tracer.stage("retriever", retriever)
+        question = tracer.stage("question", question)
 
     chain = ( #13-LangChain-Expression-Language/03-RunnableLambda.ipynb / 12-RAG/01-RAG-Basic-PDF.ipynb
 
@@ -71,17 +152,15 @@ def build_rag_chain(retriever):
         # RunnableLambda로 사용자 정의 함수 통합
 
         # retriever를 딕셔너리 키로 사용
-        # context에 검색 결과 주입
+        # docs에 검색 결과 주입 → answer_chain에서 context로 변환
         # 프롬프트 → LLM → 구조화된 출력 순서
         # LCEL 문법으로 연결
 
         {
-            "question": lambda x: x["question"],
-            "context": (lambda x: x["question"]) | retriever | RunnableLambda(format_docs),
+            "question": question,
+            "docs": (lambda x: x["question"]) | retriever,
         }
-        | INTEGRATED_PROMPT
-        | structured_llm
-        # StrOutputParser() 제거 - with_structured_output()이 자동으로 파싱
+        | answer_chain
     )
 
-    return chain
+    return tracer.wrap(chain) if tracer is not None else chain
@@ -0,0 +1,61 @@
+# rag/config.py
+
+"""
+가벼운 기본값 / 설정 클래스 (표준 라이브러리만 임포트)
+
+main.py 는 질문 입력 전에 옵션을 읽고 저장된 인덱스를 확인하므로,
+그 단계에서 필요한 값은 FAISS / numpy / LangChain / httpx 를 임포트하지 않는 이 모듈에 둡니다.
+원래 모듈(rag/context.py, rag/embedding.py, rag/http_pool.py, rag/splitter.py, rag/ann.py)에서도 그대로 임포트할 수 있습니다.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+DEFAULT_CONTEXT_TOKENS = 3000   # 기존 12000자 상한과 비슷한 크기
+
+# 분할 방식: recursive(페이지 텍스트 → RecursiveCharacterTextSplitter) / layout(rag/layout.py 의 chunk_pdf)
+CHUNKERS = ("recursive", "layout")
+DEFAULT_CHUNKER = "recursive"
+
+DEFAULT_INDEX_SPEC = "Flat"
+
+
+def is_flat_spec(spec: Optional[str]) -> bool:
+    return not spec or spec.strip().lower() == "flat"
+
+
+@dataclass
+class EmbeddingConfig:
+    """임베딩 단계 설정"""
+    max_batch_tokens: int = 20000   # 배치 하나의 최대 토큰 수
+    max_batch_size: int = 128       # 배치 하나의 최대 chunk 수
+    concurrency: int = 4            # 동시에 진행하는 임베딩 요청 수
+    max_retries: int = 6            # 429 재시도 횟수
+    backoff_base: float = 1.0       # 첫 재시도 대기 시간(초), 이후 2배씩 증가
+    backoff_max: float = 60.0
+    tokens_per_minute: Optional[int] = None  # 분당 토큰 한도 (None 이면 제한 없음)
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    """연결 풀 설정 (rag/http_pool.py)"""
+    max_connections: int = 32              # 동시에 열 수 있는 최대 연결 수
+    max_keepalive_connections: int = 16    # 쉬는 동안 유지할 연결 수
+    keepalive_expiry: float = 120.0        # 쉬는 연결을 유지할 시간(초)
+    timeout: float = 120.0                 # 요청 하나의 최대 시간(초)
+    connect_timeout: float = 10.0
+
+    def limits(self) -> "httpx.Limits":
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def timeouts(self) -> "httpx.Timeout":
+        import httpx
+
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
@@ -0,0 +1,197 @@
+# rag/context.py
+
+"""
+토큰 예산 기반 context 구성 (format_docs 에서 사용)
+
+13-LangChain-Expression-Language/03-RunnableLambda.ipynb - format_docs 구현
+08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb - chunk_overlap
+
+기존 format_docs 는 chunk 마다 1200자, 전체 12000자로 자르기만 해서
+- 같은 페이지의 이웃 chunk 가 chunk_overlap(200자)만큼 같은 문장을 두 번 보내고
+- 토큰 수를 모르므로 어떤 질문은 필요 이상으로, 어떤 질문은 마지막 근거가 잘린 채로 전송됩니다.
+
+pack_context() 는
+1. 같은 source / page 의 이웃 chunk 에서 겹치는 부분을 지우고 하나의 블록으로 합친 뒤
+2. 검색 순위(관련도) 순서대로 토큰 예산(max_tokens)을 채우고
+3. 예산을 넘는 마지막 블록은 토큰 단위로 잘라 넣습니다.
+토큰 수는 tiktoken 인코더(rag/embedding.py, 한 번만 로드)로 셉니다.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from rag.config import DEFAULT_CONTEXT_TOKENS
+from rag.embedding import _get_encoding, count_tokens
+from rag.layout import page_label
+
+CONTEXT_MODEL = "gpt-4o-mini"
+
+# 겹침으로 인정할 최소 / 최대 길이 (문자). split_documents 의 chunk_overlap 기본값은 200
+_MIN_OVERLAP = 20
+_MAX_OVERLAP = 400
+# 예산이 이보다 적게 남으면 마지막 블록을 잘라 넣지 않음
+_MIN_TAIL_TOKENS = 40
+
+
+@dataclass
+class ContextStats:
+    """context 구성 전/후 비교"""
+    chunks: int = 0
+    blocks: int = 0
+    tokens_before: int = 0     # 검색된 chunk 를 그대로 이어 붙였을 때
+    tokens_after: int = 0      # 실제 context
+    overlap_chars: int = 0     # 중복 제거로 지운 글자 수
+    dropped: int = 0           # 예산 때문에 빠진 블록 수
+
+    def __str__(self) -> str:
+        return (f"tokens {self.tokens_before} → {self.tokens_after} "
+                f"(chunks {self.chunks} → blocks {self.blocks}, "
+                f"overlap -{self.overlap_chars} chars, dropped {self.dropped})")
+
+
+@lru_cache(maxsize=8192)
+def _cached_tokens(text: str, model: str) -> int:
+    # 같은 chunk 가 여러 질문에서 반복 검색되므로 chunk 별 토큰 수를 캐시
+    return count_tokens(text, model)
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = CONTEXT_MODEL) -> str:
+    """text 를 max_tokens 토큰 이하로 자릅니다. (인코더가 없으면 4글자 = 1토큰으로 근사)"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _chunk_order(doc: Document) -> Optional[int]:
+    """같은 파일 안에서의 chunk 순서 (chunk_id = "<파일 해시>-<순번>")"""
+    chunk_id = doc.metadata.get("chunk_id") or ""
+    tail = chunk_id.rsplit("-", 1)[-1]
+    return int(tail) if tail.isdigit() else None
+
+
+def find_overlap(prev: str, nxt: str) -> int:
+    """prev 의 끝부분과 nxt 의 앞부분이 겹치는 길이 (없으면 0)"""
+    tail = prev[-_MAX_OVERLAP:]
+    probe = nxt[:_MIN_OVERLAP]
+    if len(probe) < _MIN_OVERLAP:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        size = len(tail) - start
+        if nxt.startswith(tail[start:]):
+            return size
+        start = tail.find(probe, start + 1)
+    return 0
+
+
+def merge_neighbors(docs: List[Document]) -> Tuple[List[Tuple[int, str, str, str]], int]:
+    """
+    같은 source / page 에서 이웃한 chunk 를 겹침을 지우고 합칩니다.
+
+    Returns
+    -------
+    (블록 목록, 지운 글자 수)
+        블록 = (가장 높은 검색 순위, source, page, 본문), 검색 순위 순서로 정렬
+        page 는 page_label() 값 (layout chunk 가 여러 페이지에 걸치면 "3-4")
+    """
+    groups: Dict[Tuple[str, str], List[Tuple[int, Document]]] = {}
+    for rank, d in enumerate(docs):
+        key = (str(d.metadata.get("source", "unknown")), page_label(d.metadata))
+        groups.setdefault(key, []).append((rank, d))
+
+    blocks: List[Tuple[int, str, str, str]] = []
+    removed = 0
+    for (source, page), members in groups.items():
+        # 원문 순서로 정렬 (chunk 순번이 없으면 검색 순서 유지)
+        members.sort(key=lambda m: (_chunk_order(m[1]) is None, _chunk_order(m[1]) or 0, m[0]))
+
+        rank, text, order = members[0][0], _clean(members[0][1].page_content), _chunk_order(members[0][1])
+        for next_rank, doc in members[1:]:
+            next_text = _clean(doc.page_content)
+            next_order = _chunk_order(doc)
+            overlap = find_overlap(text, next_text)
+            adjacent = order is not None and next_order == order + 1
+            if overlap or adjacent:
+                removed += overlap
+                text = text + next_text[overlap:] if overlap else f"{text} {next_text}"
+                rank = min(rank, next_rank)
+            elif next_text in text:
+                removed += len(next_text)
+                rank = min(rank, next_rank)
+            else:
+                blocks.append((rank, source, page, text))
+                rank, text = next_rank, next_text
+            order = next_order
+        blocks.append((rank, source, page, text))
+
+    blocks.sort(key=lambda b: b[0])
+    return blocks, removed
+
+
+def pack_context(
+    docs: List[Document],
+    max_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    model: str = CONTEXT_MODEL,
+    stats: Optional[ContextStats] = None
+) -> str:
+    """
+    검색된 chunk 를 토큰 예산 안의 context 문자열로 만듭니다.
+
+    Parameters
+    ----------
+    docs : List[Document]
+        Retriever 결과 (관련도 순서)
+    max_tokens : int
+        context 토큰 예산
+    model : str
+        토큰 수 계산에 사용할 LLM 이름
+    stats : Optional[ContextStats]
+        넘기면 구성 전/후 토큰 수 등을 채워 줍니다.
+
+    Returns
+    -------
+    str
+        "[E1] [source | page p] 본문" 형식의 블록을 줄바꿈으로 이은 문자열
+    """
+    stats = stats if stats is not None else ContextStats()
+    stats.chunks = len(docs)
+    stats.tokens_before = sum(
+        _cached_tokens(f"[E{i}] [{d.metadata.get('source', 'unknown')} | page {page_label(d.metadata)}] "
+                       f"{_clean(d.page_content)}", model)
+        for i, d in enumerate(docs, start=1)
+    ) + max(0, len(docs) - 1)   # 줄바꿈
+
+    blocks, stats.overlap_chars = merge_neighbors(docs)
+
+    lines: List[str] = []
+    used = 0
+    for _, source, page, text in blocks:
+        line = f"[E{len(lines) + 1}] [{source} | page {page}] {text}"
+        tokens = _cached_tokens(line, model) + (1 if lines else 0)   # 줄바꿈 포함
+        remaining = max_tokens - used
+        if tokens <= remaining:
+            lines.append(line)
+            used += tokens
+        elif remaining >= _MIN_TAIL_TOKENS:
+            # 예산을 넘는 블록은 남은 토큰만큼 잘라 넣고 예산을 모두 사용한 것으로 처리
+            lines.append(truncate_tokens(line, remaining - (1 if lines else 0), model))
+            used = max_tokens
+        else:
+            stats.dropped += 1
+
+    context = "\n".join(lines)
+    stats.blocks = len(lines)
+    stats.tokens_after = count_tokens(context, model) if context else 0
+    return context
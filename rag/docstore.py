@@ -0,0 +1,138 @@
+# rag/docstore.py
+
+"""
+chunk 텍스트 저장소 - pickle 대신 한 파일에 이어 쓰고 offset 으로 읽는 docstore
+
+10-VectorStore/02-FAISS.ipynb - docstore / index_to_docstore_id
+
+FAISS.save_local 은 모든 chunk 의 page_content / metadata 를 담은 InMemoryDocstore 를
+index.pkl 로 pickle 하고, load_local 은 이것을 프로세스마다 통째로 메모리에 올립니다.
+BlobDocstore 는
+- docs.bin        : chunk 마다 {"page_content", "metadata"} JSON(UTF-8)을 이어 쓴 파일
+- docs.offsets.npy : chunk i 의 위치 = offsets[i] ~ offsets[i + 1] (int64, 길이 n + 1)
+- docs.ids.json   : chunk ID 목록 (FAISS 인덱스 위치 순서 = index_to_docstore_id)
+- docs.scope.npz  : chunk 마다 (source 번호, page, page_end) - 검색 범위(rag/scope.py)를 JSON 디코딩 없이 만들기 위함
+을 mmap 으로 열어 검색된 chunk 만 그때그때 읽으므로, 여러 프로세스가 같은 페이지 캐시를 공유합니다.
+add / delete 는 메모리에만 반영되고, write_docstore() 로 저장할 때 새 파일에 합쳐집니다.
+"""
+
+import json
+import mmap
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+DOCS_FILE = "docs.bin"
+OFFSETS_FILE = "docs.offsets.npy"
+IDS_FILE = "docs.ids.json"
+SCOPE_FILE = "docs.scope.npz"
+
+
+def scope_fields(metadata: dict) -> Tuple[str, int, int]:
+    """검색 범위에 쓰는 (source, page, page_end). page 가 없으면 -1, page_end 가 없으면 page"""
+    page = metadata.get("page")
+    page = page if isinstance(page, int) else -1
+    page_end = metadata.get("page_end")
+    return str(metadata.get("source", "unknown")), page, page_end if isinstance(page_end, int) else page
+
+
+class BlobDocstore(Docstore, AddableMixin):
+    """docs.bin + offset 으로 chunk 를 읽는 docstore (InMemoryDocstore 와 같은 search / add / delete)"""
+
+    def __init__(self, blob: Union[bytes, mmap.mmap] = b"", offsets: Optional[np.ndarray] = None,
+                 ids: Optional[List[str]] = None, scope: Optional[Tuple[List[str], np.ndarray]] = None):
+        self._blob = blob
+        self._offsets = offsets if offsets is not None else np.zeros(1, dtype=np.int64)
+        self.ids: List[str] = list(ids or [])
+        self._rows: Dict[str, int] = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        self._added: Dict[str, Document] = {}
+        self._scope = scope   # (source 이름 목록, 행마다 [source 번호, page, page_end]) - 이전 인덱스에는 없음
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True) -> "BlobDocstore":
+        """path 디렉토리의 docs.* 파일을 엽니다. (use_mmap=False 이면 메모리로 읽음)"""
+        with open(os.path.join(path, IDS_FILE), encoding="utf-8") as f:
+            ids = json.load(f)
+        offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r" if use_mmap else None)
+        with open(os.path.join(path, DOCS_FILE), "rb") as f:
+            # 빈 파일은 mmap 할 수 없음
+            if use_mmap and os.fstat(f.fileno()).st_size > 0:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                blob = f.read()
+        scope = None
+        scope_path = os.path.join(path, SCOPE_FILE)
+        if os.path.isfile(scope_path):
+            with np.load(scope_path) as data:
+                scope = (json.loads(str(data["sources"])), data["rows"])
+        return cls(blob, offsets, ids, scope)
+
+    def _read(self, row: int, chunk_id: str) -> Document:
+        raw = self._blob[int(self._offsets[row]):int(self._offsets[row + 1])]
+        record = json.loads(raw)
+        return Document(id=chunk_id, page_content=record["page_content"], metadata=record["metadata"])
+
+    def search(self, search: str) -> Union[str, Document]:
+        doc = self._added.get(search)
+        if doc is not None:
+            return doc
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self._read(row, search)
+
+    def scope_fields(self, chunk_id: str) -> Optional[Tuple[str, int, int]]:
+        """chunk 의 (source, page, page_end). docs.scope.npz 가 없는 이전 인덱스의 chunk 면 None"""
+        doc = self._added.get(chunk_id)
+        if doc is not None:
+            return scope_fields(doc.metadata)
+        row = self._rows.get(chunk_id)
+        if row is None or self._scope is None:
+            return None
+        sources, rows = self._scope
+        code, page, page_end = rows[row].tolist()
+        return sources[code], page, page_end
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = set(texts).intersection(self._rows).union(set(texts).intersection(self._added))
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+
+    def delete(self, ids: List) -> None:
+        missing = [i for i in ids if i not in self._rows and i not in self._added]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+        for i in ids:
+            if self._added.pop(i, None) is None:
+                del self._rows[i]
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._added)
+
+
+def write_docstore(path: str, docstore: Docstore, ids: List[str]) -> None:
+    """
+    ids 순서(FAISS 인덱스 위치 순서)대로 docstore 의 chunk 를 path 디렉토리의 docs.* 파일로 씁니다.
+    InMemoryDocstore / BlobDocstore 모두 search() 로 읽으므로 이전 형식 인덱스도 그대로 변환됩니다.
+    """
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    codes: Dict[str, int] = {}
+    rows = np.zeros((len(ids), 3), dtype=np.int64)
+    with open(os.path.join(path, DOCS_FILE), "wb") as f:
+        for i, chunk_id in enumerate(ids):
+            doc = docstore.search(chunk_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"docstore 에 chunk 가 없습니다: {chunk_id}")
+            record = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False)
+            offsets[i + 1] = offsets[i] + f.write(record.encode("utf-8"))
+            source, page, page_end = scope_fields(doc.metadata)
+            rows[i] = (codes.setdefault(source, len(codes)), page, page_end)
+    np.save(os.path.join(path, OFFSETS_FILE), offsets)
+    np.savez(os.path.join(path, SCOPE_FILE), sources=np.array(json.dumps(list(codes), ensure_ascii=False)), rows=rows)
+    with open(os.path.join(path, IDS_FILE), "w", encoding="utf-8") as f:
+        json.dump(ids, f, ensure_ascii=False)
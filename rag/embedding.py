@@ -0,0 +1,235 @@
+# rag/embedding.py
+
+"""
+배치 + 동시 실행 임베딩 단계 (split_documents 와 FAISS 삽입 사이)
+
+09-Embeddings/01-OpenAIEmbeddings.ipynb - embed_documents / aembed_documents
+10-VectorStore/02-FAISS.ipynb - from_embeddings / add_embeddings 로 미리 계산한 벡터 저장
+
+FAISS.from_documents 는 전체 chunk 를 한 번에 넘기고 배치 크기, 동시성, 재시도를
+라이브러리 기본값에 맡깁니다. 여기서는
+1. chunk 를 토큰 수 상한이 있는 배치로 묶고
+2. 비동기 워커 풀(동시 실행 수 제한)로 임베딩을 요청하며
+3. 429(rate limit) 응답은 지수 백오프로 재시도하고
+4. 배치가 끝나는 대로 FAISS 인덱스에 벡터를 추가합니다.
+
+embeddings 에는 LangChain Embeddings 인터페이스를 따르는 어떤 객체든 넘길 수 있으므로
+DeterministicFakeEmbedding 같은 가짜 임베딩으로 네트워크 없이 동작을 확인할 수 있습니다.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from rag.config import EmbeddingConfig
+
+# FAISS(langchain_community) / Embeddings 는 임포트가 느려서 타입 표기는 문자열로 두고,
+# FAISS 는 벡터를 실제로 추가하는 aembed_into_vectorstore() 안에서 임포트합니다.
+
+
+@dataclass
+class EmbeddingStats:
+    """임베딩 단계 통계 (build_vectorstore 의 stats 인자로 받아볼 수 있음)"""
+    chunks: int = 0
+    batches: int = 0
+    tokens: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.chunks} chunks / {self.batches} batches / {self.tokens} tokens "
+                f"in {self.seconds:.2f}s ({self.chunks_per_sec:.1f} chunks/sec, {self.retries} retries)")
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """
+    모델별 tiktoken 인코더 (한 번만 로드).
+    인코더 파일을 내려받을 수 없는 오프라인 환경에서는 None 을 반환합니다.
+    """
+    try:
+        import tiktoken # langchain-openai 의존성으로 함께 설치됨
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = "text-embedding-3-small") -> int:
+    """
+    tiktoken 으로 토큰 수를 셉니다.
+    인코더를 쓸 수 없으면 UTF-8 바이트 수 / 4 로 근사합니다.
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, len(text.encode("utf-8")) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def batch_by_tokens(
+    token_counts: List[int],
+    max_batch_tokens: int,
+    max_batch_size: int
+) -> List[List[int]]:
+    """
+    chunk 인덱스를 토큰 수 / 개수 상한을 넘지 않는 배치로 순서대로 묶습니다.
+    (상한보다 큰 chunk 하나는 단독 배치가 됩니다)
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, n in enumerate(token_counts):
+        if current and (current_tokens + n > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """openai.RateLimitError 또는 HTTP 429 응답인지 확인합니다."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _TokenRateLimiter:
+    """분당 토큰 한도를 지키도록 요청 시작을 늦추는 단순 토큰 버킷"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.available = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(float(tokens), self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                await asyncio.sleep((tokens - self.available) / self.rate)
+
+
+async def aembed_into_vectorstore(
+    documents: List[Document],
+    embeddings: "Embeddings",
+    ids: Optional[List[str]] = None,
+    vectorstore: Optional["FAISS"] = None,
+    config: Optional[EmbeddingConfig] = None,
+    model: str = "text-embedding-3-small",
+    stats: Optional[EmbeddingStats] = None
+) -> Tuple["FAISS", EmbeddingStats]:
+    """
+    documents 를 배치로 나누어 동시에 임베딩하고, 끝난 배치부터 FAISS 에 추가합니다.
+
+    Parameters
+    ----------
+    documents : List[Document]
+        분할된 문서 chunk (비어 있으면 vectorstore 를 그대로 반환)
+    embeddings : Embeddings
+        임베딩 모델 (OpenAIEmbeddings 또는 가짜 임베딩)
+    ids : Optional[List[str]]
+        chunk ID
+    vectorstore : Optional[FAISS]
+        벡터를 추가할 기존 VectorStore. None 이면 첫 배치로 새로 생성
+    config : Optional[EmbeddingConfig]
+        배치 / 동시성 / 재시도 설정
+    model : str
+        토큰 수 계산에 사용할 모델 이름
+    stats : Optional[EmbeddingStats]
+        통계를 누적할 객체 (None 이면 새로 생성)
+
+    Returns
+    -------
+    Tuple[FAISS, EmbeddingStats]
+    """
+    from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+
+    config = config or EmbeddingConfig()
+    stats = stats if stats is not None else EmbeddingStats()
+    if not documents:
+        return vectorstore, stats
+
+    started = time.perf_counter()
+    texts = [d.page_content for d in documents]
+    token_counts = [count_tokens(t, model) for t in texts]
+    batches = batch_by_tokens(token_counts, config.max_batch_tokens, config.max_batch_size)
+
+    semaphore = asyncio.Semaphore(max(1, config.concurrency))
+    limiter = _TokenRateLimiter(config.tokens_per_minute) if config.tokens_per_minute else None
+
+    async def _embed_batch(batch: List[int]) -> Tuple[List[int], List[List[float]]]:
+        batch_texts = [texts[i] for i in batch]
+        batch_tokens = sum(token_counts[i] for i in batch)
+        async with semaphore:
+            for attempt in range(config.max_retries + 1):
+                if limiter is not None:
+                    await limiter.acquire(batch_tokens)
+                try:
+                    vectors = await embeddings.aembed_documents(batch_texts)
+                    return batch, vectors
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == config.max_retries:
+                        raise
+                    stats.retries += 1
+                    delay = _retry_after(e) or min(config.backoff_max, config.backoff_base * 2 ** attempt)
+                    await asyncio.sleep(delay * (1 + random.random() * 0.25))
+
+    tasks = [asyncio.ensure_future(_embed_batch(b)) for b in batches]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            batch, vectors = await finished
+            text_embeddings = [(texts[i], vec) for i, vec in zip(batch, vectors)]
+            metadatas = [documents[i].metadata for i in batch]
+            batch_ids = [ids[i] for i in batch] if ids is not None else None
+
+            # 10-VectorStore/02-FAISS.ipynb - 미리 계산한 벡터로 인덱스 생성 / 추가
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=batch_ids)
+            else:
+                vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=batch_ids)
+
+            stats.batches += 1
+            stats.chunks += len(batch)
+            stats.tokens += sum(token_counts[i] for i in batch)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    stats.seconds += time.perf_counter() - started
+    return vectorstore, stats
+
+
+def embed_into_vectorstore(*args, **kwargs) -> Tuple["FAISS", EmbeddingStats]:
+    """aembed_into_vectorstore() 의 동기 버전"""
+    return asyncio.run(aembed_into_vectorstore(*args, **kwargs))
@@ -0,0 +1,211 @@
+# rag/embedding_cache.py
+
+"""
+임베딩 결과 캐시 (chunk 텍스트 해시 기준)
+
+09-Embeddings/01-OpenAIEmbeddings.ipynb - Embeddings 인터페이스(embed_documents / embed_query)
+
+CHUNK_SIZE / CHUNK_OVERLAP 만 바꿔도 인덱스는 새로 만들어야 하지만,
+텍스트가 그대로인 chunk 까지 다시 API 로 임베딩할 필요는 없습니다.
+CachedEmbeddings 는 OpenAIEmbeddings 앞에 놓여서
+(임베딩 모델, 정규화된 텍스트의 sha256) → float32 벡터 를 SQLite 에 저장합니다.
+
+- 벡터는 pickle 한 리스트가 아니라 float32 바이트(BLOB)로 저장하여 1536차원 기준 6KB 입니다.
+- hits / misses 카운터로 캐시 효과를 확인할 수 있습니다.
+- max_entries 를 넘으면 가장 오래 사용되지 않은 항목부터 지웁니다(LRU).
+  last_used 는 touch_interval 보다 오래된 항목만 갱신하고, 행 수는 메모리에서 세어
+  캐시 적중 / 저장마다 UPDATE + commit / COUNT(*) 를 하지 않습니다.
+- 비동기 메서드는 SQLite 조회 / 저장을 asyncio.to_thread 로 실행하여 이벤트 루프를 막지 않습니다.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.tracing import annotate
+
+
+def normalize_text(text: str) -> str:
+    """유니코드 정규화(NFC) + 공백 정리. 줄바꿈 위치만 다른 chunk 도 같은 키가 됩니다."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    SQLite 기반 영구 임베딩 캐시
+
+    Parameters
+    ----------
+    underlying : Embeddings
+        실제 임베딩 모델 (OpenAIEmbeddings 등)
+    path : str
+        SQLite 파일 경로
+    namespace : str
+        캐시 키에 포함할 모델 식별자 (예: "text-embedding-3-small")
+    max_entries : int
+        저장할 최대 벡터 수 (넘으면 LRU 로 삭제)
+    touch_interval : float
+        적중한 항목의 last_used 를 갱신하는 최소 간격(초). LRU 순서는 이 간격 단위로 근사됩니다.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        path: str,
+        namespace: str,
+        max_entries: int = 500_000,
+        touch_interval: float = 3600.0
+    ):
+        self.underlying = underlying
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        # 저장된 행 수 (열 때 한 번만 세고 이후에는 추가 / 삭제한 수로 갱신)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # 캐시 조회 / 저장
+    # ------------------------------------------------------------------
+
+    def _key(self, text: str) -> str:
+        raw = f"{self.namespace}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        stale: List[str] = []
+        with self._lock:
+            # SQLite 변수 개수 제한(기본 999)을 넘지 않도록 나누어 조회
+            for start in range(0, len(keys), 500):
+                part = list(keys[start:start + 500])
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    if now - last_used >= self.touch_interval:
+                        stale.append(key)
+            if stale:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in stale]
+                )
+                self._conn.commit()
+        return found
+
+    def _put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            # 같은 키 = 같은 모델 + 같은 텍스트이므로 이미 있는 행은 그대로 둡니다. (다른 스레드가 먼저 저장한 경우)
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, np.asarray(vec, dtype=np.float32).tobytes(), now) for key, vec in items.items()]
+            )
+            self._count += cursor.rowcount
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            cursor = self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._count -= cursor.rowcount
+
+    def _lookup(self, texts: List[str]):
+        """(전체 키 목록, 캐시에 있던 벡터, 임베딩이 필요한 텍스트{키: 텍스트})"""
+        keys = [self._key(t) for t in texts]
+        found = self._get_many(list(dict.fromkeys(keys)))
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:   # 같은 호출 안에서 중복된 텍스트는 적중으로 셈
+                missing[key] = text
+        with self._lock:   # aembed_* 는 to_thread 로 여러 스레드에서 동시에 호출됨
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return keys, found, missing
+
+    # ------------------------------------------------------------------
+    # Embeddings 인터페이스
+    # ------------------------------------------------------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self._put_many(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            await asyncio.to_thread(self._put_many, new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text])
+        annotate(embedding_cache="miss" if missing else "hit")
+        if missing:
+            vector = self.underlying.embed_documents([text])[0]
+            self._put_many({keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await asyncio.to_thread(self._lookup, [text])
+        annotate(embedding_cache="miss" if missing else "hit")
+        if missing:
+            vector = (await self.underlying.aembed_documents([text]))[0]
+            await asyncio.to_thread(self._put_many, {keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> str:
+        return f"hits={self.hits} misses={self.misses} hit_rate={self.hit_rate:.1%} entries={len(self)}"
@@ -0,0 +1,76 @@
+# rag/http_pool.py
+
+"""
+OpenAI 임베딩 / 채팅 모델이 함께 쓰는 HTTP 연결 풀
+
+04-Model/01-Chat-Models.ipynb - ChatOpenAI 설정
+09-Embeddings/01-OpenAIEmbeddings.ipynb - OpenAIEmbeddings 설정
+
+ChatOpenAI 와 OpenAIEmbeddings 는 각자 httpx 클라이언트를 만들고,
+기본 keep-alive 유지 시간(5초)이 짧아서 질문 사이에 잠시 쉬면 다음 질문은
+임베딩 / LLM 호출마다 TCP + TLS 연결을 새로 맺습니다.
+
+shared_http_clients() 는 프로세스에서 하나뿐인 (동기, 비동기) httpx 클라이언트를 돌려주며,
+두 모델이 같은 호스트(api.openai.com)로 가는 연결을 함께 재사용합니다.
+비동기 클라이언트는 이벤트 루프마다 연결 풀을 따로 두므로
+asyncio.run() 을 여러 번 호출하는 경우(인덱스 생성 → 배치 등)에도 안전합니다.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from rag.config import HttpPoolConfig
+
+
+class _PerLoopTransport(httpx.AsyncBaseTransport):
+    """이벤트 루프마다 별도의 연결 풀 (닫힌 루프의 연결을 다른 루프에서 쓰지 않도록)"""
+
+    def __init__(self, limits: httpx.Limits):
+        self._limits = limits
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _current(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self._limits)
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+_clients: Dict[HttpPoolConfig, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_lock = threading.Lock()
+
+
+def shared_http_clients(config: Optional[HttpPoolConfig] = None) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """설정별로 하나씩만 만드는 (동기, 비동기) httpx 클라이언트"""
+    config = config or HttpPoolConfig()
+    with _lock:
+        clients = _clients.get(config)
+        if clients is None:
+            clients = _clients[config] = (
+                httpx.Client(limits=config.limits(), timeout=config.timeouts()),
+                httpx.AsyncClient(transport=_PerLoopTransport(config.limits()), timeout=config.timeouts()),
+            )
+        return clients
+
+
+def client_kwargs(config: Optional[HttpPoolConfig]) -> dict:
+    """ChatOpenAI / OpenAIEmbeddings 에 넘길 http_client / http_async_client (config 가 None 이면 빈 dict)"""
+    if config is None:
+        return {}
+    http_client, http_async_client = shared_http_clients(config)
+    return {"http_client": http_client, "http_async_client": http_async_client}
@@ -0,0 +1,423 @@
+# rag/index_store.py
+
+"""
+FAISS 인덱스 디스크 캐시 + 증분 업데이트
+
+10-VectorStore/02-FAISS.ipynb - save_local / load_local 로 인덱스 저장 및 로드
+10-VectorStore/02-FAISS.ipynb - add_documents / delete 로 문서 추가 및 삭제
+
+매 실행마다 PDF 로드 → 분할 → 임베딩 → FAISS 생성을 반복하지 않도록,
+한 번 만든 인덱스를 디스크에 저장해 두고 다음 실행에서 바로 불러옵니다.
+
+인덱스는 설정 키(chunk_size / chunk_overlap / 임베딩 모델)마다 하나의 디렉토리에 저장되고,
+manifest.json 에 PDF 파일별 내용 해시(sha256)와 chunk ID 목록을 기록합니다.
+- 설정이 바뀌면 다른 디렉토리를 쓰므로 전체를 새로 만듭니다.
+- PDF 가 추가/변경되면 해당 파일만 다시 임베딩하여 add_documents 합니다.
+- PDF 가 삭제/변경되면 manifest 의 chunk ID 로 기존 벡터를 delete 합니다.
+- 아무것도 바뀌지 않았으면 저장된 인덱스를 그대로 불러옵니다.
+- 같은 chunk 에 대한 BM25 역색인(rag/bm25.py)도 함께 증분 갱신하여 bm25.npz 로 저장합니다.
+- ANN 인덱스 종류(index_spec, rag/ann.py)도 설정 키에 포함됩니다. nprobe / efSearch 는 로드할 때 적용합니다.
+- manifest 에 파일 크기 / 수정 시각도 기록하여, 둘 다 같은 파일은 해시를 다시 계산하지 않습니다.
+- 분할 방식(chunker)이 layout 이면 설정 키에 포함하고, 로드 + 분할을 함께 프로세스 풀에서 실행합니다. (rag/layout.py)
+- 임베딩 축소 차원(embedding_dimensions)을 지정하면 설정 키에 포함합니다.
+- chunk 텍스트는 index.pkl(pickle) 대신 docs.bin + offset 파일(rag/docstore.py)로 저장하고,
+  바뀐 것이 없으면 index.faiss 와 docs.bin 을 mmap 으로 열어 여러 프로세스가 같은 페이지를 공유합니다.
+  (index.pkl 만 있는 이전 인덱스는 load_local 로 읽고, 다음 저장 때 새 형식으로 바뀝니다)
+
+find_fresh_index() 는 FAISS / numpy / LangChain 을 임포트하지 않고 manifest 만으로
+저장된 인덱스를 그대로 쓸 수 있는지 확인합니다. (main.py 의 빠른 시작 경로)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from rag.config import CHUNKERS, DEFAULT_CHUNKER, DEFAULT_INDEX_SPEC, is_flat_spec
+from rag.loader import list_pdf_files
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# 모듈 수준에서는 표준 라이브러리와 rag/config.py, rag/loader.py(목록 조회)만 임포트합니다.
+# FAISS / numpy / LangChain / BM25 / 임베딩 / PDF 분할 모듈은 임포트가 느려서
+# 인덱스를 실제로 읽거나 만드는 함수 안에서 임포트합니다.
+
+
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+
+
+@dataclass
+class SyncReport:
+    """sync_vectorstore() 결과 요약"""
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    added_chunks: int = 0
+    deleted_chunks: int = 0
+    embedding: Optional["EmbeddingStats"] = None
+    path: str = ""
+    version: str = ""
+    bm25: Optional["BM25Index"] = None   # 인덱스와 같은 chunk 의 BM25 역색인
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.deleted)
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """파일 내용을 블록 단위로 읽어 sha256 해시를 계산합니다."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_stat(path: str) -> List[int]:
+    """[크기, 수정 시각(ns)] - manifest 에 기록하여 다음 실행에서 해시 계산을 건너뛰는 데 사용"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def fingerprint_files(data_dir: str, known: Optional[Dict[str, dict]] = None) -> Dict[str, str]:
+    """
+    DATA_DIR 안의 PDF 파일 이름 → 내용 해시
+
+    known(manifest 의 files)에 같은 크기 / 수정 시각이 기록된 파일은 저장된 해시를 그대로 사용합니다.
+    """
+    known = known or {}
+    fingerprints = {}
+    for pdf_name in list_pdf_files(data_dir):
+        path = os.path.join(data_dir, pdf_name)
+        entry = known.get(pdf_name)
+        if entry is not None and entry.get("stat") == file_stat(path):
+            fingerprints[pdf_name] = entry["sha256"]
+        else:
+            fingerprints[pdf_name] = file_sha256(path)
+    return fingerprints
+
+
+def _hash_json(payload: dict) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def compute_settings_key(
+    chunk_size: int,
+    chunk_overlap: int,
+    embedding_model: str,
+    index_spec: str = DEFAULT_INDEX_SPEC,
+    chunker: str = DEFAULT_CHUNKER,
+    embedding_dimensions: Optional[int] = None
+) -> str:
+    """분할 파라미터 + 임베딩 모델(+ 축소 차원) + 인덱스 종류 + 분할 방식으로 인덱스 디렉토리 이름을 계산합니다."""
+    settings = {
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_model": embedding_model,
+    }
+    # Flat 은 기존 인덱스 디렉토리를 그대로 쓰도록 키에 넣지 않음
+    if not is_flat_spec(index_spec):
+        settings["index_spec"] = index_spec.replace(" ", "")
+    # recursive 도 기존 인덱스 디렉토리를 그대로 쓰도록 키에 넣지 않음
+    if chunker != DEFAULT_CHUNKER:
+        settings["chunker"] = chunker
+    if embedding_dimensions:
+        settings["embedding_dimensions"] = embedding_dimensions
+    return _hash_json(settings)
+
+
+def compute_index_version(settings_key: str, fingerprints: Dict[str, str]) -> str:
+    """설정 키 + 파일 해시로 인덱스 내용 버전을 계산합니다. (내용이 같으면 항상 같은 값)"""
+    return _hash_json({"settings": settings_key, "files": fingerprints})
+
+
+def make_chunk_ids(chunks: List["Document"], file_hash: str) -> List[str]:
+    """
+    파일 해시 기반의 결정적인 chunk ID 를 만들고 metadata["chunk_id"] 에도 기록합니다.
+    (같은 파일 내용 → 같은 ID 이므로 검색 결과에서 어느 chunk 인지 추적 가능)
+    """
+    ids = []
+    for i, chunk in enumerate(chunks):
+        chunk_id = f"{file_hash[:16]}-{i:05d}"
+        chunk.metadata["chunk_id"] = chunk_id
+        ids.append(chunk_id)
+    return ids
+
+
+def _read_manifest(path: str) -> Optional[dict]:
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_fresh_index(
+    data_dir: str,
+    index_dir: str = ".index",
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    embedding_model: str = "text-embedding-3-small",
+    index_spec: str = DEFAULT_INDEX_SPEC,
+    chunker: str = DEFAULT_CHUNKER,
+    embedding_dimensions: Optional[int] = None
+) -> Optional[str]:
+    """
+    저장된 인덱스가 DATA_DIR 과 같으면(추가 / 변경 / 삭제 없음) 그 경로를, 아니면 None 을 반환합니다.
+    manifest.json 과 파일 크기 / 수정 시각만 읽으므로 FAISS / LangChain 을 임포트하지 않습니다.
+    """
+    settings_key = compute_settings_key(chunk_size, chunk_overlap, embedding_model, index_spec, chunker,
+                                        embedding_dimensions)
+    path = os.path.join(index_dir, settings_key)
+    manifest = _read_manifest(path)
+    if manifest is None:
+        return None
+    old_files = manifest["files"]
+    fingerprints = fingerprint_files(data_dir, old_files)
+    if set(fingerprints) != set(old_files):
+        return None
+    if any(old_files[name]["sha256"] != sha for name, sha in fingerprints.items()):
+        return None
+    return path
+
+
+def _load_bm25(path: str, vectorstore: Optional["FAISS"]) -> "BM25Index":
+    from rag.bm25 import BM25_FILE, TOKENIZER_VERSION, BM25Index
+
+    bm25_path = os.path.join(path, BM25_FILE)
+    if os.path.isfile(bm25_path):
+        bm25 = BM25Index.load(bm25_path)
+        if bm25.tokenizer_version == TOKENIZER_VERSION or vectorstore is None:
+            return bm25
+    if vectorstore is not None:
+        # bm25.npz 가 없거나 이전 tokenizer 로 만든 인덱스: docstore 에서 한 번 만들어 저장
+        bm25 = BM25Index.from_vectorstore(vectorstore)
+        bm25.save(bm25_path)
+        return bm25
+    return BM25Index()
+
+
+def load_saved_vectorstore(path: str, embeddings: "Embeddings", use_mmap: bool = False) -> "FAISS":
+    """
+    저장된 인덱스 디렉토리를 FAISS VectorStore 로 읽습니다.
+
+    use_mmap=True 이면 index.faiss 의 벡터와 docs.bin 을 mmap 으로 열어 필요한 페이지만 읽습니다.
+    mmap 으로 연 인덱스는 읽기 전용이므로 (add / delete 불가) 바뀐 것이 없을 때만 사용합니다.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+    from rag.docstore import DOCS_FILE, BlobDocstore
+
+    if not os.path.isfile(os.path.join(path, DOCS_FILE)):
+        # index.pkl 로 저장된 이전 형식. 직접 저장한 인덱스만 읽으므로 pickle 역직렬화를 허용
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True) # 10-VectorStore/02-FAISS.ipynb
+
+    index = faiss.read_index(os.path.join(path, INDEX_FILE), faiss.IO_FLAG_MMAP_IFC if use_mmap else 0)
+    docstore = BlobDocstore.load(path, use_mmap=use_mmap)
+    return FAISS(embeddings, index, docstore, dict(enumerate(docstore.ids)))
+
+
+def _save(vectorstore: "FAISS", bm25: "BM25Index", path: str, manifest: dict) -> None:
+    """
+    임시 디렉토리에 먼저 저장한 뒤 이름을 바꿔서,
+    저장 도중 중단되어도 깨진 인덱스를 읽는 일이 없도록 합니다.
+    manifest.json 은 마지막에 기록되며 인덱스 저장 완료 표시로 쓰입니다.
+    """
+    import faiss
+    from rag.bm25 import BM25_FILE
+    from rag.docstore import write_docstore
+
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    # 10-VectorStore/02-FAISS.ipynb save_local 과 같은 index.faiss + chunk 텍스트는 docs.bin (pickle 사용 안 함)
+    faiss.write_index(vectorstore.index, os.path.join(tmp_path, INDEX_FILE))
+    mapping = vectorstore.index_to_docstore_id
+    write_docstore(tmp_path, vectorstore.docstore, [mapping[i] for i in range(len(mapping))])
+    bm25.save(os.path.join(tmp_path, BM25_FILE))
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def sync_vectorstore(
+    data_dir: str,
+    index_dir: str = ".index",
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    embedding_model: str = "text-embedding-3-small",
+    reindex: bool = False,
+    max_workers: Optional[int] = None,
+    embedding_config: Optional["EmbeddingConfig"] = None,
+    embeddings: Optional["Embeddings"] = None,
+    index_spec: str = DEFAULT_INDEX_SPEC,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    chunker: str = DEFAULT_CHUNKER,
+    embedding_dimensions: Optional[int] = None,
+    use_mmap: bool = True
+) -> Tuple["FAISS", SyncReport]:
+    """
+    DATA_DIR 과 저장된 인덱스를 비교하여 바뀐 PDF 만 반영합니다.
+
+    Parameters
+    ----------
+    data_dir : str
+        PDF 폴더
+    index_dir : str
+        인덱스 캐시 루트 디렉토리
+    chunk_size, chunk_overlap : int
+        split_documents() 파라미터
+    embedding_model : str
+        OpenAI embedding 모델 이름
+    reindex : bool
+        True 이면 저장된 인덱스를 버리고 전체를 다시 만듭니다.
+    max_workers : Optional[int]
+        PDF 로드 프로세스 수 (iter_loaded_pdfs 참고)
+    embedding_config : Optional[EmbeddingConfig]
+        임베딩 배치 / 동시성 설정 (rag/embedding.py 참고)
+    embeddings : Optional[Embeddings]
+        사용할 임베딩 객체 (기본값: get_embeddings(embedding_model)).
+        임베딩 캐시(CachedEmbeddings)를 쓰려면 여기에 넘깁니다.
+    index_spec : str
+        FAISS 인덱스 종류 ("Flat", "IVF,Flat", "HNSW32", "IVF,PQ16" 등, rag/ann.py 참고)
+    nprobe, ef_search : Optional[int]
+        질문 시점의 IVF nprobe / HNSW efSearch (저장된 인덱스에는 영향 없음)
+    chunker : str
+        분할 방식 ("recursive": load_pdf → split_documents, "layout": rag/layout.py 의 chunk_pdf)
+    embedding_dimensions : Optional[int]
+        임베딩 축소 차원 (embeddings 를 넘기지 않을 때 get_embeddings 에 전달, 설정 키에 포함)
+    use_mmap : bool
+        바뀐 것이 없으면 저장된 인덱스를 mmap 으로 엽니다. (load_saved_vectorstore 참고)
+
+    Returns
+    -------
+    Tuple[FAISS, SyncReport]
+    """
+    from rag.ann import set_search_params
+    from rag.docstore import DOCS_FILE
+    from rag.embedding import EmbeddingStats
+    from rag.layout import chunk_pdf
+    from rag.loader import iter_loaded_pdfs, load_pdf, print_load_error
+    from rag.splitter import split_documents
+    from rag.vectorstore import build_vectorstore, get_embeddings
+
+    if chunker not in CHUNKERS:
+        raise ValueError(f"지원하지 않는 chunker 입니다: {chunker} (가능한 값: {', '.join(CHUNKERS)})")
+    settings_key = compute_settings_key(chunk_size, chunk_overlap, embedding_model, index_spec, chunker,
+                                        embedding_dimensions)
+    if embeddings is None:
+        embeddings = get_embeddings(embedding_model, dimensions=embedding_dimensions)
+    path = os.path.join(index_dir, settings_key)
+
+    if reindex:
+        shutil.rmtree(path, ignore_errors=True)
+
+    manifest = _read_manifest(path)
+    old_files: Dict[str, dict] = manifest["files"] if manifest else {}
+    fingerprints = fingerprint_files(data_dir, old_files)
+
+    report = SyncReport(path=path, version=compute_index_version(settings_key, fingerprints))
+    for pdf_name, sha in fingerprints.items():
+        if pdf_name not in old_files:
+            report.added.append(pdf_name)
+        elif old_files[pdf_name]["sha256"] != sha:
+            report.updated.append(pdf_name)
+        else:
+            report.unchanged.append(pdf_name)
+    report.deleted = sorted(set(old_files) - set(fingerprints))
+
+    vectorstore: Optional["FAISS"] = None
+    if manifest is not None:
+        # 갱신할 인덱스는 메모리로 읽음 (mmap 인덱스는 읽기 전용)
+        vectorstore = load_saved_vectorstore(path, embeddings, use_mmap=use_mmap and not report.changed)
+    bm25 = report.bm25 = _load_bm25(path, vectorstore)
+
+    if vectorstore is not None and not report.changed:
+        if not os.path.isfile(os.path.join(path, DOCS_FILE)):
+            _save(vectorstore, bm25, path, manifest)   # 이전 형식(index.pkl) → docs.bin 으로 한 번 변환
+        set_search_params(vectorstore.index, nprobe=nprobe, ef_search=ef_search)
+        return vectorstore, report
+
+    # 변경/삭제된 파일의 기존 벡터 ID
+    delete_ids: List[str] = []
+    for pdf_name in report.updated + report.deleted:
+        delete_ids.extend(old_files[pdf_name]["chunk_ids"])
+
+    # 추가/변경된 파일만 다시 로드 → 분할 (로드는 병렬, 끝난 파일부터 바로 분할. layout 은 분할까지 병렬)
+    # 로드에 실패한 파일은 manifest 에 남기지 않으므로 다음 동기화에서 다시 시도합니다.
+    new_files = {
+        name: {**old_files[name], "stat": file_stat(os.path.join(data_dir, name))}
+        for name in report.unchanged
+    }
+    new_chunks: List["Document"] = []
+    new_ids: List[str] = []
+
+    def _on_error(pdf_path: str, error: BaseException) -> None:
+        print_load_error(pdf_path, error)
+        report.failed.append(os.path.basename(pdf_path))
+
+    layout = chunker == "layout"
+    load = partial(chunk_pdf, chunk_size=chunk_size, chunk_overlap=chunk_overlap) if layout else load_pdf
+    pdf_paths = [os.path.join(data_dir, name) for name in report.added + report.updated]
+    for pdf_path, docs in iter_loaded_pdfs(pdf_paths, max_workers=max_workers, on_error=_on_error, load=load):
+        pdf_name = os.path.basename(pdf_path)
+        sha = fingerprints[pdf_name]
+        chunks = docs if layout else split_documents(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        ids = make_chunk_ids(chunks, sha)
+        new_chunks.extend(chunks)
+        new_ids.extend(ids)
+        new_files[pdf_name] = {"sha256": sha, "chunk_ids": ids, "stat": file_stat(pdf_path)}
+
+    if vectorstore is None and not new_chunks:
+        raise RuntimeError(f"{data_dir} 의 PDF에서 텍스트를 추출하지 못했습니다.")
+
+    report.embedding = EmbeddingStats()
+    old_index = vectorstore.index if vectorstore is not None else None
+    trained_size = manifest.get("index_trained_size") if manifest else None
+    vectorstore = build_vectorstore(
+        new_chunks,
+        embedding_model=embedding_model,
+        ids=new_ids,
+        vectorstore=vectorstore,
+        delete_ids=delete_ids,
+        embedding_config=embedding_config,
+        stats=report.embedding,
+        embeddings=embeddings,
+        index_spec=index_spec,
+        trained_size=trained_size
+    )
+    # 인덱스를 새로 만들었으면(처음 생성 / 삭제 / IVF 재학습) 지금 벡터 수로 학습된 것
+    if vectorstore.index is not old_index:
+        trained_size = vectorstore.index.ntotal
+    report.added_chunks = len(new_ids)
+    report.deleted_chunks = len(delete_ids)
+
+    bm25.remove(delete_ids)
+    bm25.add(new_ids, [c.page_content for c in new_chunks])
+
+    os.makedirs(index_dir, exist_ok=True)
+    _save(vectorstore, bm25, path, {
+        "version": report.version,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_model": embedding_model,
+        "embedding_dimensions": embedding_dimensions,
+        "index_spec": index_spec,
+        "index_trained_size": trained_size,
+        "chunker": chunker,
+        "files": new_files,
+    })
+    set_search_params(vectorstore.index, nprobe=nprobe, ef_search=ef_search)
+    return vectorstore, report
@@ -0,0 +1,338 @@
+# rag/layout.py
+
+"""
+PyMuPDF 블록 / 줄 구조 기반 chunk 분할 (layout chunker)
+
+07-DocumentLoader/01-PDF-Loader.ipynb - PyMuPDFLoader 가 사용하는 PyMuPDF
+08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb - chunk_size / chunk_overlap
+
+기존 경로(load_pdf → split_documents)는 페이지 텍스트를 ["\\n\\n", "\\n", ".", " ", ""] 로 나누므로
+- 페이지마다 끝에 짧은 chunk 가 남고, 페이지를 넘는 문단은 두 chunk 로 잘리며
+- "e.g." / "et al." / "Fig. 3" 같은 약어에서도 잘리고
+- 머리말 / 꼬리말 / 쪽 번호 / arXiv 세로 표기 / 참고문헌까지 임베딩합니다.
+
+chunk_pdf() 는
+1. page.get_text("dict") 의 블록 / 줄에서 가로 방향 줄만 모아 문단을 만들고
+   (줄 끝 하이픈은 이어 붙임)
+2. 페이지 위 / 아래 여백에서 여러 페이지에 반복되는 블록(머리말 / 꼬리말)과 쪽 번호,
+   본문보다 작은 글자의 짧은 블록(그림 안의 라벨)을 버리고
+3. "References" / "Bibliography" / "참고문헌" 제목부터 다음 "Appendix" 제목 전까지를 버린 뒤
+4. 약어를 고려하여 문장으로 나누고, 페이지 경계와 상관없이 chunk_size 글자까지 문장을 채워
+   chunk 를 만듭니다. 다음 chunk 는 직전 chunk 의 끝 문장들(chunk_overlap 글자 이내)로 시작합니다.
+
+metadata 의 page 는 chunk 의 첫 페이지(PyMuPDFLoader 와 같은 0부터), page_end 는 마지막 페이지입니다.
+파일 하나를 통째로 처리하는 함수이므로 iter_loaded_pdfs(load=...) 로 프로세스 풀에서 실행할 수 있습니다.
+"""
+
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+
+HEADER_MARGIN = 0.08        # 페이지 높이 대비 위 / 아래 여백 비율 (머리말 / 꼬리말 후보)
+REPEAT_RATIO = 0.3          # 여백 블록이 이 비율 이상의 페이지에 반복되면 머리말 / 꼬리말
+
+_REFERENCES = re.compile(r"^\s*(?:\d+\.?\s*)?(?:references|bibliography|참고\s*문헌)\s*$", re.IGNORECASE)
+_APPENDIX = re.compile(r"^\s*(?:[A-Z]\.?\s+|\d+\.?\s*)?(?:appendix|appendices|supplementary|부록)\b", re.IGNORECASE)
+_PAGE_NUMBER = re.compile(r"^\s*(?:page\s*)?\d+(?:\s*(?:/|of)\s*\d+)?\s*$", re.IGNORECASE)
+
+# 뒤에 공백과 대문자가 와도 문장 끝이 아닌 약어
+_ABBREVIATIONS = {
+    "e.g", "i.e", "et al", "etc", "vs", "cf", "fig", "figs", "eq", "eqs", "sec", "secs", "tab",
+    "no", "vol", "pp", "ref", "refs", "dr", "mr", "ms", "prof", "approx", "resp", "al",
+}
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+
+@dataclass
+class _Block:
+    page: int
+    y0: float
+    y1: float
+    height: float     # 페이지 높이
+    size: float       # 글자 크기 (글자 수 가중 평균)
+    lines: List[str]
+
+    @property
+    def text(self) -> str:
+        return _join_lines(self.lines)
+
+
+def _join_lines(lines: List[str]) -> str:
+    """줄을 공백으로 잇되, 줄 끝 하이픈 + 소문자로 시작하는 다음 줄은 단어로 이어 붙임"""
+    text = ""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if text.endswith("-") and line[:1].islower():
+            text = text[:-1] + line
+        else:
+            text = f"{text} {line}" if text else line
+    return text
+
+
+def _page_blocks(page, page_no: int, flags: int) -> List[_Block]:
+    blocks = []
+    height = page.rect.height
+    for b in page.get_text("dict", flags=flags)["blocks"]:
+        if b.get("type") != 0:   # 이미지 블록
+            continue
+        lines, sizes = [], Counter()
+        for line in b["lines"]:
+            if abs(line["dir"][1]) > 0.01:   # 세로 / 회전된 줄 (arXiv 표기 등)
+                continue
+            text = "".join(span["text"] for span in line["spans"])
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"])
+            if text.strip():
+                lines.append(text)
+        if not lines:
+            continue
+        size = sum(s * n for s, n in sizes.items()) / max(1, sum(sizes.values()))
+        blocks.append(_Block(page_no, b["bbox"][1], b["bbox"][3], height, size, lines))
+    return blocks
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\d+", "#", text.lower()).strip()
+
+
+def _body_size(blocks: List[_Block]) -> float:
+    sizes = Counter()
+    for b in blocks:
+        sizes[round(b.size)] += len(b.text)
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def filter_blocks(pages: List[List[_Block]]) -> List[_Block]:
+    """머리말 / 꼬리말 / 쪽 번호 / 그림 라벨 / 참고문헌을 뺀 본문 블록 (읽는 순서)"""
+    def _in_margin(b: _Block) -> bool:
+        return b.y1 < b.height * HEADER_MARGIN or b.y0 > b.height * (1 - HEADER_MARGIN)
+
+    repeated = Counter()
+    for blocks in pages:
+        repeated.update({_normalize(b.text) for b in blocks if _in_margin(b)})
+    min_repeat = max(2, int(len(pages) * REPEAT_RATIO))
+    body_size = _body_size([b for blocks in pages for b in blocks])
+
+    kept = []
+    in_references = False
+    for blocks in pages:
+        for b in blocks:
+            if _in_margin(b) and (repeated[_normalize(b.text)] >= min_repeat or _PAGE_NUMBER.match(b.text)):
+                continue
+            if b.size < body_size * 0.85 and len(b.text.split()) <= 4:
+                continue
+            # 참고문헌 제목 줄부터 부록 제목 줄 전까지 버림 (제목이 블록 중간에 있어도 줄 단위로 확인)
+            lines = []
+            for line in b.lines:
+                if _REFERENCES.match(line):
+                    in_references = True
+                elif in_references and _APPENDIX.match(line):
+                    in_references = False
+                if not in_references:
+                    lines.append(line)
+            if lines:
+                kept.append(_Block(b.page, b.y0, b.y1, b.height, b.size, lines))
+    return kept
+
+
+def _is_open(paragraph: List[Tuple[int, str]]) -> bool:
+    """문장 중간에서 끝난 문단 (하이픈, 또는 마침표 없이 끝나는 긴 본문 - 짧은 제목은 제외)"""
+    tail = paragraph[-1][1]
+    return tail.endswith("-") or (tail[-1:] not in ".!?:" and len(tail) > 80)
+
+
+def _continues(paragraph: List[Tuple[int, str]], text: str) -> bool:
+    return text[:1].islower() and _is_open(paragraph)
+
+
+def iter_paragraphs(blocks: Iterable[_Block], max_wait: int = 6) -> Iterable[List[Tuple[int, str]]]:
+    """
+    블록을 문단으로 묶어 [(page, 블록 본문), ...] 으로 내보냅니다.
+    앞 블록이 문장 중간에서 끝나고 다음 블록이 소문자로 시작하면 단 / 페이지가 바뀌어도 같은 문단으로 잇고,
+    사이에 그림 / 표 블록이 끼어 있으면 문단을 max_wait 블록까지 열어 두었다가 이어 붙입니다.
+    """
+    current: Optional[List[Tuple[int, str]]] = None
+    held: Optional[List[Tuple[int, str]]] = None   # 그림 / 표 때문에 끊긴 문단
+    waited = 0
+    for b in blocks:
+        text = b.text
+        if current is not None and _continues(current, text):
+            current.append((b.page, text))
+            continue
+        if held is not None and _continues(held, text):
+            if current is not None:
+                yield current
+            current, held = held, None
+            current.append((b.page, text))
+            continue
+        if current is not None:
+            if held is None and _is_open(current):
+                held, waited = current, 0
+            else:
+                yield current
+        if held is not None:
+            waited += 1
+            if waited > max_wait:
+                yield held
+                held = None
+        current = [(b.page, text)]
+    if held is not None:
+        yield held
+    if current is not None:
+        yield current
+
+
+def _paragraph_units(paragraph: List[Tuple[int, str]]) -> Iterable[Tuple[int, bool, str]]:
+    """문단 → (문장이 시작하는 page, 문단 첫 문장 여부, 문장)"""
+    text, starts = "", []
+    for page, part in paragraph:
+        if text.endswith("-") and part[:1].islower():
+            text = text[:-1]
+        elif text:
+            text += " "
+        starts.append((len(text), page))
+        text += part
+
+    pos = 0
+    for i, sentence in enumerate(split_sentences(text)):
+        pos = text.find(sentence, pos)
+        page = next(page for offset, page in reversed(starts) if offset <= max(pos, 0))
+        yield page, i == 0, sentence
+        pos += len(sentence)
+
+
+def split_sentences(text: str) -> List[str]:
+    """마침표 / 물음표 / 느낌표 + 공백에서 나누되 약어("e.g.", "et al.", "Fig.")와 이니셜("J.")에서는 나누지 않음"""
+    sentences, start = [], 0
+    for match in _SENTENCE_END.finditer(text):
+        end = match.end()
+        if end < len(text) and not (text[end].isupper() or text[end].isdigit() or text[end] in "\"'([“"):
+            continue
+        word = text[start:match.start()].rsplit(" ", 1)[-1].lower().lstrip("(")
+        if word in _ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+            continue
+        sentences.append(text[start:end].strip())
+        start = end
+    if text[start:].strip():
+        sentences.append(text[start:].strip())
+    return sentences
+
+
+def _hard_split(sentence: str, chunk_size: int) -> List[str]:
+    """chunk_size 보다 긴 문장(표 등)은 단어 경계에서 나눔"""
+    pieces, current = [], ""
+    for word in sentence.split(" "):
+        if current and len(current) + 1 + len(word) > chunk_size:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def pack_sentences(
+    units: Iterable[Tuple[int, bool, str]],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200
+) -> List[Tuple[int, int, str]]:
+    """
+    (page, 문단 시작 여부, 문장) 을 chunk_size 글자까지 채워 (첫 페이지, 마지막 페이지, 본문) 목록으로 만듭니다.
+    문단이 바뀌는 곳은 빈 줄로 잇고, 다음 chunk 는 직전 chunk 의 끝 문장들(chunk_overlap 글자 이내)로 시작합니다.
+    """
+    chunks = []
+    current: List[Tuple[int, bool, str]] = []
+    length = 0
+    fresh = 0   # current 에서 직전 chunk 와 겹치지 않는 문장 수
+
+    def _text(items) -> str:
+        out = ""
+        for i, (_, para_start, sentence) in enumerate(items):
+            out += ("\n\n" if para_start else " ") + sentence if i else sentence
+        return out
+
+    def _emit() -> None:
+        chunks.append((current[0][0], current[-1][0], _text(current)))
+
+    for page, para_start, sentence in units:
+        pieces = _hard_split(sentence, chunk_size) if len(sentence) > chunk_size else [sentence]
+        for j, piece in enumerate(pieces):
+            unit = (page, para_start and j == 0, piece)
+            if current and length + 1 + len(piece) > chunk_size and fresh:
+                _emit()
+                overlap, size = [], 0
+                for item in reversed(current):
+                    if size + len(item[2]) > chunk_overlap or len(overlap) + 1 >= len(current):
+                        break
+                    overlap.insert(0, item)
+                    size += len(item[2]) + 1
+                current, length, fresh = overlap, size, 0
+            current.append(unit)
+            length += len(piece) + (1 if length else 0)
+            fresh += 1
+    if current and fresh:
+        _emit()
+    return chunks
+
+
+def chunk_pdf(pdf_path: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
+    """
+    PDF 하나를 layout chunker 로 분할합니다. (load_pdf + split_documents 대신 사용)
+
+    Parameters
+    ----------
+    pdf_path : str
+        PDF 경로
+    chunk_size : int
+        chunk 최대 글자 수 (split_documents 와 같은 의미)
+    chunk_overlap : int
+        이웃 chunk 와 겹치는 최대 글자 수 (문장 단위)
+
+    Returns
+    -------
+    List[Document]
+        metadata: source / file_path / page(첫 페이지) / page_end(마지막 페이지) / total_pages
+    """
+    import pymupdf # PyMuPDFLoader 와 같은 패키지 (07-DocumentLoader/01-PDF-Loader.ipynb)
+
+    # 이미지 블록은 쓰지 않으므로 이미지 데이터는 추출하지 않음 (기본 flags 대비 페이지당 시간 약 1/3)
+    flags = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+    with pymupdf.open(pdf_path) as doc:
+        pages = [_page_blocks(page, page_no, flags) for page_no, page in enumerate(doc)]
+        total_pages = doc.page_count
+
+    def _units():
+        for paragraph in iter_paragraphs(filter_blocks(pages)):
+            yield from _paragraph_units(paragraph)
+
+    pdf_name = os.path.basename(pdf_path)
+    return [
+        Document(
+            page_content=text,
+            metadata={
+                "source": pdf_name,
+                "file_path": pdf_path,
+                "page": first,
+                "page_end": last,
+                "total_pages": total_pages,
+            },
+        )
+        for first, last, text in pack_sentences(_units(), chunk_size, chunk_overlap)
+    ]
+
+
+def page_label(metadata: dict) -> str:
+    """근거 표시용 페이지: 한 페이지면 "3", 여러 페이지에 걸치면 "3-4\""""
+    page = metadata.get("page", "?")
+    page_end: Optional[int] = metadata.get("page_end")
+    if page_end is None or page_end == page:
+        return str(page)
+    return f"{page}-{page_end}"
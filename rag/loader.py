@@ -16,45 +16,150 @@ PyPDFDirectoryLoader 개념 - 07-DocumentLoader/01-PDF-Loader.ipynb
 loader.py는 이를 수동으로 구현하여 더 세밀한 제어 가능
 
 특히 34-36줄의 metadata["source"] = pdf_name 추가는 RAG 시스템에서 답변의 출처를 추적하는 데 매우 중요한 부분입니다!
+
+iter_loaded_pdfs 는 같은 로드를 프로세스 풀에서 병렬로 수행하고,
+파일 하나가 끝날 때마다 그 파일의 Document 를 내보냅니다. (증분 인덱싱에서 사용)
 """
 
 import os
-from typing import List
-from langchain_community.document_loaders import PyMuPDFLoader # 07-DocumentLoader/01-PDF-Loader.ipynb
-from langchain_core.documents import Document # 07-DocumentLoader/01-PDF-Loader.ipynb
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Tuple
 
+if TYPE_CHECKING:
+    # 타입 표기에만 사용 (list_pdf_files 는 main.py 빠른 시작 경로에서 LangChain 없이 사용)
+    from langchain_core.documents import Document # 07-DocumentLoader/01-PDF-Loader.ipynb
 
-def load_pdfs_from_dir(data_dir: str) -> List[Document]: 
-    """
-    지정한 디렉토리 내 모든 PDF 파일을 로드하여
-    하나의 Document 리스트로 반환합니다.
 
-    각 Document에는 source(pdf 파일명) metadata가 포함됩니다.    
+def list_pdf_files(data_dir: str) -> List[str]:
+    """
+    지정한 디렉토리 내 PDF 파일 이름 목록을 정렬하여 반환합니다.
+    (정렬해 두어야 실행마다 같은 순서로 처리되어 캐시 키가 안정적입니다)
     """
     if not os.path.isdir(data_dir): # 07-DocumentLoader/11-Directory-Loader.ipynb / 파일 시스템에서 파일 읽고 디렉토리 유효성 검사
         raise FileNotFoundError(f"디렉토리를 찾을 수 없습니다: {data_dir}")
 
-    all_documents: List[Document] = []
-
-    pdf_files = [ # 07-DocumentLoader/11-Directory-Loader.ipynb / glob 패턴으로 파일 필터링, 특정 확장자 파일만 선택
+    pdf_files = sorted( # 07-DocumentLoader/11-Directory-Loader.ipynb / glob 패턴으로 파일 필터링, 특정 확장자 파일만 선택
         f for f in os.listdir(data_dir)
         if f.lower().endswith(".pdf")
-    ]
+    )
 
     if not pdf_files:
         raise RuntimeError(f"{data_dir} 안에 PDF 파일이 없습니다.")
 
-    for pdf_name in pdf_files: # 07-DocumentLoader/01-PDF-Loader.ipynb / PyMuPDFLoader 초기화 후 load() 호출
-        pdf_path = os.path.join(data_dir, pdf_name)
-        loader = PyMuPDFLoader(pdf_path)
-        docs = loader.load()
+    return pdf_files
+
+
+def load_pdfs_from_dir(data_dir: str) -> List["Document"]: 
+    """
+    지정한 디렉토리 내 모든 PDF 파일을 로드하여
+    하나의 Document 리스트로 반환합니다.
+
+    각 Document에는 source(pdf 파일명) metadata가 포함됩니다.    
+    """
+    all_documents: List["Document"] = []
 
-        # PDF 출처 정보 추가하도록 설계
-        # 07-DocumentLoader/01-PDF-Loader.ipynb / metadata는 딕셔너리 형태, source, page 등의 정보 포함
-        # 10-VectorStore/02-FAISS.ipynb / metadata에 source 정보 추가하여 출처 추적
-        for d in docs:
-            d.metadata["source"] = pdf_name
+    pdf_files = list_pdf_files(data_dir)
 
+    for pdf_name in pdf_files:
+        docs = load_pdf(os.path.join(data_dir, pdf_name))
         all_documents.extend(docs) # 07-DocumentLoader/11-Directory-Loader.ipynb / 여러 파일의 문서를 하나의 리스트로 통합
 
     return all_documents
+
+
+def load_pdf(pdf_path: str) -> List["Document"]:
+    """
+    PDF 파일 하나를 페이지 단위 Document 리스트로 로드합니다.
+    (증분 인덱싱에서 바뀐 파일만 다시 읽을 때도 사용)
+    """
+    # 임포트가 느려서(약 1초) 저장된 인덱스만 쓰는 실행에서는 불러오지 않도록 로드할 때 임포트
+    from langchain_community.document_loaders import PyMuPDFLoader # 07-DocumentLoader/01-PDF-Loader.ipynb
+
+    loader = PyMuPDFLoader(pdf_path) # 07-DocumentLoader/01-PDF-Loader.ipynb / PyMuPDFLoader 초기화 후 load() 호출
+    docs = loader.load()
+
+    # PDF 출처 정보 추가하도록 설계
+    # 07-DocumentLoader/01-PDF-Loader.ipynb / metadata는 딕셔너리 형태, source, page 등의 정보 포함
+    # 10-VectorStore/02-FAISS.ipynb / metadata에 source 정보 추가하여 출처 추적
+    pdf_name = os.path.basename(pdf_path)
+    for d in docs:
+        d.metadata["source"] = pdf_name
+
+    return docs
+
+
+
+def print_load_error(pdf_path: str, error: BaseException) -> None:
+    """iter_loaded_pdfs() 의 기본 on_error - 경고만 출력하고 그 파일을 건너뜁니다."""
+    print(f"[WARN] PDF 로드 실패 - 건너뜁니다: {pdf_path} ({type(error).__name__}: {error})")
+
+
+def iter_loaded_pdfs(
+    pdf_paths: Iterable[str],
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    on_error: Optional[Callable[[str, BaseException], None]] = None,
+    load: Callable[[str], List["Document"]] = load_pdf
+) -> Iterator[Tuple[str, List["Document"]]]:
+    """
+    PDF 파일들을 프로세스 풀에서 병렬로 로드하여, 끝나는 순서대로
+    (pdf_path, 해당 파일의 Document 리스트) 를 내보냅니다.
+
+    Parameters
+    ----------
+    pdf_paths : Iterable[str]
+        로드할 PDF 경로
+    max_workers : Optional[int]
+        프로세스 수 (기본값: min(4, CPU 수)). 1 이하이면 현재 프로세스에서 순서대로 로드
+    max_in_flight : Optional[int]
+        동시에 제출해 두는 파일 수 (기본값: max_workers * 2).
+        결과를 소비하지 않으면 새 파일을 제출하지 않으므로 메모리 사용량의 상한이 됩니다.
+    on_error : Optional[Callable[[str, BaseException], None]]
+        파일 단위 실패 콜백 (기본값: 경고 출력). 실패한 파일은 건너뛰고 나머지는 계속 로드합니다.
+    load : Callable[[str], List[Document]]
+        파일 하나를 처리하는 함수 (기본값: load_pdf). 프로세스 풀에서 실행되므로 모듈 최상위 함수
+        (또는 그 functools.partial)여야 합니다. 예: partial(chunk_pdf, chunk_size=1000) - 로드 + 분할까지 병렬
+    """
+    on_error = on_error or print_load_error
+    if max_workers is None:
+        max_workers = min(4, os.cpu_count() or 1)
+    pdf_paths = list(pdf_paths)
+
+    if max_workers <= 1 or len(pdf_paths) <= 1:
+        for pdf_path in pdf_paths:
+            try:
+                docs = load(pdf_path)
+            except Exception as e:
+                on_error(pdf_path, e)
+                continue
+            yield pdf_path, docs
+        return
+
+    max_in_flight = max(1, max_in_flight or max_workers * 2)
+    pending_paths = iter(pdf_paths)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = {}
+
+        def _submit_next() -> bool:
+            pdf_path = next(pending_paths, None)
+            if pdf_path is None:
+                return False
+            in_flight[pool.submit(load, pdf_path)] = pdf_path
+            return True
+
+        while len(in_flight) < max_in_flight and _submit_next():
+            pass
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pdf_path = in_flight.pop(future)
+                _submit_next()
+                try:
+                    docs = future.result()
+                except Exception as e:
+                    on_error(pdf_path, e)
+                    continue
+                yield pdf_path, docs
+
@@ -110,4 +110,57 @@ INTEGRATED_PROMPT = ChatPromptTemplate.from_messages([ # 02-Prompt/01-PromptTemp
     ("system", SYSTEM_PROMPT),
     ("human", "질문: {question}\n\n논문 근거:\n{context}"),
     ("human", "Tip: 반드시 정해진 형식(ppt_bullets, script, evidence)으로 답변하세요. 각 bullet에는 source와 page를 명확히 표시해야 합니다.")
-])
\ No newline at end of file
+])
+
+
+# 섹션별 생성(선택, rag/sections.py): evidence 는 검색된 chunk 에서 직접 고르고, bullet → script 순서로 나누어 생성
+class BulletList(BaseModel):
+    """bullet 생성 호출의 구조화된 출력 (PresentationOutput 의 ppt_bullets 와 같은 형식)"""
+
+    ppt_bullets: List[BulletPoint] = Field(
+        description=PresentationOutput.model_fields["ppt_bullets"].description
+    )
+
+
+BULLETS_SYSTEM_PROMPT = """
+당신은 학술 논문 세미나 발표를 돕는 AI 조교입니다.
+반드시 제공된 논문 근거(context)만 사용하여 발표 슬라이드에 사용할 핵심 bullet 3~5개를 작성하세요.
+- 각 bullet은 짧고 명확한 문장으로 작성
+- 방법론, 기여, 수치, 결과 중심
+- 반드시 source(파일명)와 page(페이지 번호) 정보 포함
+
+규칙:
+- 추측 금지
+- 논문 근거가 부족하면 해당 부분에 '논문 근거 부족'이라고 명시
+"""
+
+SCRIPT_SYSTEM_PROMPT = """
+당신은 학술 논문 세미나 발표를 돕는 AI 조교입니다.
+주어진 PPT bullet을 순서대로 설명하는 발표 대본을 작성하세요. 대본만 출력합니다.
+- 발표자가 말하듯 자연스러운 구어체로 작성
+- 왜 중요한지, 어떤 의미인지 설명
+- 어려운 용어는 먼저 쉽게 설명
+- 문단 끝 또는 핵심 문장 끝에 근거를 대괄호로 표시 (예: [MACS.pdf | page 3])
+
+규칙:
+- 추측 금지
+- 모든 주장은 반드시 context에서 찾은 근거를 바탕으로 해야 함
+"""
+
+BULLETS_PROMPT = ChatPromptTemplate.from_messages([ # 02-Prompt/01-PromptTemplate.ipynb
+    ("system", BULLETS_SYSTEM_PROMPT),
+    ("human", "질문: {question}\n\n논문 근거:\n{context}")
+])
+
+SCRIPT_PROMPT = ChatPromptTemplate.from_messages([ # 02-Prompt/01-PromptTemplate.ipynb
+    ("system", SCRIPT_SYSTEM_PROMPT),
+    ("human", "질문: {question}\n\nPPT bullet:\n{bullets}\n\n논문 근거:\n{context}")
+])
+
+
+# 질문 재작성(선택): 한국어 질문을 논문 본문(영어) 검색에 맞는 질의로 바꾸어 원래 질문과 함께 검색 (rag/async_chain.py)
+REWRITE_PROMPT = ChatPromptTemplate.from_messages([ # 02-Prompt/01-PromptTemplate.ipynb
+    ("system", "You rewrite a user's question about an academic paper into one short English search query "
+               "using the technical terms the paper itself would use. Reply with the query only."),
+    ("human", "{question}")
+])
@@ -0,0 +1,263 @@
+# rag/rerank.py
+
+"""
+재순위(rerank) 단계 - 후보 over-fetch → (선택) Cross-Encoder → MMR 다양화
+
+11-Retriever/01-VectorStoreRetriever.ipynb - search_type="mmr", fetch_k / lambda_mult
+
+build_retriever 의 top-k 는 유사도 순서 그대로여서,
+chunk_overlap 으로 거의 같은 내용을 담은 이웃 chunk 가 4개 자리 중 여러 개를 차지하곤 합니다.
+RerankRetriever 는
+1. 질문을 한 번 임베딩하여 후보 fetch_k 개를 가져오고 (하이브리드면 BM25 와 RRF 로 합침)
+2. 후보 벡터는 FAISS 인덱스에 저장된 값을 그대로 꺼내 쓰며 (추가 임베딩 호출 없음)
+3. (선택) 로컬 CPU Cross-Encoder 로 모든 후보를 한 번의 배치로 점수화한 뒤
+4. MMR(Maximal Marginal Relevance)로 관련도는 높고 서로 겹치지 않는 k 개를 고릅니다.
+
+재순위 단계 전체는 budget_ms 안에서 끝나도록 합니다.
+Cross-Encoder 는 지난 호출의 후보당 시간으로 점수화할 후보 수를 줄이고,
+그래도 시간 안에 끝나지 않으면 1단계 점수로 대신합니다.
+Cross-Encoder 는 sentence-transformers 가 설치되어 있을 때만 사용할 수 있습니다. (pip install sentence-transformers)
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from rag.ann import reconstruct_vectors
+from rag.bm25 import HybridRetriever
+from rag.scope import current_scope, scoped_index
+
+
+@dataclass
+class RerankConfig:
+    """재순위 단계 설정"""
+    fetch_k: int = 20                     # over-fetch 할 후보 수
+    lambda_mult: float = 0.7              # MMR: 1 이면 관련도만, 0 이면 다양성만
+    cross_encoder: Optional[str] = None   # 예: "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    budget_ms: float = 50.0               # 재순위 단계 전체 시간 상한
+
+
+def _minmax(x: np.ndarray) -> np.ndarray:
+    span = float(x.max() - x.min()) if len(x) else 0.0
+    return (x - x.min()) / span if span > 0 else np.ones_like(x)
+
+
+def mmr_select(
+    query_vector: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.7,
+    relevance: Optional[np.ndarray] = None
+) -> List[int]:
+    """
+    MMR 로 후보 중 k 개의 위치를 고릅니다.
+
+    score(i) = λ · relevance(i) − (1 − λ) · max_{j ∈ 선택됨} cos(i, j)
+
+    relevance 를 주지 않으면 질문과의 코사인 유사도를 씁니다. (0~1 로 정규화)
+    후보 간 유사도 행렬은 한 번의 행렬곱으로 계산합니다.
+    """
+    n = len(vectors)
+    if n == 0:
+        return []
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    if relevance is None:
+        q = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+        relevance = unit @ q
+    relevance = _minmax(np.asarray(relevance, dtype=np.float32))
+    similarity = unit @ unit.T
+
+    selected = [int(np.argmax(relevance))]
+    max_sim = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_sim, similarity[best], out=max_sim)
+    return selected
+
+
+class CrossEncoderScorer:
+    """로컬 CPU Cross-Encoder (sentence-transformers). 후보 전체를 한 번의 배치로 점수화"""
+
+    def __init__(self, model_name: str, max_length: int = 512):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise RuntimeError(
+                "Cross-Encoder 재순위에는 sentence-transformers 가 필요합니다. (pip install sentence-transformers)"
+            ) from e
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        self.seconds_per_pair: Optional[float] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._running = None
+        self.score("warm up", ["warm up"])   # 첫 호출의 초기화 비용을 미리 지불
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        started = time.perf_counter()
+        scores = self.model.predict([(query, t) for t in texts], batch_size=max(1, len(texts)))
+        per_pair = (time.perf_counter() - started) / max(1, len(texts))
+        # 후보당 시간의 이동 평균 (다음 호출에서 점수화할 후보 수 결정)
+        self.seconds_per_pair = per_pair if self.seconds_per_pair is None else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+        return np.asarray(scores, dtype=np.float32)
+
+    def score_within(self, query: str, texts: Sequence[str], timeout: float) -> Optional[np.ndarray]:
+        """timeout(초) 안에 끝나면 점수, 아니면 None. 이전 호출이 아직 실행 중이어도 None"""
+        if self._running is not None and not self._running.done():
+            return None
+        self._running = self._executor.submit(self.score, query, list(texts))
+        try:
+            return self._running.result(timeout=max(0.0, timeout))
+        except FutureTimeout:
+            return None
+
+
+class Reranker:
+    """
+    Parameters
+    ----------
+    vectorstore : FAISS
+        후보 벡터를 꺼낼 VectorStore
+    config : RerankConfig
+        over-fetch 수 / MMR λ / Cross-Encoder / 시간 예산
+    """
+
+    def __init__(self, vectorstore: FAISS, config: Optional[RerankConfig] = None):
+        self.vectorstore = vectorstore
+        self.config = config or RerankConfig()
+        self.scorer = CrossEncoderScorer(self.config.cross_encoder) if self.config.cross_encoder else None
+        self.calls = 0
+        self.cross_encoder_skipped = 0
+        self.last_ms = 0.0
+        self._positions: Dict[str, int] = {}
+        self._mapping = None
+
+    def _positions_of(self, docs: Sequence[Document]) -> List[Optional[int]]:
+        """문서 → FAISS 인덱스 위치 (삭제/추가로 매핑이 바뀌면 다시 만듦)"""
+        mapping = self.vectorstore.index_to_docstore_id
+        if mapping is not self._mapping or len(mapping) != len(self._positions):
+            self._positions = {doc_id: pos for pos, doc_id in mapping.items()}
+            self._mapping = mapping
+        return [self._positions.get(d.metadata.get("chunk_id") or d.id) for d in docs]
+
+    def rerank(
+        self,
+        query: str,
+        query_vector,
+        docs: List[Document],
+        k: int,
+        relevance: Optional[Sequence[float]] = None
+    ) -> List[Document]:
+        """
+        후보 docs 중 k 개를 고릅니다.
+
+        relevance 는 1단계 점수(하이브리드 RRF 점수 등, 클수록 관련). 없으면 질문과의 코사인 유사도
+        """
+        started = time.perf_counter()
+        budget = self.config.budget_ms / 1000.0
+        self.calls += 1
+        if len(docs) <= 1:
+            return docs[:k]
+
+        rel = np.asarray(relevance, dtype=np.float32) if relevance is not None else None
+        if self.scorer is not None:
+            rel = self._cross_encode(query, docs, rel, budget - (time.perf_counter() - started))
+
+        positions = self._positions_of(docs)
+        vectors = None
+        if all(p is not None for p in positions):
+            vectors = reconstruct_vectors(self.vectorstore.index, np.asarray(positions))
+        if vectors is None:
+            # 벡터를 꺼낼 수 없으면 관련도 순서만 사용
+            order = np.argsort(-rel, kind="stable")[:k] if rel is not None else np.arange(min(k, len(docs)))
+            selected = [int(i) for i in order]
+        else:
+            selected = mmr_select(
+                np.asarray(query_vector, dtype=np.float32),
+                vectors,
+                k,
+                lambda_mult=self.config.lambda_mult,
+                relevance=rel
+            )
+
+        self.last_ms = (time.perf_counter() - started) * 1000
+        return [docs[i] for i in selected]
+
+    def _cross_encode(self, query: str, docs: List[Document], rel: Optional[np.ndarray], remaining: float):
+        # 지난 호출의 후보당 시간으로 예산 안에 점수화할 수 있는 후보 수를 정함 (1단계 순서 앞쪽부터)
+        n = len(docs)
+        if self.scorer.seconds_per_pair:
+            n = min(n, int(remaining * 0.8 / self.scorer.seconds_per_pair))
+        scores = self.scorer.score_within(query, [d.page_content for d in docs[:n]], remaining) if n >= 2 else None
+        if scores is None:
+            self.cross_encoder_skipped += 1
+            return rel
+
+        # 점수화하지 못한 뒤쪽 후보는 Cross-Encoder 최저점보다 낮게
+        full = np.full(len(docs), float(scores.min()) - 1.0, dtype=np.float32)
+        full[:n] = scores
+        return full
+
+    def stats(self) -> str:
+        return (f"calls={self.calls} last={self.last_ms:.1f}ms "
+                f"cross_encoder_skipped={self.cross_encoder_skipped}")
+
+
+class RerankRetriever(BaseRetriever):
+    """질문 임베딩 1회 → 후보 fetch_k 개 (dense 또는 하이브리드) → Reranker 로 k 개"""
+
+    vectorstore: FAISS
+    reranker: Reranker
+    hybrid: Optional[HybridRetriever] = None   # 있으면 후보를 BM25 와 RRF 로 합침
+    k: int = 4
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def fetch_k(self) -> int:
+        return max(self.reranker.config.fetch_k, self.k)
+
+    def rerank_candidates(
+        self, query: str, vector, dense_docs: List[Document], allowed: Optional[Sequence[str]] = None
+    ) -> List[Document]:
+        """
+        dense 후보(fetch_k 개)로부터 최종 k 개 (배치 모드처럼 검색을 따로 한 경우에 사용)
+        allowed : 검색 범위 안의 chunk ID (하이브리드의 BM25 후보 제한, rag/scope.py)
+        """
+        if self.hybrid is None:
+            return self.reranker.rerank(query, vector, dense_docs, self.k)
+        docs, scores = self.hybrid.fuse_scored(query, dense_docs, self.fetch_k, allowed)
+        return self.reranker.rerank(query, vector, docs, self.k, relevance=scores)
+
+    def _rerank(self, query: str, vector) -> List[Document]:
+        scope = current_scope()
+        if scope is None:
+            dense = self.vectorstore.similarity_search_by_vector(vector, k=self.fetch_k)
+            return self.rerank_candidates(query, vector, dense)
+        scoped = scoped_index(self.vectorstore)
+        dense = scoped.search([vector], self.fetch_k, scope)[0]
+        return self.rerank_candidates(query, vector, dense, scoped.chunk_ids(scope))
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: Optional[CallbackManagerForRetrieverRun] = None
+    ) -> List[Document]:
+        return self._rerank(query, self.vectorstore.embeddings.embed_query(query))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        vector = await self.vectorstore.embeddings.aembed_query(query)
+        if self.reranker.scorer is None:
+            return self._rerank(query, vector)
+        # Cross-Encoder 대기(최대 budget_ms) 동안 이벤트 루프를 막지 않도록 스레드에서 실행
+        return await asyncio.to_thread(self._rerank, query, vector)
@@ -0,0 +1,322 @@
+# rag/scope.py
+
+"""
+논문(source) / 페이지 범위로 좁힌 검색
+
+10-VectorStore/02-FAISS.ipynb - FAISS 인덱스 검색
+11-Retriever/01-VectorStoreRetriever.ipynb - Retriever 인터페이스
+
+load_pdfs_from_dir 가 chunk 마다 metadata["source"] 를 남기지만, 검색은 항상 전체 인덱스에서 top-k 를 찾습니다.
+특정 논문에 대한 질문도 다른 논문의 chunk 와 경쟁하고, 결과를 나중에 거르면(post-filter) top-k 가 모자랍니다.
+
+ScopedIndex 는
+1. 인덱스의 chunk 를 source 별로 모아 (FAISS 위치, page, page_end) 목록을 만들고
+   (chunk 의 source / page 는 docs.scope.npz 에서 읽고, 인덱스가 바뀌면 위치가 바뀐 source 만 다시 만듦)
+2. 검색할 때 그 source 의 벡터만 담은 하위 인덱스(IndexFlat, 최근 max_sources 개 캐시)를 검색하며
+3. 페이지 범위가 있으면 하위 인덱스 안에서 IDSelector 로 범위 밖 chunk 를 거리 계산 전에 제외합니다.
+하위 인덱스 크기는 논문 하나의 chunk 수이므로 전체 chunk 가 늘어도 검색 시간이 늘지 않습니다.
+BM25 는 같은 범위의 chunk ID 만 점수를 매깁니다. (BM25Index.search 의 allowed)
+
+검색 범위는 use_scope() 로 지정합니다. (rag/tracing.py 의 trace 와 같은 ContextVar)
+체인 입력은 그대로 {"question"} 이고, 범위 안에서 실행된 retriever / 비동기 체인 / 답변 캐시가 모두 같은 범위를 씁니다.
+
+    with use_scope(SearchScope.parse("MACS.pdf:3-5")):
+        chain.invoke({"question": "..."})
+"""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from weakref import WeakKeyDictionary
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from rag.ann import reconstruct_vectors
+from rag.docstore import BlobDocstore, scope_fields
+
+
+class ScopeError(ValueError):
+    """없는 논문 / 잘못된 페이지 범위 (서버는 400 으로 응답)"""
+
+
+@dataclass(frozen=True)
+class SearchScope:
+    """
+    검색 범위
+
+    source : 논문 파일 이름 (metadata["source"]). 확장자 / 대소문자를 생략하거나 이름 일부만 써도 하나로 정해지면 됨
+    first_page, last_page : 근거 표시와 같은 page 번호의 범위 (양 끝 포함, None 이면 제한 없음)
+    """
+    source: str
+    first_page: Optional[int] = None
+    last_page: Optional[int] = None
+
+    def __post_init__(self):
+        if self.first_page is not None and self.last_page is not None and self.first_page > self.last_page:
+            raise ScopeError(f"페이지 범위가 잘못되었습니다: {self.first_page}-{self.last_page}")
+
+    @classmethod
+    def parse(cls, text: str) -> "SearchScope":
+        """ "MACS.pdf", "MACS.pdf:3", "MACS:3-5" 형식"""
+        text = text.strip()
+        source, pages = text, ""
+        if ":" in text:
+            source, _, pages = text.rpartition(":")
+        if not source:
+            raise ScopeError(f"논문 이름이 없습니다: {text!r}")
+        if not pages:
+            return cls(source)
+        first, _, last = pages.partition("-")
+        try:
+            first_page, last_page = int(first), int(last) if last else int(first)
+        except ValueError:
+            raise ScopeError(f"페이지 범위는 3 또는 3-5 형식이어야 합니다: {pages!r}") from None
+        return cls(source, first_page, last_page)
+
+    def __str__(self) -> str:
+        if self.first_page is None and self.last_page is None:
+            return self.source
+        if self.first_page == self.last_page:
+            return f"{self.source}:{self.first_page}"
+        first = "" if self.first_page is None else self.first_page
+        last = "" if self.last_page is None else self.last_page
+        return f"{self.source}:{first}-{last}"
+
+
+_current_scope: ContextVar[Optional[SearchScope]] = ContextVar("rag_scope", default=None)
+
+
+def current_scope() -> Optional[SearchScope]:
+    return _current_scope.get()
+
+
+@contextmanager
+def use_scope(scope: Optional[SearchScope]) -> Iterator[None]:
+    """with 블록 안의 검색을 scope 로 제한합니다. (None 이면 전체)"""
+    token = _current_scope.set(scope)
+    try:
+        yield
+    finally:
+        _current_scope.reset(token)
+
+
+@dataclass
+class _Source:
+    positions: np.ndarray    # FAISS 인덱스 위치 (int64)
+    pages: np.ndarray        # chunk 첫 페이지 (page 가 없으면 -1)
+    page_ends: np.ndarray    # chunk 마지막 페이지
+    chunk_ids: List[str]
+
+
+class ScopedIndex:
+    """
+    Parameters
+    ----------
+    vectorstore : FAISS
+        전체 인덱스
+    max_sources : int
+        캐시할 하위 인덱스 수 (논문 하나당 chunk 수 × 차원 × 4 bytes)
+    """
+
+    def __init__(self, vectorstore: FAISS, max_sources: int = 16):
+        self.vectorstore = vectorstore
+        self.max_sources = max_sources
+        self._sources: Dict[str, _Source] = {}
+        self._subindexes: "OrderedDict[str, Optional[faiss.Index]]" = OrderedDict()
+        self._signature = None
+        self._positions: Dict[int, str] = {}                           # 마지막 _refresh 의 FAISS 위치 → chunk ID
+        self._fields: Dict[str, Optional[Tuple[str, int, int]]] = {}   # chunk ID → (source, page, page_end)
+        self._lock = threading.Lock()
+
+    def _chunk_fields(self, chunk_id: str) -> Optional[Tuple[str, int, int]]:
+        if chunk_id in self._fields:
+            return self._fields[chunk_id]
+        docstore = self.vectorstore.docstore
+        fields = docstore.scope_fields(chunk_id) if isinstance(docstore, BlobDocstore) else None
+        if fields is None:
+            # docs.scope.npz 가 없는 이전 인덱스 / InMemoryDocstore: chunk 를 읽어서 확인
+            doc = docstore.search(chunk_id)
+            fields = scope_fields(doc.metadata) if isinstance(doc, Document) else None
+        self._fields[chunk_id] = fields
+        return fields
+
+    def _refresh(self) -> None:
+        """인덱스가 바뀌었으면 (추가 / 삭제) 위치가 바뀐 source 의 목록과 하위 인덱스만 다시 만듭니다."""
+        vs = self.vectorstore
+        mapping = vs.index_to_docstore_id
+        signature = (id(vs.index), vs.index.ntotal, id(mapping), len(mapping))
+        if signature == self._signature:
+            return
+        if self._signature is not None and self._signature[0] != id(vs.index):
+            self._subindexes.clear()   # 인덱스를 새로 만들었으면 (ANN 재학습 등) 꺼낸 벡터가 다를 수 있음
+
+        positions = dict(mapping)
+        changed: Set[str] = set()
+        for pos, chunk_id in positions.items():
+            old_id = self._positions.get(pos)
+            if old_id != chunk_id:
+                changed.update(f[0] for f in (self._chunk_fields(chunk_id), self._fields.get(old_id)) if f)
+        for pos in self._positions.keys() - positions.keys():
+            fields = self._fields.get(self._positions[pos])
+            if fields:
+                changed.add(fields[0])
+
+        rows: Dict[str, list] = {source: [] for source in changed}
+        for pos, chunk_id in positions.items():
+            fields = self._fields[chunk_id]
+            if fields and fields[0] in changed:
+                rows[fields[0]].append((pos, fields[1], fields[2], chunk_id))
+        for source, items in rows.items():
+            self._subindexes.pop(source, None)
+            if not items:
+                self._sources.pop(source, None)
+                continue
+            self._sources[source] = _Source(
+                positions=np.asarray([r[0] for r in items], dtype=np.int64),
+                pages=np.asarray([r[1] for r in items], dtype=np.int64),
+                page_ends=np.asarray([r[2] for r in items], dtype=np.int64),
+                chunk_ids=[r[3] for r in items],
+            )
+
+        self._fields = {chunk_id: self._fields[chunk_id] for chunk_id in positions.values()}
+        self._positions = positions
+        self._signature = signature
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._sources)
+
+    def resolve(self, scope: SearchScope) -> SearchScope:
+        """scope.source 를 인덱스에 있는 source 이름 하나로 정합니다. (없거나 여러 개면 ScopeError)"""
+        with self._lock:
+            self._refresh()
+            if scope.source in self._sources:
+                return scope
+        sources = self.sources()
+        wanted = scope.source.lower()
+        stem = lambda name: name.lower().rsplit(".", 1)[0]
+        matches = [s for s in sources if s.lower() == wanted or stem(s) == wanted]
+        if not matches:
+            matches = [s for s in sources if wanted in s.lower()]
+        if len(matches) != 1:
+            reason = "여러 논문과 일치합니다" if matches else "논문을 찾을 수 없습니다"
+            raise ScopeError(f"{reason}: {scope.source} (가능한 값: {', '.join(matches or sources)})")
+        return replace(scope, source=matches[0])
+
+    def _subindex(self, source: str) -> Optional[faiss.Index]:
+        """source 의 벡터만 담은 IndexFlat (벡터를 꺼낼 수 없는 인덱스면 None → 전체 인덱스 + IDSelector)"""
+        if source in self._subindexes:
+            self._subindexes.move_to_end(source)
+            return self._subindexes[source]
+        index = self.vectorstore.index
+        vectors = reconstruct_vectors(index, self._sources[source].positions)
+        sub = None
+        if vectors is not None:
+            sub = faiss.IndexFlat(index.d, index.metric_type)
+            sub.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        self._subindexes[source] = sub
+        while len(self._subindexes) > self.max_sources:
+            self._subindexes.popitem(last=False)
+        return sub
+
+    def _selected(self, entry: _Source, scope: SearchScope) -> Optional[np.ndarray]:
+        """페이지 범위와 겹치는 chunk 의 하위 인덱스 위치 (범위가 없으면 None = 전부)"""
+        if scope.first_page is None and scope.last_page is None:
+            return None
+        mask = np.ones(len(entry.positions), dtype=bool)
+        if scope.first_page is not None:
+            mask &= entry.page_ends >= scope.first_page
+        if scope.last_page is not None:
+            mask &= entry.pages <= scope.last_page
+        return np.flatnonzero(mask).astype(np.int64)
+
+    def chunk_ids(self, scope: SearchScope) -> List[str]:
+        """범위 안의 chunk ID (BM25 검색 제한용)"""
+        scope = self.resolve(scope)
+        with self._lock:
+            entry = self._sources[scope.source]
+            selected = self._selected(entry, scope)
+        if selected is None:
+            return list(entry.chunk_ids)
+        return [entry.chunk_ids[i] for i in selected]
+
+    def search(self, vectors, k: int, scope: SearchScope) -> List[List[Document]]:
+        """임베딩 행렬 (n, d) → 질문별 범위 안 top-k 문서 (batch.search_by_vectors 와 같은 형식)"""
+        scope = self.resolve(scope)
+        x = np.asarray(vectors, dtype=np.float32).reshape(-1, self.vectorstore.index.d)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            x = x.copy()
+            faiss.normalize_L2(x)
+
+        with self._lock:
+            entry = self._sources[scope.source]
+            selected = self._selected(entry, scope)
+            sub = self._subindex(scope.source)
+        if selected is not None and not len(selected):
+            return [[] for _ in range(len(x))]
+
+        if sub is not None:
+            ids = selected
+            to_position = None
+        else:
+            # 하위 인덱스를 만들 수 없으면 전체 인덱스 검색 안에서 범위 밖 벡터를 제외
+            ids = entry.positions if selected is None else entry.positions[selected]
+            to_position = {int(p): i for i, p in enumerate(entry.positions)}
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(ids)) if ids is not None else None
+        limit = min(k, len(entry.positions) if selected is None else len(selected))
+        _, indices = (sub or self.vectorstore.index).search(x, limit, params=params)
+
+        results: List[List[Document]] = []
+        for row in indices:
+            docs = []
+            for i in row:
+                if i == -1:
+                    continue
+                local = int(i) if to_position is None else to_position[int(i)]
+                doc = self.vectorstore.docstore.search(entry.chunk_ids[local])
+                if isinstance(doc, Document):
+                    docs.append(doc)
+            results.append(docs)
+        return results
+
+
+_scoped_indexes: "WeakKeyDictionary[FAISS, ScopedIndex]" = WeakKeyDictionary()
+_scoped_lock = threading.Lock()
+
+
+def scoped_index(vectorstore: FAISS) -> ScopedIndex:
+    """VectorStore 마다 하나의 ScopedIndex (source 목록 / 하위 인덱스 캐시를 retriever 와 체인이 공유)"""
+    with _scoped_lock:
+        index = _scoped_indexes.get(vectorstore)
+        if index is None:
+            index = _scoped_indexes[vectorstore] = ScopedIndex(vectorstore)
+        return index
+
+
+class ScopedVectorStoreRetriever(VectorStoreRetriever):
+    """vectorstore.as_retriever() 와 같되, use_scope() 안에서는 범위 안의 top-k 를 검색"""
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs
+    ) -> List[Document]:
+        scope = current_scope()
+        if scope is None:
+            return super()._get_relevant_documents(query, run_manager=run_manager, **kwargs)
+        vector = self.vectorstore.embeddings.embed_query(query)
+        return scoped_index(self.vectorstore).search([vector], self.search_kwargs.get("k", 4), scope)[0]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager, **kwargs) -> List[Document]:
+        scope = current_scope()
+        if scope is None:
+            return await super()._aget_relevant_documents(query, run_manager=run_manager, **kwargs)
+        vector = await self.vectorstore.embeddings.aembed_query(query)
+        return scoped_index(self.vectorstore).search([vector], self.search_kwargs.get("k", 4), scope)[0]
@@ -0,0 +1,313 @@
+# rag/sections.py
+
+"""
+섹션별 생성 체인 - 구조화된 출력 호출 하나 대신 evidence 추출 / bullet 생성 / script 생성으로 나눔
+
+06-Chains/03-Structured-Output-Chain.ipynb - with_structured_output()
+01-Basic/03-LCEL.Ipynb - stream() / ainvoke
+12-RAG/01-RAG-Basic-PDF.ipynb - retriever 와 prompt 연결
+
+build_answer_chain() 은 gpt-4o-mini 호출 한 번으로 ppt_bullets / script / evidence 를 모두 만들므로
+세 섹션의 출력 토큰이 모두 생성되어야 응답이 끝나고, 원문 그대로인 evidence 도 토큰 단위로 다시 생성됩니다.
+build_sectioned_answer_chain() 은
+1. bullets  : BULLETS_PROMPT 로 bullet 만 구조화된 출력으로 생성하고
+2. script   : bullet 이 나오면 SCRIPT_PROMPT(질문 + bullet + context)로 대본을 일반 텍스트로 생성하며 (스트리밍 가능)
+3. evidence : 2 와 동시에, 검색된 chunk 의 문장을 로컬에서 점수화하여 고릅니다. (LLM 호출 없음, extract_evidence)
+결과는 같은 PresentationOutput 이므로 build_rag_chain / 비동기 체인 / 답변 캐시 / 배치 모드에 그대로 넣을 수 있습니다.
+tracer 를 넘기면 format_docs / llm_bullets / parse_bullets / llm_script / evidence 단계 시간을 기록합니다.
+"""
+
+import asyncio
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableGenerator, RunnableLambda # 13-LangChain-Expression-Language/03-RunnableLambda.ipynb
+
+from rag.bm25 import tokenize
+from rag.chain import build_llm, format_docs
+from rag.context import DEFAULT_CONTEXT_TOKENS
+from rag.layout import split_sentences
+from rag.prompts import BULLETS_PROMPT, SCRIPT_PROMPT, BulletList, BulletPoint, PresentationOutput
+from rag.tracing import ChainTracer, split_structured_llm
+
+
+DEFAULT_EVIDENCE = 3
+
+# evidence 후보 문장 길이 (문자). 짧으면 표 / 캡션 조각, 길면 여러 문장이 붙은 추출 오류인 경우가 많음
+_MIN_SENTENCE_CHARS = 40
+_MAX_SENTENCE_CHARS = 400
+_SENTENCE_CLOSE = re.compile(r"[.!?][\"')\]]*$")
+_LATIN = re.compile(r"[A-Za-z]")
+
+# 점수 = 질문 / bullet 단어 일치 + 검색 결과 안에서의 중심성 + 검색 순위 + 수치 포함
+_W_QUERY = 1.0
+_W_HINT = 0.5
+_W_CENTRAL = 1.0
+_W_RANK = 0.3
+_W_NUMBER = 0.1
+
+
+def candidate_sentences(docs: Sequence[Document]) -> List[Tuple[int, str]]:
+    """
+    (chunk 순위, 문장) 목록 - 영어 원문의 완결된 문장만
+    chunk 경계에서 잘린 앞 / 뒤 조각과, chunk_overlap 으로 두 번 나오는 문장은 제외합니다.
+    """
+    seen = set()
+    candidates: List[Tuple[int, str]] = []
+    for rank, doc in enumerate(docs):
+        for sentence in split_sentences(re.sub(r"\s+", " ", doc.page_content).strip()):
+            if not _MIN_SENTENCE_CHARS <= len(sentence) <= _MAX_SENTENCE_CHARS or sentence in seen:
+                continue
+            if not (sentence[0].isupper() or sentence[0].isdigit()) or not _SENTENCE_CLOSE.search(sentence):
+                continue
+            if len(_LATIN.findall(sentence)) < 0.5 * len(sentence):   # 수식 / 표 조각
+                continue
+            seen.add(sentence)
+            candidates.append((rank, sentence))
+    return candidates
+
+
+def extract_evidence(
+    question: str,
+    docs: Sequence[Document],
+    n: int = DEFAULT_EVIDENCE,
+    hints: Sequence[str] = (),
+    redundancy: float = 0.5
+) -> List[str]:
+    """
+    검색된 chunk 에서 evidence 로 쓸 원문 문장 n 개를 고릅니다. (LLM 호출 없음)
+
+    Parameters
+    ----------
+    question : str
+        질문 (영어 용어 / 모델 이름 / 수치가 문장과 일치하면 가산)
+    docs : Sequence[Document]
+        Retriever 결과 (관련도 순서)
+    n : int
+        고를 문장 수
+    hints : Sequence[str]
+        생성된 bullet 등 추가로 일치를 볼 텍스트 (질문보다 낮은 가중치)
+    redundancy : float
+        이미 고른 문장과 단어 Jaccard 유사도가 이 값 이상이면 건너뜀
+
+    Returns
+    -------
+    List[str]
+        점수 순서의 문장 (문장 안의 공백만 정리한 원문 그대로)
+
+    한국어 질문처럼 문장과 겹치는 단어가 없어도 동작하도록,
+    검색된 문장들 전체에 자주 나오는 주제어를 많이 담은 문장(중심성)과 검색 순위를 함께 반영합니다.
+    """
+    candidates = candidate_sentences(docs)
+    if not candidates or n <= 0:
+        return []
+    token_sets = [set(tokenize(sentence)) for _, sentence in candidates]
+    vocab: Dict[str, int] = {}
+    for tokens in token_sets:
+        for tok in tokens:
+            vocab.setdefault(tok, len(vocab))
+
+    # 문장 × 단어 idf 가중 행렬 (후보는 수십 개이므로 dense 로 충분)
+    df = np.zeros(len(vocab), dtype=np.float32)
+    for tokens in token_sets:
+        df[[vocab[t] for t in tokens]] += 1
+    idf = np.log1p(len(candidates) / np.maximum(df, 1)).astype(np.float32)
+    matrix = np.zeros((len(candidates), len(vocab)), dtype=np.float32)
+    for i, tokens in enumerate(token_sets):
+        cols = [vocab[t] for t in tokens]
+        matrix[i, cols] = idf[cols]
+
+    def _match(text: str) -> np.ndarray:
+        cols = [vocab[t] for t in set(tokenize(text)) if t in vocab]
+        score = matrix[:, cols].sum(axis=1) if cols else np.zeros(len(candidates), dtype=np.float32)
+        return score / score.max() if score.max() > 0 else score
+
+    rows = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-6)
+    centroid = rows.sum(axis=0)
+    central = rows @ centroid / max(float(np.linalg.norm(centroid)), 1e-6)
+    central = central / central.max() if central.max() > 0 else central
+
+    ranks = np.asarray([rank for rank, _ in candidates], dtype=np.float32)
+    numbers = np.asarray([any(c.isdigit() for c in sentence) for _, sentence in candidates], dtype=np.float32)
+    scores = (_W_QUERY * _match(question) + _W_HINT * _match(" ".join(hints))
+              + _W_CENTRAL * central + _W_RANK / (1.0 + ranks) + _W_NUMBER * numbers)
+
+    chosen: List[int] = []
+    for i in np.argsort(-scores, kind="stable"):
+        if any(len(token_sets[i] & token_sets[j]) / max(len(token_sets[i] | token_sets[j]), 1) >= redundancy
+               for j in chosen):
+            continue
+        chosen.append(int(i))
+        if len(chosen) >= n:
+            break
+    return [candidates[i][1] for i in chosen]
+
+
+def bullet_lines(bullets: Sequence[BulletPoint]) -> str:
+    """SCRIPT_PROMPT 의 {bullets} - 출력 화면과 같은 "- 내용 [source | page p]" 형식"""
+    return "\n".join(f"- {b.content} [{b.source} | page {b.page}]" for b in bullets)
+
+
+def _text(message: Any) -> str:
+    content = getattr(message, "content", message)
+    if isinstance(content, list):   # content block 형식
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return content if isinstance(content, str) else str(content)
+
+
+class _Sections:
+    """bullet / script 호출과 evidence 추출 (answer chain / streaming chain 공용)"""
+
+    def __init__(self, llm, context_tokens: int, log_context: bool, tracer: Optional[ChainTracer], n_evidence: int):
+        self.tracer = tracer
+        self.n_evidence = n_evidence
+        self.format = partial(format_docs, max_tokens=context_tokens, log=log_context)
+        bullets_llm = llm.with_structured_output(BulletList)
+        if tracer is None:
+            self.bullets = BULLETS_PROMPT | bullets_llm
+            self.script = SCRIPT_PROMPT | llm
+        else:
+            # build_answer_chain 과 같이 LLM 호출과 구조화된 출력 파싱을 나누어 기록
+            llm_call, parser = split_structured_llm(bullets_llm)
+            self.bullets = BULLETS_PROMPT | tracer.stage("llm_bullets", llm_call)
+            if parser is not None:
+                self.bullets = self.bullets | tracer.stage("parse_bullets", parser)
+            self.script = SCRIPT_PROMPT | tracer.stage("llm_script", llm)
+        # evidence 추출은 script 호출과 동시에 스레드에서 실행
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="evidence")
+
+    def _record(self, stage: str, started: float, output=None) -> None:
+        if self.tracer is not None:
+            self.tracer.record(stage, time.perf_counter() - started, output)
+
+    def context(self, docs: List[Document]) -> str:
+        started = time.perf_counter()
+        context = self.format(docs)
+        self._record("format_docs", started)
+        return context
+
+    def evidence(self, question: str, docs: List[Document], bullets: Sequence[BulletPoint]) -> List[str]:
+        started = time.perf_counter()
+        evidence = extract_evidence(question, docs, self.n_evidence, hints=[b.content for b in bullets])
+        self._record("evidence", started)
+        return evidence
+
+    def submit_evidence(self, question: str, docs: List[Document], bullets: Sequence[BulletPoint]):
+        # 스레드에서도 같은 trace 에 기록되도록 contextvars 를 복사
+        return self.executor.submit(contextvars.copy_context().run, self.evidence, question, docs, bullets)
+
+    def invoke(self, inputs: Dict[str, Any], config=None) -> PresentationOutput:
+        question, docs = inputs["question"], inputs["docs"]
+        context = self.context(docs)
+        bullets = self.bullets.invoke({"question": question, "context": context}, config=config).ppt_bullets
+        evidence = self.submit_evidence(question, docs, bullets)
+        script = self.script.invoke(
+            {"question": question, "bullets": bullet_lines(bullets), "context": context}, config=config
+        )
+        return PresentationOutput(ppt_bullets=bullets, script=_text(script), evidence=evidence.result())
+
+    async def ainvoke(self, inputs: Dict[str, Any], config=None) -> PresentationOutput:
+        question, docs = inputs["question"], inputs["docs"]
+        context = self.context(docs)
+        bullets = (await self.bullets.ainvoke({"question": question, "context": context}, config=config)).ppt_bullets
+        evidence = asyncio.wrap_future(self.submit_evidence(question, docs, bullets))
+        script = await self.script.ainvoke(
+            {"question": question, "bullets": bullet_lines(bullets), "context": context}, config=config
+        )
+        return PresentationOutput(ppt_bullets=bullets, script=_text(script), evidence=await evidence)
+
+    def stream(self, inputs: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """build_streaming_chain() 과 같은 부분 dict: bullet 확정 → script 조각마다 → evidence"""
+        question, docs = inputs["question"], inputs["docs"]
+        context = self.context(docs)
+        bullets = self.bullets.invoke({"question": question, "context": context}).ppt_bullets
+        evidence = self.submit_evidence(question, docs, bullets)
+        # "script" 키가 있어야 마지막 bullet 까지 바로 확정됨 (streaming.PresentationEventState)
+        partial = {"ppt_bullets": [b.model_dump() for b in bullets], "script": ""}
+        yield dict(partial)
+        for chunk in self.script.stream({"question": question, "bullets": bullet_lines(bullets), "context": context}):
+            partial["script"] += _text(chunk)
+            yield dict(partial)
+        yield {**partial, "evidence": evidence.result()}
+
+    async def astream(self, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        question, docs = inputs["question"], inputs["docs"]
+        context = self.context(docs)
+        bullets = (await self.bullets.ainvoke({"question": question, "context": context})).ppt_bullets
+        evidence = asyncio.wrap_future(self.submit_evidence(question, docs, bullets))
+        partial = {"ppt_bullets": [b.model_dump() for b in bullets], "script": ""}
+        yield dict(partial)
+        async for chunk in self.script.astream(
+            {"question": question, "bullets": bullet_lines(bullets), "context": context}
+        ):
+            partial["script"] += _text(chunk)
+            yield dict(partial)
+        yield {**partial, "evidence": await evidence}
+
+
+def build_sectioned_answer_chain(
+    llm=None,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    log_context: bool = True,
+    tracer: Optional[ChainTracer] = None,
+    n_evidence: int = DEFAULT_EVIDENCE
+):
+    """
+    build_answer_chain() 과 같은 입력 / 출력 ({"question", "docs"} → PresentationOutput)
+
+    Parameters
+    ----------
+    llm : Optional
+        bullet / script 를 생성할 LLM (없으면 build_llm())
+    context_tokens : int
+        context 토큰 예산
+    log_context : bool
+        context 구성 전/후 토큰 수 출력 여부
+    tracer : Optional[ChainTracer]
+        단계별 시간 기록 (format_docs / llm_bullets / parse_bullets / llm_script / evidence)
+    n_evidence : int
+        evidence 문장 수
+    """
+    sections = _Sections(llm or build_llm(), context_tokens, log_context, tracer, n_evidence)
+    return RunnableLambda(sections.invoke, afunc=sections.ainvoke, name="sectioned_answer_chain")
+
+
+def build_sectioned_streaming_chain(
+    retriever,
+    llm=None,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    n_evidence: int = DEFAULT_EVIDENCE,
+    log_context: bool = True
+):
+    """
+    build_streaming_chain() 과 같은 부분 dict 를 stream 하는 섹션별 생성 체인
+    (iter_presentation_events / aiter_presentation_events 로 그대로 출력)
+    """
+    sections = _Sections(llm or build_llm(), context_tokens, log_context, None, n_evidence)
+
+    def _transform(chunks: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        inputs: Dict[str, Any] = {}
+        for chunk in chunks:   # {"question"} / {"docs"} 가 따로 도착
+            inputs.update(chunk)
+        yield from sections.stream(inputs)
+
+    async def _atransform(chunks: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        inputs: Dict[str, Any] = {}
+        async for chunk in chunks:
+            inputs.update(chunk)
+        async for partial in sections.astream(inputs):
+            yield partial
+
+    return (
+        {
+            "question": lambda x: x["question"],
+            "docs": (lambda x: x["question"]) | retriever,
+        }
+        | RunnableGenerator(_transform, _atransform, name="sectioned_stream")
+    )
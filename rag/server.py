@@ -0,0 +1,229 @@
+# rag/server.py
+
+"""
+HTTP 서빙 모드 (FastAPI)
+
+input() 루프는 한 번에 한 명만 처리하고, 프로세스마다 인덱스를 따로 읽습니다.
+서버 모드는 파이프라인을 한 번만 구성하고 읽기 전용 FAISS 인덱스를 모든 요청이 공유하며,
+chain.ainvoke / chain.astream 으로 여러 질문을 동시에 처리합니다.
+
+- POST /ask          {"question": "..."} → PresentationOutput JSON
+                     {"question", "paper": "MACS.pdf", "first_page": 3, "last_page": 5} 이면 그 논문(페이지)만 검색
+- POST /ask/stream   {"question": "..."} → Server-Sent Events (bullet / script / evidence / done)
+- GET  /healthz      상태 및 현재 처리 중 / 대기 중 요청 수, 프로세스 메모리(MB)
+- GET  /metrics      단계별 처리 시간 / 토큰 수 / 캐시 적중 (Prometheus 텍스트 형식, rag/tracing.py)
+
+LLM 으로 가는 동시 요청 수는 max_concurrency 로 제한하고,
+대기열이 max_queue 를 넘으면 바로 503 을 돌려주어(backpressure) 지연이 끝없이 늘어나지 않게 합니다.
+
+fastapi / uvicorn 은 서버 모드에서만 필요합니다. (pip install fastapi uvicorn)
+"""
+
+import asyncio
+import json
+import weakref
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from rag.scope import ScopeError, SearchScope, use_scope
+from rag.streaming import aiter_presentation_events
+from rag.tracing import MetricsRegistry, process_memory
+
+
+class AskRequest(BaseModel):
+    question: str = Field(min_length=1, description="질문")
+    paper: Optional[str] = Field(default=None, description="검색할 논문 파일 이름 (없으면 전체)")
+    first_page: Optional[int] = Field(default=None, description="검색할 첫 페이지 (근거 표시와 같은 번호)")
+    last_page: Optional[int] = Field(default=None, description="검색할 마지막 페이지")
+
+    def search_scope(self) -> Optional[SearchScope]:
+        if self.paper is None:
+            if self.first_page is not None or self.last_page is not None:
+                raise ScopeError("페이지 범위는 paper 와 함께 지정해야 합니다.")
+            return None
+        return SearchScope(self.paper, self.first_page, self.last_page)
+
+
+class _Admission:
+    """동시 실행 수 제한 + 대기열 길이 제한"""
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.running = 0
+        self.waiting = 0
+
+    def admit(self) -> bool:
+        """대기열이 가득 찼으면 False (요청 거절)"""
+        return self.running + self.waiting < self.max_concurrency + self.max_queue
+
+    def reserve(self) -> Optional["_Reservation"]:
+        """
+        대기열 자리를 바로(await 없이) 잡아 둡니다. 가득 찼으면 None
+        스트리밍 응답은 본문 생성기가 나중에 시작되므로, 요청을 받을 때 자리를 잡아야
+        동시에 들어온 요청들이 모두 admit() 검사를 통과하지 않습니다.
+        """
+        if not self.admit():
+            return None
+        self.waiting += 1
+        return _Reservation(self)
+
+    @asynccontextmanager
+    async def slot(self, reservation: "_Reservation"):
+        try:
+            await self.semaphore.acquire()
+        finally:
+            reservation.release()
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.semaphore.release()
+
+
+class _Reservation:
+    """reserve() 로 잡은 대기열 자리 (release 는 한 번만 반영)"""
+
+    def __init__(self, admission: _Admission):
+        self.admission = admission
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.admission.waiting -= 1
+
+
+def create_app(
+    chain,
+    stream_chain=None,
+    max_concurrency: int = 8,
+    max_queue: int = 64,
+    request_timeout: Optional[float] = 120.0,
+    info: Optional[dict] = None,
+    metrics: Optional[MetricsRegistry] = None
+):
+    """
+    Parameters
+    ----------
+    chain : Runnable
+        build_rag_chain() 결과 ({"question"} → PresentationOutput)
+    stream_chain : Optional[Runnable]
+        build_streaming_chain() 결과 (없으면 /ask/stream 은 404)
+    max_concurrency : int
+        동시에 LLM 까지 진행하는 요청 수
+    max_queue : int
+        슬롯을 기다릴 수 있는 요청 수 (넘으면 503)
+    request_timeout : Optional[float]
+        요청 하나의 최대 처리 시간(초), 스트리밍은 이벤트 사이의 최대 대기 시간(초)
+    info : Optional[dict]
+        /healthz 에 함께 보여줄 정보 (인덱스 버전 등)
+    metrics : Optional[MetricsRegistry]
+        /metrics 로 내보낼 지표 (chain 의 ChainTracer.metrics, 없으면 /metrics 는 404)
+    """
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import PlainTextResponse, StreamingResponse
+
+    app = FastAPI(title="DINHO_rag")
+    admission = _Admission(max_concurrency, max_queue)
+
+    def _reserve_or_reject() -> _Reservation:
+        reservation = admission.reserve()
+        if reservation is None:
+            raise HTTPException(
+                status_code=503,
+                detail="요청이 많아 잠시 후 다시 시도해 주세요.",
+                headers={"Retry-After": "1"}
+            )
+        return reservation
+
+    def _sse(kind: str, value) -> str:
+        return f"event: {kind}\ndata: {json.dumps(value, ensure_ascii=False)}\n\n"
+
+    @app.get("/healthz")
+    async def healthz():
+        return {
+            "status": "ok",
+            "running": admission.running,
+            "waiting": admission.waiting,
+            "max_concurrency": admission.max_concurrency,
+            "max_queue": admission.max_queue,
+            "memory_mb": {kind: round(value / 2**20, 1) for kind, value in process_memory().items()},
+            **(info or {}),
+        }
+
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        if metrics is None:
+            raise HTTPException(status_code=404, detail="지표 수집이 비활성화되어 있습니다.")
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    def _scope_of(req: AskRequest) -> Optional[SearchScope]:
+        try:
+            return req.search_scope()
+        except ScopeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.post("/ask")
+    async def ask(req: AskRequest):
+        scope = _scope_of(req)
+        async with admission.slot(_reserve_or_reject()):
+            try:
+                with use_scope(scope):
+                    result = await asyncio.wait_for(
+                        chain.ainvoke({"question": req.question}),
+                        timeout=request_timeout
+                    )
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504, detail="응답 생성 시간이 초과되었습니다.")
+            except ScopeError as e:
+                # 인덱스에 없는 논문 이름은 검색 단계에서야 알 수 있음
+                raise HTTPException(status_code=400, detail=str(e))
+        return result.model_dump()
+
+    @app.post("/ask/stream")
+    async def ask_stream(req: AskRequest):
+        if stream_chain is None:
+            raise HTTPException(status_code=404, detail="스트리밍 체인이 구성되지 않았습니다.")
+        scope = _scope_of(req)
+        reservation = _reserve_or_reject()
+
+        async def _events():
+            # 응답 본문은 요청 처리와 다른 context 에서 생성되므로 범위를 여기서 지정
+            # (wait_for 가 만드는 task 는 지금 context 를 복사하므로 다음 이벤트도 같은 범위로 생성)
+            async with admission.slot(reservation):
+                with use_scope(scope):
+                    events = aiter_presentation_events(stream_chain.astream({"question": req.question}))
+                    try:
+                        while True:
+                            try:
+                                kind, value = await asyncio.wait_for(events.__anext__(), timeout=request_timeout)
+                            except StopAsyncIteration:
+                                break
+                            if kind == "done":
+                                value = value.model_dump()
+                            yield _sse(kind, value)
+                    except asyncio.TimeoutError:
+                        yield _sse("error", "응답 생성 시간이 초과되었습니다.")
+                    except Exception as e:
+                        yield _sse("error", str(e))
+                    finally:
+                        await events.aclose()
+
+        body = _events()
+        # 연결이 본문 생성 전에 끊기면 생성기가 시작되지 않으므로, 버려질 때 자리를 돌려줌
+        weakref.finalize(body, reservation.release)
+        return StreamingResponse(body, media_type="text/event-stream")
+
+    return app
+
+
+def serve(app, host: str = "127.0.0.1", port: int = 8000) -> None:
+    import uvicorn
+
+    # 인덱스를 프로세스 하나에서 공유하기 위해 worker 는 1개로 실행 (동시성은 asyncio 로 처리)
+    uvicorn.run(app, host=host, port=port, workers=1)
@@ -13,10 +13,11 @@ RAG 파이프라인의 2단계 - 12-RAG/01-RAG-Basic-PDF.ipynb
 벡터 임베딩 전 필수 단계
 특히 33줄의 separators=["\n\n", "\n", ".", " ", ""]는 논문처럼 문장 구조가 중요한 문서에 최적화된 설정입니다!
 """
-from langchain_text_splitters import RecursiveCharacterTextSplitter # 08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb
 from langchain_core.documents import Document
 from typing import List
 
+from rag.config import CHUNKERS, DEFAULT_CHUNKER # 분할 방식 목록 / 기본값
+
 
 def split_documents(
     documents: List[Document], # 08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb
@@ -40,11 +41,18 @@ def split_documents(
     List[Document]
         분할된 Document 리스트
     """
-    splitter = RecursiveCharacterTextSplitter( # 08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb
+    splitter = _make_splitter(chunk_size, chunk_overlap)
+
+    split_docs = splitter.split_documents(documents) # 12-RAG/01-RAG-Basic-PDF.ipynb
+    return split_docs
+
+
+def _make_splitter(chunk_size: int, chunk_overlap: int):
+    # 임포트가 느려서(약 0.4초) 저장된 인덱스만 쓰는 실행에서는 불러오지 않도록 분할할 때 임포트
+    from langchain_text_splitters import RecursiveCharacterTextSplitter # 08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb
+
+    return RecursiveCharacterTextSplitter( # 08-TextSplitter/02-RecursiveCharacterTextSplitter.ipynb
         chunk_size=chunk_size, 
         chunk_overlap=chunk_overlap,
         separators=["\n\n", "\n", ".", " ", ""]
     )
-
-    split_docs = splitter.split_documents(documents) # 12-RAG/01-RAG-Basic-PDF.ipynb
-    return split_docs
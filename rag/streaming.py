@@ -0,0 +1,127 @@
+# rag/streaming.py
+
+"""
+구조화된 출력(PresentationOutput) 스트리밍
+
+01-Basic/03-LCEL.Ipynb - stream() 으로 토큰 단위 출력
+06-Chains/03-Structured-Output-Chain.ipynb - with_structured_output() 의 동작 방식
+
+with_structured_output() 은 내부적으로 bind_tools() + 도구 호출 파서로 구성됩니다.
+여기서는 파서만 부분 JSON 을 그대로 내보내는 JsonOutputKeyToolsParser 로 바꾸어,
+토큰이 도착할 때마다 지금까지 완성된 dict 를 받습니다.
+
+iter_presentation_events() 는 그 부분 dict 들을 CLI 가 바로 출력할 수 있는 이벤트로 바꿉니다.
+- ("bullet", dict)   : 다음 bullet 이 시작되었거나 script 가 시작되어 완성이 확정된 bullet
+- ("script", str)    : 새로 도착한 script 텍스트 조각
+- ("evidence", str)  : 완성된 evidence 문장
+- ("done", PresentationOutput) : 전체 출력 검증 완료
+"""
+
+from functools import partial
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+from langchain_core.runnables import RunnableLambda # 13-LangChain-Expression-Language/03-RunnableLambda.ipynb
+
+from rag.chain import build_llm, format_docs
+from rag.context import DEFAULT_CONTEXT_TOKENS
+from rag.prompts import INTEGRATED_PROMPT, PresentationOutput
+
+
+def build_streaming_chain(retriever, llm=None, context_tokens: int = DEFAULT_CONTEXT_TOKENS, log_context: bool = True):
+    """
+    build_rag_chain() 과 같은 검색 / 프롬프트를 쓰되, 부분 dict 를 stream 하는 체인
+    (log_context 는 build_answer_chain() 과 같음)
+    """
+    llm = llm or build_llm()
+
+    # with_structured_output(PresentationOutput) 과 같은 도구 호출 강제
+    structured_llm = llm.bind_tools(
+        [PresentationOutput],
+        tool_choice=PresentationOutput.__name__
+    )
+    parser = JsonOutputKeyToolsParser(key_name=PresentationOutput.__name__, first_tool_only=True)
+
+    return (
+        {
+            "question": lambda x: x["question"],
+            "context": (lambda x: x["question"]) | retriever | RunnableLambda(
+                partial(format_docs, max_tokens=context_tokens, log=log_context)
+            ),
+        }
+        | INTEGRATED_PROMPT
+        | structured_llm
+        | parser
+    )
+
+
+class PresentationEventState:
+    """부분 dict 를 하나씩 받아 새로 확정된 이벤트를 돌려주는 상태 객체 (동기/비동기 공용)"""
+
+    def __init__(self):
+        self.bullets_sent = 0
+        self.script_sent = 0
+        self.evidence_sent = 0
+        self.last: Dict[str, Any] = {}
+
+    def feed(self, partial: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        if not isinstance(partial, dict):
+            return []
+        events: List[Tuple[str, Any]] = []
+        self.last = partial
+        bullets = partial.get("ppt_bullets") or []
+        bullets_done = "script" in partial or "evidence" in partial
+
+        # 마지막 bullet 은 다음 bullet(또는 다음 필드)이 시작되어야 완성이 확정됨
+        ready = len(bullets) if bullets_done else len(bullets) - 1
+        while self.bullets_sent < ready:
+            events.append(("bullet", bullets[self.bullets_sent]))
+            self.bullets_sent += 1
+
+        if bullets_done:
+            script = partial.get("script") or ""
+            if len(script) > self.script_sent:
+                events.append(("script", script[self.script_sent:]))
+                self.script_sent = len(script)
+
+        evidence = partial.get("evidence") or []
+        while self.evidence_sent < len(evidence) - 1:
+            events.append(("evidence", evidence[self.evidence_sent]))
+            self.evidence_sent += 1
+        return events
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        """스트림 종료: 남은 항목을 모두 확정하고 PresentationOutput 으로 검증"""
+        events: List[Tuple[str, Any]] = []
+        bullets = self.last.get("ppt_bullets") or []
+        while self.bullets_sent < len(bullets):
+            events.append(("bullet", bullets[self.bullets_sent]))
+            self.bullets_sent += 1
+        script = self.last.get("script") or ""
+        if len(script) > self.script_sent:
+            events.append(("script", script[self.script_sent:]))
+            self.script_sent = len(script)
+        evidence = self.last.get("evidence") or []
+        while self.evidence_sent < len(evidence):
+            events.append(("evidence", evidence[self.evidence_sent]))
+            self.evidence_sent += 1
+        events.append(("done", PresentationOutput.model_validate(self.last)))
+        return events
+
+
+def iter_presentation_events(partials: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Any]]:
+    """부분 dict 스트림 → ("bullet" | "script" | "evidence" | "done", 값) 이벤트"""
+    state = PresentationEventState()
+    for partial in partials:
+        yield from state.feed(partial)
+    yield from state.finish()
+
+
+async def aiter_presentation_events(partials: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[Tuple[str, Any]]:
+    """iter_presentation_events() 의 비동기 버전 (chain.astream 용)"""
+    state = PresentationEventState()
+    async for partial in partials:
+        for event in state.feed(partial):
+            yield event
+    for event in state.finish():
+        yield event
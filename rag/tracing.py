@@ -0,0 +1,346 @@
+# rag/tracing.py
+
+"""
+RAG 체인 단계별 추적 / 지표 (LangSmith 없이 로컬에서)
+
+01-Basic/03-LCEL.Ipynb - Runnable 의 invoke / ainvoke
+
+build_rag_chain(tracer=...) 은 체인의 각 단계를 감싸서 질문 하나마다
+- question  : 질문 전달
+- retriever : 검색 (검색된 chunk ID)
+- format_docs : context 구성 (context 토큰 수)
+- prompt    : 프롬프트 렌더링
+- llm       : LLM 호출 (입력 / 출력 토큰 수)
+- parse     : 구조화된 출력 파싱
+의 소요 시간을 기록하고, 답변 캐시 / 질문 임베딩 캐시 적중 여부도 함께 남깁니다.
+
+결과는 두 가지로 볼 수 있습니다.
+- MetricsRegistry.render() : Prometheus 텍스트 형식의 카운터 / 히스토그램 (서버 모드의 GET /metrics)
+- trace_path              : 질문마다 한 줄씩 기록하는 로컬 JSONL 파일 (선택)
+/metrics 에는 프로세스 메모리(process_memory)도 함께 내보냅니다. (mmap 인덱스가 공유되는지 확인용)
+
+기록 비용은 단계당 perf_counter 2회 + 버킷 탐색 정도(수 µs)이며,
+LangChain 의 콜백 / 실행 기록(run)은 새로 만들지 않습니다.
+"""
+
+import json
+import resource
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import Runnable, RunnableSequence
+from langchain_core.runnables.base import coerce_to_runnable
+
+
+# 단계 지연 시간 버킷(초): 프롬프트 렌더링(수십 µs) ~ LLM 호출(수십 초)
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 토큰 사용량(usage_metadata)을 기록할 LLM 호출 단계 (llm_bullets / llm_script: rag/sections.py)
+LLM_STAGES = ("llm", "llm_bullets", "llm_script")
+
+# /proc/self/status 항목 → process_memory() 키
+_STATUS_KEYS = {"VmRSS": "rss", "RssAnon": "rss_anon", "RssFile": "rss_file"}
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("rag_trace", default=None)
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...]) -> str:
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+
+
+class Counter:
+    """라벨별 누적 값"""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_text(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """라벨별 누적 버킷 히스토그램 (Prometheus 형식: le 이하 누적 개수 / 합 / 개수)"""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}   # [버킷별 개수..., +Inf, 합]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self.series.get(key)
+            if row is None:
+                row = self.series[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        """버킷 상한으로 근사한 분위수 (관측값이 없으면 None)"""
+        row = self.series.get(tuple(sorted(labels.items())))
+        if not row:
+            return None
+        total = sum(row[:-1])
+        seen = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, row in sorted(self.series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_label_text(labels + (('le', le),))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_label_text(labels)} {row[-1]:.6f}")
+            lines.append(f"{self.name}_count{_label_text(labels)} {cumulative:g}")
+        return lines
+
+
+def process_memory() -> Dict[str, int]:
+    """
+    현재 프로세스의 메모리 (bytes)
+    - rss      : 상주 메모리 전체
+    - rss_anon : 프로세스 전용 메모리 (Python 객체, 메모리로 읽은 인덱스 등)
+    - rss_file : 파일 매핑 페이지 (mmap 인덱스 / docs.bin, 같은 파일을 연 프로세스끼리 공유)
+    - pss      : 공유 페이지를 나눠 가진 몫을 더한 크기 (프로세스별 실제 부담)
+    Linux 가 아니면 최대 RSS 만 돌려줍니다.
+    """
+    memory: Dict[str, int] = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in _STATUS_KEYS:
+                    memory[_STATUS_KEYS[key]] = int(value.split()[0]) * 1024   # kB
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss"] = int(line.split()[1]) * 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory.setdefault("rss", peak if sys.platform == "darwin" else peak * 1024)
+    return memory
+
+
+class MetricsRegistry:
+    """RAG 체인 지표 모음"""
+
+    def __init__(self):
+        self.requests = Counter("rag_requests_total", "처리한 질문 수")
+        self.errors = Counter("rag_errors_total", "단계별 예외 수")
+        self.request_seconds = Histogram("rag_request_seconds", "질문 하나의 전체 처리 시간(초)")
+        self.stage_seconds = Histogram("rag_stage_seconds", "단계별 처리 시간(초)")
+        self.tokens = Counter("rag_tokens_total", "토큰 수 (context / prompt / completion)")
+        self.retrieved = Counter("rag_retrieved_chunks_total", "검색된 chunk 수")
+        self.cache = Counter("rag_cache_total", "캐시 조회 결과")
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.requests, self.errors, self.request_seconds, self.stage_seconds,
+                       self.tokens, self.retrieved, self.cache):
+            lines.extend(metric.render())
+        lines += ["# HELP rag_process_memory_bytes 프로세스 메모리 (rss / rss_anon / rss_file / pss)",
+                  "# TYPE rag_process_memory_bytes gauge"]
+        for kind, value in sorted(process_memory().items()):
+            lines.append(f'rag_process_memory_bytes{{kind="{kind}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+class Trace:
+    """질문 하나의 단계별 기록"""
+
+    __slots__ = ("question", "started", "stages", "attrs")
+
+    def __init__(self, question: str = ""):
+        self.question = question
+        self.started = time.time()
+        self.stages: Dict[str, float] = {}      # 단계 → 초
+        self.attrs: Dict[str, Any] = {}         # chunk_ids / 토큰 수 / 캐시 적중 등
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": self.started,
+            "question": self.question,
+            "stages_ms": {k: round(v * 1000, 3) for k, v in self.stages.items()},
+            **self.attrs,
+        }
+
+    def summary(self) -> str:
+        parts = [f"{name} {sec * 1000:.1f}ms" for name, sec in self.stages.items()]
+        parts += [f"{key}={self.attrs[key]}" for key in ("context_tokens", "answer_cache", "embedding_cache")
+                  if key in self.attrs]
+        return " | ".join(parts)
+
+
+def annotate(**attrs: Any) -> None:
+    """실행 중인 질문의 trace 에 값을 기록합니다. (추적 중이 아니면 아무것도 하지 않음)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+class _Stage(Runnable[Any, Any]):
+    """inner Runnable 을 그대로 실행하며 소요 시간만 기록 (LangChain run 을 새로 만들지 않음)"""
+
+    def __init__(self, tracer: "ChainTracer", stage: str, inner: Runnable):
+        self.tracer = tracer
+        self.stage = stage
+        self.inner = inner
+        self.name = stage
+
+    def invoke(self, input, config=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            output = self.inner.invoke(input, config, **kwargs)
+        except BaseException:
+            self.tracer.metrics.errors.inc(stage=self.stage)
+            raise
+        self.tracer.record(self.stage, time.perf_counter() - started, output)
+        return output
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            output = await self.inner.ainvoke(input, config, **kwargs)
+        except BaseException:
+            self.tracer.metrics.errors.inc(stage=self.stage)
+            raise
+        self.tracer.record(self.stage, time.perf_counter() - started, output)
+        return output
+
+
+class _TracedChain(Runnable[Any, Any]):
+    """질문 하나마다 Trace 를 만들어 하위 단계가 기록하게 하고, 끝나면 지표 / JSONL 에 반영"""
+
+    def __init__(self, tracer: "ChainTracer", inner: Runnable):
+        self.tracer = tracer
+        self.inner = inner
+        self.name = "traced_rag_chain"
+
+    def invoke(self, input, config=None, **kwargs):
+        trace = Trace(input.get("question", "") if isinstance(input, dict) else str(input))
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            return self.inner.invoke(input, config, **kwargs)
+        except BaseException as e:
+            trace.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_trace.reset(token)
+            self.tracer.finish(trace, time.perf_counter() - started)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        trace = Trace(input.get("question", "") if isinstance(input, dict) else str(input))
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            return await self.inner.ainvoke(input, config, **kwargs)
+        except BaseException as e:
+            trace.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_trace.reset(token)
+            self.tracer.finish(trace, time.perf_counter() - started)
+
+
+class ChainTracer:
+    """
+    Parameters
+    ----------
+    metrics : Optional[MetricsRegistry]
+        지표를 누적할 곳 (없으면 새로 생성)
+    trace_path : Optional[str]
+        질문마다 한 줄씩 기록할 JSONL 경로 (None 이면 기록하지 않음)
+    """
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None, trace_path: Optional[str] = None):
+        self.metrics = metrics or MetricsRegistry()
+        self.trace_path = trace_path
+        self.last: Optional[Trace] = None
+        self._file = open(trace_path, "a", encoding="utf-8", buffering=1) if trace_path else None
+        self._file_lock = threading.Lock()
+
+    def stage(self, name: str, runnable) -> Runnable:
+        """runnable(또는 함수)을 name 단계로 기록하도록 감쌉니다."""
+        return _Stage(self, name, coerce_to_runnable(runnable))
+
+    def wrap(self, chain) -> Runnable:
+        """체인 전체를 감쌉니다. (질문 하나 = trace 하나)"""
+        return _TracedChain(self, coerce_to_runnable(chain))
+
+    def record(self, stage: str, seconds: float, output: Any = None) -> None:
+        self.metrics.stage_seconds.observe(seconds, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.stages[stage] = trace.stages.get(stage, 0.0) + seconds
+
+        if stage == "retriever" and isinstance(output, list):
+            self.metrics.retrieved.inc(len(output))
+            if trace is not None:
+                trace.attrs["chunk_ids"] = [getattr(d, "metadata", {}).get("chunk_id") for d in output]
+        elif stage in LLM_STAGES:
+            usage = getattr(output, "usage_metadata", None)
+            if usage:
+                self.metrics.tokens.inc(usage.get("input_tokens", 0), kind="prompt")
+                self.metrics.tokens.inc(usage.get("output_tokens", 0), kind="completion")
+                if trace is not None:
+                    # 섹션별 생성(rag/sections.py)은 LLM 호출이 두 번이므로 합산
+                    trace.attrs["prompt_tokens"] = trace.attrs.get("prompt_tokens", 0) + usage.get("input_tokens", 0)
+                    trace.attrs["completion_tokens"] = (trace.attrs.get("completion_tokens", 0)
+                                                        + usage.get("output_tokens", 0))
+
+    def finish(self, trace: Trace, seconds: float) -> None:
+        trace.stages["total"] = seconds
+        self.metrics.requests.inc()
+        self.metrics.request_seconds.observe(seconds)
+        if "context_tokens" in trace.attrs:
+            self.metrics.tokens.inc(trace.attrs["context_tokens"], kind="context")
+        for cache in ("answer_cache", "embedding_cache"):
+            if cache in trace.attrs:
+                self.metrics.cache.inc(cache=cache.split("_")[0], result=trace.attrs[cache])
+        self.last = trace
+        if self._file is not None:
+            line = json.dumps(trace.to_dict(), ensure_ascii=False)
+            with self._file_lock:
+                self._file.write(line + "\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def split_structured_llm(structured_llm) -> Tuple[Runnable, Optional[Runnable]]:
+    """
+    with_structured_output() 결과를 (LLM 호출, 출력 파서) 로 나눕니다.
+    (내부가 "LLM | 파서" 시퀀스가 아니면 파서는 None)
+    """
+    if isinstance(structured_llm, RunnableSequence) and len(structured_llm.steps) >= 2:
+        steps = structured_llm.steps
+        call = steps[0] if len(steps) == 2 else RunnableSequence(*steps[:-1])
+        return call, steps[-1]
+    return structured_llm, None
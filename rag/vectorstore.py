@@ -19,39 +19,160 @@ search_kwargs={"k": k} - 검색할 문서 개수 지정
 51-53줄의 search_kwargs={"k": k}는 질문에 가장 관련 있는 상위 k개 문서를 검색하는 핵심 파라미터입니다!
 """
 
-from langchain_openai import OpenAIEmbeddings # 09-Embeddings/01-OpenAIEmbeddings.ipynb
+import uuid
+
+import numpy as np
 from langchain_community.vectorstores import FAISS # 10-VectorStore/02-FAISS.ipynb
 from langchain_core.documents import Document
-from typing import List
+from langchain_core.embeddings import Embeddings
+from typing import List, Optional
+
+from rag.ann import (
+    DEFAULT_INDEX_SPEC, convert_vectorstore, is_pq_spec, needs_retrain, reconstruct_vectors, supports_remove
+)
+from rag.bm25 import HybridRetriever
+from rag.embedding_cache import CachedEmbeddings
+from rag.embedding import EmbeddingConfig, EmbeddingStats, embed_into_vectorstore
+from rag.http_pool import HttpPoolConfig, client_kwargs
+from rag.rerank import Reranker, RerankConfig, RerankRetriever
+from rag.scope import ScopedVectorStoreRetriever
+
+
+def get_embeddings(
+    embedding_model: str = "text-embedding-3-small",
+    cache_path: Optional[str] = None,
+    cache_max_entries: int = 500_000,
+    http_pool: Optional[HttpPoolConfig] = HttpPoolConfig(),
+    dimensions: Optional[int] = None
+) -> Embeddings:
+    """
+    임베딩 모델 객체를 생성합니다. (인덱스 생성과 저장된 인덱스 로드에서 공통 사용)
+
+    cache_path 를 지정하면 OpenAIEmbeddings 앞에 영구 임베딩 캐시(rag/embedding_cache.py)를 둡니다.
+    http_pool 설정의 공유 연결 풀(rag/http_pool.py)을 LLM 과 함께 사용합니다. (None 이면 openai 기본 클라이언트)
+    dimensions 를 지정하면 text-embedding-3-* 의 축소 차원(예: 512)으로 받습니다. (벡터 메모리 / 검색 시간 감소)
+    """
+    from langchain_openai import OpenAIEmbeddings # 09-Embeddings/01-OpenAIEmbeddings.ipynb (임포트 약 1초, 필요할 때만)
+
+    embeddings = OpenAIEmbeddings(model=embedding_model, dimensions=dimensions, **client_kwargs(http_pool)) # 09-Embeddings/01-OpenAIEmbeddings.ipynb
+    if cache_path:
+        # 차원이 다르면 다른 벡터이므로 캐시 namespace 도 나눔
+        namespace = f"{embedding_model}@{dimensions}" if dimensions else embedding_model
+        return CachedEmbeddings(embeddings, cache_path, namespace=namespace, max_entries=cache_max_entries)
+    return embeddings
 
 
 def build_vectorstore(
     documents: List[Document],
-    embedding_model: str = "text-embedding-3-small" # 09-Embeddings/01-OpenAIEmbeddings.ipynb / 가성비 좋은 모델
+    embedding_model: str = "text-embedding-3-small", # 09-Embeddings/01-OpenAIEmbeddings.ipynb / 가성비 좋은 모델
+    ids: Optional[List[str]] = None,
+    vectorstore: Optional[FAISS] = None,
+    delete_ids: Optional[List[str]] = None,
+    embedding_config: Optional[EmbeddingConfig] = None,
+    stats: Optional[EmbeddingStats] = None,
+    embeddings: Optional[Embeddings] = None,
+    index_spec: str = DEFAULT_INDEX_SPEC,
+    trained_size: Optional[int] = None
 ) -> FAISS:
     """
     Document 리스트로부터 FAISS VectorStore를 생성합니다.
 
+    vectorstore 를 함께 넘기면 증분 모드로 동작합니다.
+    기존 인덱스에서 delete_ids 벡터를 지우고, documents 만 새로 임베딩하여 추가합니다.
+
+    임베딩은 rag/embedding.py 의 배치 + 동시 실행 단계를 거쳐 배치가 끝나는 대로 인덱스에 추가됩니다.
+
+    index_spec 이 Flat 이 아니면 Flat 인덱스로 모은 뒤 ANN 인덱스로 바꿉니다. (rag/ann.py)
+    IVF / HNSW 인덱스는 벡터 삭제 후 위치 번호를 다시 매길 수 없으므로,
+    delete_ids 가 있으면 남은 chunk 의 저장된 벡터(rag/ann.py reconstruct_vectors)로 인덱스를 새로 만듭니다.
+    PQ 처럼 근사 벡터만 남는 인덱스이거나 벡터를 꺼낼 수 없으면 남은 chunk 를 다시 임베딩합니다. (임베딩 캐시 적중)
+    IVF 인덱스는 추가 후 벡터 수가 학습 당시(trained_size)보다 크게 늘면 같은 방법으로 다시 학습합니다. (ann.needs_retrain)
+
     Parameters
     ----------
     documents : List[Document]
         분할된 문서 chunk
     embedding_model : str
         OpenAI embedding 모델 이름
+    ids : Optional[List[str]]
+        chunk ID (지정하면 이후 delete 로 해당 벡터를 지울 수 있음)
+    vectorstore : Optional[FAISS]
+        증분 모드에서 갱신할 기존 VectorStore
+    delete_ids : Optional[List[str]]
+        증분 모드에서 삭제할 chunk ID
+    embedding_config : Optional[EmbeddingConfig]
+        배치 토큰 수 / 동시 요청 수 / 재시도 설정
+    stats : Optional[EmbeddingStats]
+        넘기면 임베딩 단계 통계(chunks/sec 등)를 채워 줍니다.
+    embeddings : Optional[Embeddings]
+        사용할 임베딩 객체 (기본값: get_embeddings(embedding_model))
+    index_spec : str
+        faiss.index_factory 형식의 인덱스 종류 ("Flat", "IVF,Flat", "HNSW32", "IVF,PQ16" 등)
+    trained_size : Optional[int]
+        증분 모드에서 기존 ANN 인덱스를 학습할 때의 벡터 수 (manifest 에 기록된 값)
 
     Returns
     -------
     FAISS
-        생성된 VectorStore 객체
+        생성(또는 갱신)된 VectorStore 객체
     """
-    embeddings = OpenAIEmbeddings(model=embedding_model) # 09-Embeddings/01-OpenAIEmbeddings.ipynb / 12-RAG/01-RAG-Basic-PDF.ipynb / RAG의 3단계: 임베딩 생성
-    vectorstore = FAISS.from_documents(documents, embeddings) # 10-VectorStore/02-FAISS.ipynb / 12-RAG/01-RAG-Basic-PDF.ipynb
-    return vectorstore # RAG의 4단계: 임베딩된 Chunk를 DB에 저장
+    if embeddings is None:
+        if vectorstore is not None:
+            embeddings = vectorstore.embeddings
+        else:
+            embeddings = get_embeddings(embedding_model) # 09-Embeddings/01-OpenAIEmbeddings.ipynb / 12-RAG/01-RAG-Basic-PDF.ipynb / RAG의 3단계: 임베딩 생성
+
+    if vectorstore is not None and delete_ids and supports_remove(vectorstore.index):
+        # 증분 모드: 10-VectorStore/02-FAISS.ipynb - delete 로 기존 벡터 삭제
+        vectorstore.delete(delete_ids)
+    elif vectorstore is not None and not supports_remove(vectorstore.index):
+        n_after = vectorstore.index.ntotal - len(delete_ids or []) + len(documents)
+        if delete_ids or needs_retrain(vectorstore.index, index_spec, n_after, trained_size):
+            # ANN 인덱스: 남은 chunk + 새 chunk 로 다시 생성 (Flat 으로 모은 뒤 convert_vectorstore 에서 다시 학습)
+            deleted = set(delete_ids or [])
+            kept = [(pos, i) for pos, i in sorted(vectorstore.index_to_docstore_id.items()) if i not in deleted]
+            keep_ids = [i for _, i in kept]
+            keep_docs = [vectorstore.docstore.search(i) for i in keep_ids]
+            vectors = None
+            if kept and not is_pq_spec(index_spec):
+                vectors = reconstruct_vectors(vectorstore.index, np.array([pos for pos, _ in kept]))
+
+            if vectors is not None:
+                # 저장된 벡터로 Flat 인덱스를 다시 만들고 새 chunk 만 임베딩 (10-VectorStore/02-FAISS.ipynb)
+                vectorstore = FAISS.from_embeddings(
+                    [(d.page_content, v) for d, v in zip(keep_docs, vectors)],
+                    embeddings,
+                    metadatas=[d.metadata for d in keep_docs],
+                    ids=keep_ids
+                )
+            else:
+                if ids is None:
+                    ids = [str(uuid.uuid4()) for _ in documents]
+                documents = keep_docs + list(documents)
+                ids = keep_ids + list(ids)
+                vectorstore = None
+
+    # RAG의 4단계: 임베딩된 Chunk를 DB에 저장 (10-VectorStore/02-FAISS.ipynb / 12-RAG/01-RAG-Basic-PDF.ipynb)
+    vectorstore, _ = embed_into_vectorstore(
+        documents,
+        embeddings,
+        ids=ids,
+        vectorstore=vectorstore,
+        config=embedding_config,
+        model=embedding_model,
+        stats=stats
+    )
+    if vectorstore is not None:
+        vectorstore = convert_vectorstore(vectorstore, index_spec)
+    return vectorstore
 
 
 def build_retriever( # 11-Retriever/01-VectorStoreRetriever.ipynb
     vectorstore: FAISS,
-    k: int = 4 # 11-Retriever/01-VectorStoreRetriever.ipynb / 검색할 문서 개수
+    k: int = 4, # 11-Retriever/01-VectorStoreRetriever.ipynb / 검색할 문서 개수
+    bm25=None,
+    fetch_k: int = 20,
+    rerank: Optional[RerankConfig] = None
 ):
     """
     VectorStore로부터 Retriever를 생성합니다.
@@ -62,12 +183,30 @@ def build_retriever( # 11-Retriever/01-VectorStoreRetriever.ipynb
         FAISS VectorStore
     k : int
         검색할 문서 개수
+    bm25 : Optional[BM25Index]
+        넘기면 dense + BM25 하이브리드 검색(RRF)을 사용합니다. (rag/bm25.py)
+    fetch_k : int
+        하이브리드 검색에서 각 검색기가 가져올 후보 수
+    rerank : Optional[RerankConfig]
+        넘기면 후보 rerank.fetch_k 개를 가져와 MMR / Cross-Encoder 로 k 개를 고릅니다. (rag/rerank.py)
 
     Returns
     -------
     BaseRetriever
     """
-    retriever = vectorstore.as_retriever(
-        search_kwargs={"k": k}
+    hybrid = None
+    if bm25 is not None:
+        hybrid = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=k, fetch_k=max(fetch_k, k))
+
+    if rerank is not None:
+        return RerankRetriever(vectorstore=vectorstore, reranker=Reranker(vectorstore, rerank), hybrid=hybrid, k=k)
+    if hybrid is not None:
+        return hybrid
+
+    # vectorstore.as_retriever() 와 같되 use_scope() 안에서는 그 논문만 검색 (rag/scope.py)
+    retriever = ScopedVectorStoreRetriever(
+        vectorstore=vectorstore,
+        search_kwargs={"k": k},
+        tags=vectorstore._get_retriever_tags()
     )
     return retriever # RAG의 5단계: 검색기 생성